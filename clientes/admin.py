@@ -1,7 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import Usuario, Cliente, HistorialCliente
+from .models import Usuario, Cliente, HistorialCliente, UsuarioCreado, TrabajoImportacion, ParSimilar, TareaProgramada, EjecucionTarea
 from django.utils.html import format_html
+from django.contrib import messages
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .forms import AltaUsuariosForm
+from .services.alta_usuarios import ErrorAltaUsuarios, crear_usuarios, leer_csv, validar_filas
+from .services.hash_paralelo import PROCESOS_PETICION
+from .permisos import tiene_rol
 
 
 # ============================
@@ -10,6 +18,7 @@ from django.utils.html import format_html
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
     list_display = ('nombre', 'compania', 'identificacion', 'logo_tag', 'creado_por', 'creado_en')
+    list_select_related = ('creado_por',)
     search_fields = ('nombre', 'compania', 'identificacion')
 
     def logo_tag(self, obj):
@@ -40,11 +49,52 @@ class UsuarioAdmin(UserAdmin):
             return self.readonly_fields
 
         # Si no es superadmin, no puede modificar el campo 'rol'
-        if  request.user.is_superuser or request.user.rol == 'superadmin':
+        if tiene_rol(request.user, ('superadmin',)):
             return self.readonly_fields
         else:
             return self.readonly_fields + ('rol', 'is_staff', 'is_superuser')
 
+    # Alta masiva desde CSV (botón "Importar CSV" en el listado)
+    change_list_template = 'admin/clientes/usuario/change_list.html'
+
+    def get_urls(self):
+        urls = [
+            path('importar-csv/', self.admin_site.admin_view(self.importar_csv), name='clientes_usuario_importar_csv'),
+        ]
+        return urls + super().get_urls()
+
+    def importar_csv(self, request):
+        if not self.has_add_permission(request):
+            messages.error(request, "No tienes permiso para crear usuarios.")
+            return redirect('admin:clientes_usuario_changelist')
+
+        errores = []
+        if request.method == 'POST':
+            form = AltaUsuariosForm(request.POST, request.FILES)
+            if form.is_valid():
+                # Solo un superadmin puede asignar roles desde el CSV
+                permitir_roles = tiene_rol(request.user, ('superadmin',))
+                try:
+                    filas = leer_csv(form.cleaned_data['archivo'])
+                    errores = validar_filas(filas, permitir_roles=permitir_roles)
+                except (ErrorAltaUsuarios, UnicodeDecodeError) as e:
+                    errores = [str(e)]
+                if not errores:
+                    usuarios = crear_usuarios(filas, creador=request.user, procesos=PROCESOS_PETICION)
+                    messages.success(request, f"✅ {len(usuarios)} usuarios creados.")
+                    return redirect('admin:clientes_usuario_changelist')
+        else:
+            form = AltaUsuariosForm()
+
+        contexto = {
+            **self.admin_site.each_context(request),
+            'title': 'Importar usuarios desde CSV',
+            'opts': self.model._meta,
+            'form': form,
+            'errores': errores,
+        }
+        return TemplateResponse(request, 'admin/clientes/usuario/importar_csv.html', contexto)
+
 # ============================
 # CONFIGURACIÓN DEL MODELO HISTORIALCLIENTE
 # ============================
@@ -52,4 +102,52 @@ class UsuarioAdmin(UserAdmin):
 class HistorialClienteAdmin(admin.ModelAdmin):
     list_display = ('cliente', 'campo', 'valor_anterior', 'valor_nuevo', 'editado_por', 'fecha_edicion')
     list_filter = ('fecha_edicion', 'campo', 'editado_por')
-    search_fields = ('cliente__nombre', 'campo', 'valor_anterior', 'valor_nuevo')
\ No newline at end of file
+    list_select_related = ('cliente', 'editado_por')
+    search_fields = ('cliente__nombre', 'campo', 'valor_anterior', 'valor_nuevo')
+
+
+# ============================
+# CONFIGURACIÓN DEL MODELO USUARIOCREADO
+# ============================
+@admin.register(UsuarioCreado)
+class UsuarioCreadoAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'usuario', 'creador', 'creado_en')
+    list_select_related = ('usuario', 'creador')
+    raw_id_fields = ('usuario', 'creador')
+
+
+# ============================
+# CONFIGURACIÓN DEL MODELO TRABAJOIMPORTACION
+# ============================
+@admin.register(TrabajoImportacion)
+class TrabajoImportacionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'archivo', 'estado', 'procesadas', 'total', 'insertados', 'actualizados', 'fallidos', 'creado_por', 'creado_en')
+    list_filter = ('estado',)
+    list_select_related = ('creado_por',)
+
+
+
+# ============================
+# CONFIGURACIÓN DEL MODELO PARSIMILAR
+# ============================
+@admin.register(ParSimilar)
+class ParSimilarAdmin(admin.ModelAdmin):
+    list_display = ('cliente_a', 'cliente_b', 'puntaje', 'similitud_nombre', 'similitud_compania', 'estado', 'detectado_en')
+    list_filter = ('estado',)
+    list_select_related = ('cliente_a', 'cliente_b')
+    raw_id_fields = ('cliente_a', 'cliente_b', 'revisado_por')
+
+
+# ============================
+# CONFIGURACIÓN DE TAREAS PROGRAMADAS
+# ============================
+@admin.register(TareaProgramada)
+class TareaProgramadaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'proxima_ejecucion', 'ultima_ejecucion', 'bloqueado_por', 'bloqueado_hasta')
+
+
+@admin.register(EjecucionTarea)
+class EjecucionTareaAdmin(admin.ModelAdmin):
+    list_display = ('tarea', 'nodo', 'inicio', 'duracion', 'exito')
+    list_filter = ('exito', 'tarea')
+    list_select_related = ('tarea',)
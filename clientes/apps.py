@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class ClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clientes'
+
+    def ready(self):
+        # Registra la invalidación de usuarios en caché al guardar un Usuario
+        from . import backends  # noqa: F401
+
+        # Registro de consultas lentas (no hace nada con CONSULTAS_LENTAS_MS=0)
+        from directorio_project import consultas_lentas
+        consultas_lentas.instalar()
+
+        # Contador de consultas SQL para /metrics
+        from directorio_project import metricas
+        metricas.instalar()
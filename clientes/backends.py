@@ -0,0 +1,73 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Usuario
+
+# Segundos que un usuario autenticado queda en caché (se invalida al guardarlo)
+TTL_USUARIO = 300
+
+# Solo con una caché que vean todos los workers la invalidación llega a todos.
+# Con LocMemCache (o FileBasedCache en varias máquinas) un usuario desactivado
+# o degradado seguiría entrando en otros workers hasta que venza el TTL
+CACHES_COMPARTIDAS = (
+    'django.core.cache.backends.redis.RedisCache',
+    'django.core.cache.backends.memcached.PyMemcacheCache',
+    'django.core.cache.backends.memcached.PyLibMCCache',
+    'django.core.cache.backends.db.DatabaseCache',
+)
+
+
+def clave_usuario(user_id):
+    return f"usuario_autenticado:{user_id}"
+
+
+def cache_compartida():
+    return settings.CACHES['default']['BACKEND'] in CACHES_COMPARTIDAS
+
+
+def invalidar_usuarios_cacheados(pks):
+    if pks:
+        cache.delete_many([clave_usuario(pk) for pk in pks])
+
+
+class UsuarioCacheadoBackend(ModelBackend):
+    """
+    ModelBackend que guarda en caché el Usuario de la sesión, para no
+    consultarlo en la BD en cada petición con login_required. Sin una caché
+    compartida (CACHES_COMPARTIDAS) se comporta igual que ModelBackend.
+    """
+
+    def get_user(self, user_id):
+        if not cache_compartida():
+            return super().get_user(user_id)
+        clave = clave_usuario(user_id)
+        user = cache.get(clave)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(clave, user, TTL_USUARIO)
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        # request.auser() (vistas asíncronas) pasa por aquí, no por get_user
+        if not cache_compartida():
+            return await super().aget_user(user_id)
+        clave = clave_usuario(user_id)
+        user = await cache.aget(clave)
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is None:
+                return None
+            await cache.aset(clave, user, TTL_USUARIO)
+        return user if self.user_can_authenticate(user) else None
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def invalidar_usuario_cacheado(sender, instance, **kwargs):
+    # Cambios de rol, contraseña o activo se ven en la siguiente petición
+    invalidar_usuarios_cacheados([instance.pk])
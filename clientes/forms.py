@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
-from .models import Cliente, Usuario
+from .models import Cliente, Usuario, TrabajoImportacion
 from .services.states_api import fetch_us_states
 
 
@@ -94,14 +94,14 @@ class ClienteForm(forms.ModelForm):
             }),
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, estados=None, **kwargs):
         super().__init__(*args, **kwargs)
 
         # --------------------------
-        # Cargar estados desde API
+        # Cargar estados desde API (las vistas asíncronas los pasan ya descargados)
         # --------------------------
-        estados = fetch_us_states()
-        
+        if estados is None:
+            estados = fetch_us_states()
 
         if estados:
             # → CORRECCIÓN: usar e["code"] y e["name"]
@@ -116,3 +116,50 @@ class ClienteForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             if field_name != 'nombre':
                 field.required = False
+
+    def clean_identificacion(self):
+        # Solo puede haber un cliente activo por identificación
+        identificacion = (self.cleaned_data.get('identificacion') or '').strip()
+        if identificacion:
+            duplicado = Cliente.activos.filter(identificacion=identificacion).exclude(pk=self.instance.pk)
+            if duplicado.exists():
+                raise forms.ValidationError("Ya existe un cliente activo con esta identificación.")
+        return identificacion
+
+
+# ----------------------------
+# Formulario de importación desde Excel
+# ----------------------------
+class ImportacionForm(forms.ModelForm):
+    class Meta:
+        model = TrabajoImportacion
+        fields = ['archivo']
+        widgets = {
+            'archivo': forms.ClearableFileInput(attrs={
+                'class': 'w-full bg-[#1a1a1a]/80 text-gray-200 border border-[#b8975a]/30 rounded-lg px-3 py-2 focus:outline-none focus:ring-2 focus:ring-[#b8975a]/50',
+                'accept': '.xlsx'
+            }),
+        }
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith('.xlsx'):
+            raise forms.ValidationError("El archivo debe ser un libro de Excel (.xlsx).")
+        return archivo
+
+
+# ----------------------------
+# Formulario de alta masiva de usuarios (CSV)
+# ----------------------------
+class AltaUsuariosForm(forms.Form):
+    archivo = forms.FileField(
+        label='Archivo CSV',
+        help_text='Columnas: username,password y opcionalmente email,rol.',
+        widget=forms.ClearableFileInput(attrs={'accept': '.csv'}),
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith('.csv'):
+            raise forms.ValidationError("El archivo debe ser un CSV.")
+        return archivo
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.models import Usuario
+from clientes.services.alta_usuarios import ErrorAltaUsuarios, crear_usuarios, leer_csv, validar_filas
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea usuarios en bloque desde un CSV (username,password y opcionalmente email,rol). '
+        'Las contraseñas se procesan en paralelo y todo se inserta en una sola transacción.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del CSV.')
+        parser.add_argument('--creador', help='Username que figura como creador en "Usuarios creados".')
+        parser.add_argument('--procesos', type=int, default=None, help='Procesos para el hash (por defecto, los núcleos hasta un máximo de 4).')
+        parser.add_argument('--dry-run', action='store_true', help='Solo valida el archivo.')
+
+    def handle(self, *args, **options):
+        creador = None
+        if options['creador']:
+            creador = Usuario.objects.filter(username=options['creador']).first()
+            if creador is None:
+                raise CommandError(f"No existe el usuario '{options['creador']}'.")
+
+        try:
+            filas = leer_csv(options['archivo'])
+        except (OSError, ErrorAltaUsuarios) as e:
+            raise CommandError(str(e))
+
+        errores = validar_filas(filas)
+        if errores:
+            for error in errores:
+                self.stdout.write(self.style.ERROR(f"❌ {error}"))
+            raise CommandError(f"{len(errores)} errores; no se creó ningún usuario.")
+
+        if options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"✅ {len(filas)} usuarios válidos (dry-run)."))
+            return
+
+        inicio = time.monotonic()
+        usuarios = crear_usuarios(filas, creador=creador, procesos=options['procesos'])
+        duracion = time.monotonic() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(usuarios)} usuarios creados en {duracion:.1f}s"
+        ))
@@ -0,0 +1,99 @@
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from clientes.services.benchmark import PRUEBAS
+from clientes.services.datos_sinteticos import generar_clientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide las rutas críticas (búsqueda de la lista, Cliente.save con historial, logo_url, purga) '
+        'con 1k, 100k y 1M clientes sintéticos y guarda los resultados en JSON. '
+        'Trabaja sobre una base de datos de pruebas temporal; no toca los datos reales.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[1000, 100000, 1000000],
+                            help='Número de clientes de cada escenario.')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Repeticiones por prueba.')
+        parser.add_argument('--pruebas', nargs='+', help='Ejecuta solo estas pruebas.')
+        parser.add_argument('--semilla', type=int, default=42)
+        parser.add_argument('--salida', help='Archivo JSON de resultados (por defecto benchmarks/<fecha>.json).')
+
+    def handle(self, *args, **options):
+        pruebas = [p for p in PRUEBAS if not options['pruebas'] or p[0] in options['pruebas']]
+        if not pruebas:
+            raise CommandError(f"Pruebas disponibles: {', '.join(p[0] for p in PRUEBAS)}")
+
+        salida = Path(options['salida']) if options['salida'] else (
+            Path(getattr(settings, 'BENCHMARKS_DIR', settings.BASE_DIR / 'benchmarks'))
+            / f"{timezone.now():%Y%m%d-%H%M%S}.json"
+        )
+
+        resultados = []
+        nombre_original = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media):
+                for tamano in options['tamanos']:
+                    resultados += self.escenario(tamano, pruebas, options)
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        informe = {'metadatos': self.metadatos(options), 'resultados': resultados}
+        salida.parent.mkdir(parents=True, exist_ok=True)
+        salida.write_text(json.dumps(informe, indent=2, ensure_ascii=False), encoding='utf-8')
+        self.stdout.write(self.style.SUCCESS(f"✅ Resultados guardados en {salida}"))
+
+    def escenario(self, tamano, pruebas, options):
+        call_command('flush', interactive=False, verbosity=0)
+        inicio = time.monotonic()
+        generar_clientes(tamano, semilla=options['semilla'], historial_por_cliente=1, lote=10000)
+        self.stdout.write(self.style.NOTICE(
+            f"--- {tamano} clientes (datos generados en {time.monotonic() - inicio:.1f}s) ---"
+        ))
+
+        resultados = []
+        # Las pruebas destructivas (purga) van al final del escenario
+        for nombre, funcion, _ in sorted(pruebas, key=lambda p: p[2]):
+            medida = funcion(options['repeticiones'])
+            resultados.append({'tamano': tamano, 'prueba': nombre, **medida})
+            self.stdout.write(
+                f"{nombre:<28} mediana {medida['mediana_ms']:>10.3f} ms   p95 {medida['p95_ms']:>10.3f} ms"
+            )
+        return resultados
+
+    def metadatos(self, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            commit = None
+        return {
+            'fecha': timezone.now().isoformat(),
+            'commit': commit,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'base_de_datos': connection.vendor,
+            'conexiones': {
+                'CONN_MAX_AGE': connection.settings_dict.get('CONN_MAX_AGE'),
+                'CONN_HEALTH_CHECKS': connection.settings_dict.get('CONN_HEALTH_CHECKS'),
+                'pool': bool(connection.settings_dict.get('OPTIONS', {}).get('pool')),
+            },
+            'plataforma': platform.platform(),
+            'semilla': options['semilla'],
+            'repeticiones': options['repeticiones'],
+        }
@@ -0,0 +1,58 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clientes.models import Cliente, ParSimilar
+from clientes.services.similares import detectar_similares
+
+
+class Command(BaseCommand):
+    help = (
+        'Detecta posibles clientes duplicados (nombre/compañía parecidos, aunque tengan distinta '
+        'identificación) con MinHash/LSH y distancia de edición, y guarda los pares para revisión.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--umbral', type=float, default=0.6, help='Puntaje mínimo (0-1) para guardar un par.')
+        parser.add_argument('--max-bloque', type=int, default=100,
+                            help='Tamaño máximo de un bloque LSH; los mayores se ignoran por genéricos.')
+
+    def handle(self, *args, **options):
+        inicio = time.monotonic()
+        filas = list(
+            Cliente.activos.values_list('id', 'nombre', 'compania').iterator(chunk_size=5000)
+        )
+        self.stdout.write(f"Analizando {len(filas)} clientes activos...")
+
+        pares = detectar_similares(filas, umbral=options['umbral'], max_bloque=options['max_bloque'])
+        analisis = time.monotonic() - inicio
+
+        # Los pendientes se vuelven a puntuar con los datos actuales (y se quitan si
+        # ya no superan el umbral); los revisados (fusionados o descartados) se conservan tal cual
+        with transaction.atomic():
+            pendientes = {
+                (a, b): pk
+                for pk, a, b in ParSimilar.objects.select_for_update()
+                .filter(estado='pendiente').values_list('pk', 'cliente_a_id', 'cliente_b_id')
+            }
+            nuevos, actualizados = [], []
+            for a, b, puntaje, sim_nombre, sim_compania in pares:
+                par = ParSimilar(
+                    pk=pendientes.pop((a, b), None), cliente_a_id=a, cliente_b_id=b, puntaje=puntaje,
+                    similitud_nombre=sim_nombre, similitud_compania=sim_compania,
+                )
+                (actualizados if par.pk else nuevos).append(par)
+
+            ParSimilar.objects.bulk_update(
+                actualizados, ['puntaje', 'similitud_nombre', 'similitud_compania'], batch_size=1000,
+            )
+            ParSimilar.objects.bulk_create(nuevos, batch_size=1000, ignore_conflicts=True)
+            ParSimilar.objects.filter(pk__in=pendientes.values()).delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(pares)} pares similares encontrados, {len(actualizados)} pendientes actualizados, "
+            f"{len(pendientes)} pendientes descartados por no superar el umbral "
+            f"({ParSimilar.objects.filter(estado='pendiente').count()} pendientes de revisión) "
+            f"en {analisis:.1f}s de análisis, {time.monotonic() - inicio:.1f}s en total."
+        ))
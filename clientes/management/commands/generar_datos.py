@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clientes.models import Usuario
+from clientes.services.datos_sinteticos import borrar_sinteticos, generar_clientes
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera clientes sintéticos deterministas (con historial y logos) para pruebas de carga. '
+        'Todos llevan la identificación SYN-<semilla>-<n>.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=1000, help='Número de clientes a generar.')
+        parser.add_argument('--semilla', type=int, default=42, help='Misma semilla, mismos datos.')
+        parser.add_argument('--historial', type=int, default=2, help='Registros de historial por cliente.')
+        parser.add_argument('--logos', type=float, default=0.3, help='Proporción de clientes con logo.')
+        parser.add_argument('--logos-distintos', type=int, default=50, help='Archivos de logo distintos a crear.')
+        parser.add_argument('--eliminados', type=float, default=0.1,
+                            help='Proporción de clientes eliminados hace más de PURGA_DIAS_RETENCION días.')
+        parser.add_argument('--lote', type=int, default=5000, help='Clientes por transacción.')
+        parser.add_argument('--borrar', action='store_true', help='Borra los clientes sintéticos existentes y termina.')
+
+    def handle(self, *args, **options):
+        if options['borrar']:
+            borrados = borrar_sinteticos()
+            self.stdout.write(self.style.SUCCESS(f"🗑️ {borrados} clientes sintéticos borrados."))
+            return
+
+        inicio = time.monotonic()
+
+        def progreso(hechos, total):
+            self.stdout.write(f"  {hechos}/{total} clientes ({hechos / max(time.monotonic() - inicio, 1e-9):.0f}/s)")
+
+        clientes, historial = generar_clientes(
+            options['clientes'],
+            semilla=options['semilla'],
+            historial_por_cliente=options['historial'],
+            proporcion_logo=options['logos'],
+            logos_distintos=options['logos_distintos'],
+            proporcion_eliminados=options['eliminados'],
+            creado_por=Usuario.objects.filter(is_superuser=True).order_by('pk').first(),
+            lote=options['lote'],
+            progreso=progreso,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {clientes} clientes y {historial} registros de historial generados en {time.monotonic() - inicio:.1f}s"
+        ))
@@ -1,16 +1,102 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
 from django.core.management.base import BaseCommand
+from django.db import transaction
 from django.utils import timezone
-from datetime import timedelta
+
 from clientes.models import Cliente
+from clientes.services.lapidas import registrar_borrado_clientes
+from directorio_project import metricas
+
+EXTENSIONES_LOGO = ('.png', '.jpg', '.jpeg', '.webp')
+
 
 class Command(BaseCommand):
-    help = 'Elimina definitivamente los clientes que llevan más de 30 días inactivos.'
+    help = 'Elimina definitivamente, por lotes, los clientes que llevan más de N días inactivos (30 por defecto).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=settings.PURGA_DIAS_RETENCION,
+                            help='Días que un cliente debe llevar eliminado antes de borrarlo.')
+        parser.add_argument('--lote', type=int, default=500, help='Clientes borrados por transacción.')
+        parser.add_argument('--pausa', type=float, default=0.0, help='Segundos de espera entre lotes.')
+        parser.add_argument('--dry-run', action='store_true', help='Muestra qué se borraría sin borrar nada.')
 
-    def handle(self, *args, **kwargs):
-        limite = timezone.now() - timedelta(days=30)
+    def handle(self, *args, **options):
+        limite = timezone.now() - timedelta(days=options['dias'])
         clientes_a_borrar = Cliente.objects.filter(activo=False, fecha_eliminacion__lte=limite)
 
-        count = clientes_a_borrar.count()
-        clientes_a_borrar.delete()
+        if options['dry_run']:
+            count = clientes_a_borrar.count()
+            self.stdout.write(self.style.WARNING(
+                f"[dry-run] {count} clientes eliminados hace más de {options['dias']} días se borrarían definitivamente."
+            ))
+            return
+
+        inicio = time.monotonic()
+        total = 0
+        archivos = 0
+        ultimo_pk = 0
+        while True:
+            # Lotes por clave primaria: cada transacción es corta y no bloquea a los escritores
+            lote = list(
+                clientes_a_borrar.filter(pk__gt=ultimo_pk)
+                .order_by('pk')
+                .values_list('pk', 'identificacion', 'logo')[:options['lote']]
+            )
+            if not lote:
+                break
+            ultimo_pk = lote[-1][0]
+            ids = [pk for pk, _, _ in lote]
+
+            t0 = time.monotonic()
+            with transaction.atomic():
+                ids = list(Cliente.objects.select_for_update().filter(pk__in=ids, activo=False).values_list('pk', flat=True))
+                # Lápidas para el snapshot incremental; el historial se borra en cascada
+                registrar_borrado_clientes(ids)
+                borrados = Cliente.objects.filter(pk__in=ids).delete()[1].get('clientes.Cliente', 0)
+            archivos += self.borrar_logos(lote)
+            total += borrados
+
+            duracion = time.monotonic() - t0
+            metricas.purga_lote(borrados, duracion)
+            self.stdout.write(f"  - Lote de {borrados} clientes borrado en {duracion:.2f}s")
+            if options['pausa']:
+                time.sleep(options['pausa'])
+
+        segundos = time.monotonic() - inicio
+        ritmo = total / segundos if segundos else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} clientes eliminados definitivamente, {archivos} logos borrados '
+            f'({segundos:.2f}s, {ritmo:.0f} clientes/s).'
+        ))
+
+    def borrar_logos(self, lote):
+        """
+        Borra del disco los logos de los clientes purgados, salvo que otro cliente
+        siga usando el mismo archivo (los logos importados se comparten por hash)
+        o la misma identificación (logos de respaldo en media/logos).
+        """
+        nombres = {logo for _, _, logo in lote if logo}
+        identificaciones = {identificacion for _, identificacion, _ in lote if identificacion}
+        en_uso = set(Cliente.objects.filter(logo__in=nombres).values_list('logo', flat=True)) if nombres else set()
+        ids_en_uso = set(
+            Cliente.objects.filter(identificacion__in=identificaciones).values_list('identificacion', flat=True)
+        ) if identificaciones else set()
+
+        candidatos = nombres - en_uso
+        for identificacion in identificaciones - ids_en_uso:
+            candidatos.update(f"logos/{identificacion}{ext}" for ext in EXTENSIONES_LOGO)
 
-        self.stdout.write(self.style.SUCCESS(f'{count} clientes eliminados definitivamente.'))
+        borrados = 0
+        for nombre in candidatos:
+            try:
+                if default_storage.exists(nombre):
+                    default_storage.delete(nombre)
+                    borrados += 1
+            except (OSError, SuspiciousFileOperation) as e:
+                self.stdout.write(self.style.ERROR(f"No se pudo borrar {nombre}: {e}"))
+        return borrados
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from clientes.services.arranque import diferidos_cargados, medir_varias, mediana_ms, por_paquete
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide el arranque de un proceso limpio (django.setup() y URLconf, lo que hace cada worker '
+        'y cada comando) y muestra el tiempo de importación por paquete y por módulo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=3, help='Arranques a medir (se muestra la mediana).')
+        parser.add_argument('--top', type=int, default=20, help='Filas de cada tabla.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE(f"--- Midiendo {options['repeticiones']} arranques ---"))
+        tiempos, importaciones = medir_varias(options['repeticiones'])
+        self.stdout.write(
+            f"Arranque: mediana {mediana_ms(tiempos):.0f} ms "
+            f"(mín. {min(tiempos) * 1000:.0f} ms, máx. {max(tiempos) * 1000:.0f} ms), "
+            f"{len(importaciones)} módulos importados"
+        )
+
+        cargados = diferidos_cargados(importaciones)
+        if cargados:
+            self.stdout.write(self.style.WARNING(f"⚠️ Se cargan al arrancar integraciones que deberían ser diferidas: {', '.join(cargados)}"))
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nPaquetes por tiempo propio"))
+        for paquete, us, modulos in por_paquete(importaciones)[:options['top']]:
+            self.stdout.write(f"  {us / 1000:8.1f} ms  {paquete} ({modulos} módulos)")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nMódulos por tiempo acumulado (incluye lo que importan)"))
+        for i in sorted(importaciones, key=lambda i: i.acumulado_us, reverse=True)[:options['top']]:
+            origen = f"  ← {i.importado_por}" if i.importado_por else ''
+            self.stdout.write(f"  {i.acumulado_us / 1000:8.1f} ms  {i.modulo}{origen}")
@@ -0,0 +1,37 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.services.precalentar import PAGINAS_LISTA, PASOS, precalentar
+
+
+class Command(BaseCommand):
+    help = (
+        'Precalienta tras un despliegue: conexiones a la BD, caché de estados, carpeta de logos, '
+        'plantillas y primeras páginas de la lista. Muestra cuánto tardó cada paso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pasos', nargs='+', choices=list(PASOS), help='Pasos a ejecutar (por defecto, todos).')
+        parser.add_argument('--paginas', type=int, default=PAGINAS_LISTA, help='Páginas de la lista a renderizar.')
+        parser.add_argument('--usuario', help='Usuario con el que se renderiza la lista (por defecto, un superadmin).')
+
+    def handle(self, *args, **options):
+        usuario = None
+        if options['usuario']:
+            try:
+                usuario = get_user_model().objects.get(username=options['usuario'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"No existe el usuario {options['usuario']}")
+
+        self.stdout.write(self.style.NOTICE("--- Precalentando ---"))
+        resultados = precalentar(options['pasos'], paginas=options['paginas'], usuario=usuario)
+        for nombre, segundos, detalle, error in resultados:
+            if error:
+                self.stdout.write(self.style.ERROR(f"❌ {nombre:<11} {segundos * 1000:8.1f} ms  {error}"))
+            else:
+                self.stdout.write(f"✅ {nombre:<11} {segundos * 1000:8.1f} ms  {detalle}")
+
+        total = sum(segundos for _, segundos, _, _ in resultados)
+        fallidos = sum(1 for *_, error in resultados if error)
+        estilo = self.style.WARNING if fallidos else self.style.SUCCESS
+        self.stdout.write(estilo(f"Precalentamiento terminado en {total:.2f}s ({fallidos} pasos fallidos)."))
@@ -0,0 +1,151 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils import timezone
+
+from clientes.models import TrabajoImportacion
+from clientes.services.importador_excel import ErrorImportacion, importar_clientes
+from directorio_project import metricas
+
+# Mínimo de segundos entre escrituras de progreso en la BD
+INTERVALO_PROGRESO = 1.0
+# Un trabajo 'procesando' sin latido en este tiempo es de un worker caído: vuelve a la cola
+LATIDO_MAX = 10 * 60
+# Tras tantos intentos cortados se marca como fallido (p. ej. un archivo que tumba al worker)
+MAX_INTENTOS = 3
+
+
+class Latido(threading.Thread):
+    """Renueva latido_en durante todo el procesamiento (lectura del Excel incluida)."""
+
+    def __init__(self, trabajo, latido_max):
+        super().__init__(name=f"latido-importacion-{trabajo.pk}", daemon=True)
+        self.trabajo = trabajo
+        self.intervalo = latido_max / 3
+        self._parar = threading.Event()
+
+    def run(self):
+        try:
+            while not self._parar.wait(self.intervalo):
+                # Solo mientras el trabajo siga siendo de este worker
+                TrabajoImportacion.objects.filter(
+                    pk=self.trabajo.pk, estado='procesando', intentos=self.trabajo.intentos,
+                ).update(latido_en=timezone.now())
+        finally:
+            # Conexión propia del hilo
+            connection.close()
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+
+class Command(BaseCommand):
+    help = 'Worker local que procesa los trabajos de importación de Excel subidos desde la web.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los trabajos pendientes y termina.')
+        parser.add_argument('--intervalo', type=float, default=5.0, help='Segundos de espera cuando no hay trabajos.')
+        parser.add_argument('--latido-max', type=int, default=LATIDO_MAX,
+                            help='Segundos sin latido tras los que un trabajo en proceso se retoma.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE("--- Worker de importaciones iniciado ---"))
+        while True:
+            close_old_connections()
+            self.recuperar_abandonados(options['latido_max'])
+            trabajo = self.tomar_trabajo()
+            if trabajo:
+                self.procesar(trabajo, options['latido_max'])
+                continue
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+    def recuperar_abandonados(self, latido_max):
+        """Devuelve a la cola (o da por fallidos) los trabajos de workers que dejaron de latir."""
+        limite = timezone.now() - timedelta(seconds=latido_max)
+        abandonados = TrabajoImportacion.objects.filter(estado='procesando', latido_en__lt=limite)
+        fallidos = abandonados.filter(intentos__gte=MAX_INTENTOS).update(
+            estado='fallido', finalizado_en=timezone.now(),
+            errores=f"El worker se detuvo {MAX_INTENTOS} veces procesando este archivo.",
+        )
+        retomados = abandonados.update(estado='pendiente')
+        if fallidos or retomados:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Trabajos sin latido: {retomados} vuelven a la cola, {fallidos} marcados como fallidos."
+            ))
+
+    def tomar_trabajo(self):
+        """
+        Reserva el trabajo pendiente más antiguo con un UPDATE condicional,
+        así varios workers nunca procesan el mismo trabajo.
+        """
+        for pk in TrabajoImportacion.objects.filter(estado='pendiente').order_by('creado_en').values_list('pk', flat=True)[:5]:
+            ahora = timezone.now()
+            tomado = TrabajoImportacion.objects.filter(pk=pk, estado='pendiente').update(
+                estado='procesando', iniciado_en=ahora, latido_en=ahora, intentos=F('intentos') + 1,
+            )
+            if tomado:
+                return TrabajoImportacion.objects.get(pk=pk)
+        return None
+
+    def procesar(self, trabajo, latido_max=LATIDO_MAX):
+        latido = Latido(trabajo, latido_max)
+        latido.start()
+        try:
+            self.importar(trabajo)
+        finally:
+            latido.detener()
+
+    def importar(self, trabajo):
+        self.stdout.write(f"Procesando importación #{trabajo.pk} ({trabajo.archivo.name})")
+        ultimo = [0.0]
+        inicio = time.monotonic()
+
+        def progreso(procesadas, total):
+            ahora = time.monotonic()
+            if ahora - ultimo[0] < INTERVALO_PROGRESO and procesadas < total:
+                return
+            ultimo[0] = ahora
+            TrabajoImportacion.objects.filter(pk=trabajo.pk).update(procesadas=procesadas, total=total)
+
+        try:
+            resumen = importar_clientes(trabajo.archivo.path, log=lambda mensaje: None, progreso=progreso)
+        except ErrorImportacion as e:
+            metricas.importacion({}, time.monotonic() - inicio, 'fallido')
+            self.finalizar(trabajo, 'fallido', errores=str(e))
+            self.stdout.write(self.style.ERROR(f"❌ Importación #{trabajo.pk} fallida: {e}"))
+            return
+        except Exception as e:
+            metricas.importacion({}, time.monotonic() - inicio, 'fallido')
+            self.finalizar(trabajo, 'fallido', errores=f"Error inesperado: {e}")
+            self.stdout.write(self.style.ERROR(f"❌ Importación #{trabajo.pk} fallida: {e}"))
+            return
+
+        metricas.importacion(resumen, time.monotonic() - inicio, 'completado')
+        self.finalizar(
+            trabajo,
+            'completado',
+            total=resumen['total'],
+            procesadas=resumen['total'],
+            insertados=resumen['insertados'],
+            actualizados=resumen['actualizados'],
+            sin_cambios=resumen['sin_cambios'],
+            fallidos=resumen['fallidos'],
+            errores='\n'.join(resumen['errores']),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Importación #{trabajo.pk}: {resumen['insertados']} insertados, {resumen['actualizados']} actualizados, "
+            f"{resumen['sin_cambios']} sin cambios, {resumen['fallidos']} fallidos."
+        ))
+
+    def finalizar(self, trabajo, estado, **campos):
+        # Si otro worker lo retomó mientras tanto (intentos cambió), el resultado es suyo
+        TrabajoImportacion.objects.filter(pk=trabajo.pk, intentos=trabajo.intentos).update(
+            estado=estado, finalizado_en=timezone.now(), **campos
+        )
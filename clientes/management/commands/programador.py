@@ -0,0 +1,46 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from clientes.services.programador import (
+    ejecutar_tarea,
+    nombre_nodo,
+    sincronizar_tareas,
+    tareas_registradas,
+    tomar_tarea,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Programador de tareas periódicas de mantenimiento. Se ejecuta de forma continua; '
+        'un bloqueo en la BD garantiza que cada tarea la ejecute un solo nodo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--intervalo', type=float, default=30.0, help='Segundos entre revisiones de tareas vencidas.')
+        parser.add_argument('--una-vez', action='store_true', help='Ejecuta las tareas vencidas una vez y termina.')
+
+    def handle(self, *args, **options):
+        nodo = nombre_nodo()
+        self.stdout.write(self.style.NOTICE(f"--- Programador iniciado en {nodo} ---"))
+        sincronizar_tareas()
+
+        while True:
+            close_old_connections()
+            for nombre, config in tareas_registradas().items():
+                if not tomar_tarea(nombre, nodo, config.get('bloqueo', 3600)):
+                    continue
+                self.stdout.write(f"▶️ Ejecutando {nombre}...")
+                exito, duracion = ejecutar_tarea(nombre, config, nodo)
+                if exito:
+                    self.stdout.write(self.style.SUCCESS(f"✅ {nombre} terminó en {duracion:.2f}s"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"❌ {nombre} falló tras {duracion:.2f}s (ver historial de ejecuciones)"))
+
+            if options['una_vez']:
+                break
+            # Jitter para que varios nodos no consulten la BD a la vez
+            time.sleep(options['intervalo'] + random.uniform(0, options['intervalo'] / 5))
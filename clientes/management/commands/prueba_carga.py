@@ -0,0 +1,69 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clientes.services.carga import MEZCLA_POR_DEFECTO, ErrorCarga, ejecutar_carga
+
+
+def mezcla(valor):
+    """'lista=50,busqueda=25,...' -> {'lista': 50, 'busqueda': 25, ...}"""
+    resultado = {}
+    for parte in valor.split(','):
+        accion, _, peso = parte.partition('=')
+        if accion.strip() not in MEZCLA_POR_DEFECTO:
+            raise ValueError(accion)
+        resultado[accion.strip()] = float(peso)
+    return resultado
+
+
+class Command(BaseCommand):
+    help = (
+        'Prueba de carga HTTP contra una instancia en marcha: inicia sesión por accounts/login/ y mezcla '
+        'lista, búsqueda, detalle, edición y eliminación. Muestra peticiones/s y p50/p95/p99 por acción. '
+        'Arranca antes stub_estados y la instancia con STATES_API_URL apuntando al stub.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/', help='URL base de la instancia.')
+        parser.add_argument('--usuario', required=True, help='Usuario admin con el que iniciar sesión.')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--duracion', type=float, default=30.0, help='Segundos de carga.')
+        parser.add_argument('--concurrencia', type=int, default=10, help='Usuarios simultáneos (hilos).')
+        parser.add_argument('--mezcla', type=mezcla, default=None,
+                            help='Pesos por acción, p. ej. lista=50,busqueda=25,detalle=15,editar=7,eliminar=3')
+        parser.add_argument('--semilla', type=int, default=None)
+        parser.add_argument('--todos-los-clientes', action='store_true',
+                            help='Permite editar y eliminar clientes reales (por defecto solo los SYN- de generar_datos).')
+        parser.add_argument('--salida', help='Guarda el resumen en este archivo JSON.')
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.NOTICE(
+            f"--- {options['concurrencia']} usuarios durante {options['duracion']:.0f}s contra {options['url']} ---"
+        ))
+        try:
+            resumen = ejecutar_carga(
+                options['url'], options['usuario'], options['password'],
+                duracion=options['duracion'],
+                concurrencia=options['concurrencia'],
+                mezcla=options['mezcla'],
+                semilla=options['semilla'],
+                solo_sinteticos=not options['todos_los_clientes'],
+                log=self.stdout.write,
+            )
+        except ErrorCarga as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'acción':<10} {'peticiones':>10} {'errores':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for accion, datos in resumen['acciones'].items():
+            self.stdout.write(
+                f"{accion:<10} {datos['peticiones']:>10} {datos['errores']:>8} {datos['por_segundo']:>8} "
+                f"{datos['p50_ms']:>9} {datos['p95_ms']:>9} {datos['p99_ms']:>9}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {resumen['peticiones']} peticiones ({resumen['por_segundo']}/s), {resumen['errores']} errores"
+        ))
+
+        if options['salida']:
+            resumen['parametros'] = {k: options[k] for k in ('url', 'duracion', 'concurrencia', 'mezcla', 'semilla')}
+            Path(options['salida']).write_text(json.dumps(resumen, indent=2, ensure_ascii=False), encoding='utf-8')
@@ -0,0 +1,124 @@
+import json
+import os
+from datetime import datetime, timedelta
+
+import pandas as pd
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+from django.utils import timezone
+
+from clientes.models import Cliente, HistorialCliente, Lapida
+
+# Tabla -> (modelo, campo de marca de agua, columnas exportadas)
+TABLAS = {
+    'cliente': (Cliente, 'actualizado_en', [
+        'id', 'codigo_cliente', 'nombre', 'compania', 'identificacion', 'correo', 'pais', 'direccion',
+        'logo', 'activo', 'fecha_eliminacion', 'creado_por_id', 'creado_en', 'actualizado_en',
+        'huella_importacion',
+    ]),
+    'historial': (HistorialCliente, 'actualizado_en', [
+        'id', 'cliente_id', 'campo', 'valor_anterior', 'valor_nuevo', 'editado_por_id', 'fecha_edicion',
+        'actualizado_en',
+    ]),
+}
+
+# Columnas de Lapida; en <tabla>_borrados_*.parquet registro_id se escribe como id
+COLUMNAS_LAPIDA = ['id', 'registro_id', 'borrado_en']
+
+# Solo se exportan filas con la marca de agua anterior a ahora - MARGEN_SEGUNDOS:
+# las fechas de Cliente van sin microsegundos y una transacción en curso puede
+# confirmar filas con una fecha ya pasada. Así la marca (fecha, id) es exacta
+# y no hace falta releer nada en la siguiente ejecución
+MARGEN_SEGUNDOS = 5
+
+
+class Command(BaseCommand):
+    help = (
+        'Escribe snapshots incrementales en Parquet de Cliente e HistorialCliente usando '
+        'marcas de agua (actualizado_en) y lápidas con los ids borrados definitivamente desde la ejecución anterior.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--destino', default=getattr(settings, 'SNAPSHOTS_DIR', os.path.join(settings.BASE_DIR, 'snapshots')),
+                            help='Carpeta donde se guardan los archivos Parquet.')
+        parser.add_argument('--chunk', type=int, default=50000, help='Filas por archivo Parquet.')
+        parser.add_argument('--completo', action='store_true', help='Ignora las marcas de agua y exporta todo.')
+        parser.add_argument('--margen', type=int, default=MARGEN_SEGUNDOS,
+                            help='Segundos recientes que se dejan para la siguiente ejecución.')
+
+    def handle(self, *args, **options):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise CommandError("Se necesita pyarrow para escribir Parquet: pip install pyarrow")
+
+        destino = options['destino']
+        os.makedirs(destino, exist_ok=True)
+        ruta_marcas = os.path.join(destino, '_marcas_de_agua.json')
+        marcas = {} if options['completo'] else self.leer_marcas(ruta_marcas)
+        ejecucion = timezone.now().strftime('%Y%m%dT%H%M%S')
+        corte = timezone.now() - timedelta(seconds=options['margen'])
+
+        for tabla, (modelo, campo_fecha, columnas) in TABLAS.items():
+            inicio = datetime.now()
+            carpeta = os.path.join(destino, tabla)
+            os.makedirs(carpeta, exist_ok=True)
+
+            total, parte = self.exportar(
+                modelo.objects.all(), campo_fecha, columnas, tabla, carpeta, f'{tabla}_{ejecucion}',
+                marcas, ruta_marcas, corte, options['chunk'],
+            )
+            # Los borrados definitivos (purga, fusión de duplicados) dejan una
+            # Lapida al borrar: se exportan con su propia marca de agua
+            borrados, _ = self.exportar(
+                Lapida.objects.filter(tabla=tabla), 'borrado_en', COLUMNAS_LAPIDA, f'{tabla}_borrados', carpeta,
+                f'{tabla}_borrados_{ejecucion}', marcas, ruta_marcas, corte, options['chunk'],
+            )
+            segundos = (datetime.now() - inicio).total_seconds()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ {tabla}: {total} filas nuevas o modificadas en {parte} archivo(s), "
+                f"{borrados} borradas ({segundos:.2f}s)."
+            ))
+
+    def exportar(self, qs, campo_fecha, columnas, clave, carpeta, prefijo, marcas, ruta_marcas, corte, chunk):
+        """Escribe en Parquet las filas posteriores a la marca de agua `clave` y la avanza. Devuelve (filas, archivos)."""
+        marca = marcas.get(clave)
+        total = 0
+        parte = 0
+        while True:
+            lote = qs.filter(**{f'{campo_fecha}__lt': corte})
+            if marca:
+                fecha = datetime.fromisoformat(marca['fecha'])
+                # Paginación por clave (fecha, id): cada consulta es corta y usa el índice
+                lote = lote.filter(Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'id__gt': marca['id']}))
+            filas = list(lote.order_by(campo_fecha, 'id').values(*columnas)[:chunk])
+            if not filas:
+                break
+
+            df = pd.DataFrame.from_records(filas, columns=columnas)
+            if 'codigo_cliente' in df:
+                df['codigo_cliente'] = df['codigo_cliente'].astype(str)
+            if 'registro_id' in df:
+                df = df.drop(columns='id').rename(columns={'registro_id': 'id'})
+            parte += 1
+            df.to_parquet(os.path.join(carpeta, f'{prefijo}_{parte:04d}.parquet'), index=False)
+
+            ultima = filas[-1]
+            marca = {'fecha': ultima[campo_fecha].isoformat(), 'id': ultima['id']}
+            marcas[clave] = marca
+            self.escribir_marcas(ruta_marcas, marcas)
+            total += len(filas)
+        return total, parte
+
+    def leer_marcas(self, ruta):
+        if not os.path.exists(ruta):
+            return {}
+        with open(ruta, encoding='utf-8') as f:
+            return json.load(f)
+
+    def escribir_marcas(self, ruta, marcas):
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(marcas, f, indent=2)
+        os.replace(temporal, ruta)
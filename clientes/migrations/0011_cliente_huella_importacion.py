@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0010_usuariocreado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='huella_importacion',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
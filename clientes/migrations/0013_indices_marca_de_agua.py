@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0012_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['actualizado_en', 'id'], name='cliente_actualizado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialcliente',
+            index=models.Index(fields=['fecha_edicion', 'id'], name='historial_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:42
+
+from django.db import migrations, models
+from django.db.models import BigIntegerField, Case, F, Q, Value, When, Window
+from django.db.models.functions import FirstValue
+
+TAMANO_LOTE = 500
+
+
+def fusionar_duplicados_activos(apps, schema_editor):
+    """
+    La restricción no se puede crear si hay clientes activos con la misma
+    identificación. Se fusionan aquí con los modelos históricos (el código de
+    clientes/services/duplicados.py usa columnas de migraciones posteriores):
+    sobrevive el activo más reciente, recibe el historial de los demás y los
+    demás se borran. Los clientes eliminados no se tocan.
+    """
+    Cliente = apps.get_model('clientes', 'Cliente')
+    HistorialCliente = apps.get_model('clientes', 'HistorialCliente')
+    superviviente = Window(
+        expression=FirstValue('id'),
+        partition_by=[F('identificacion')],
+        order_by=[F('creado_en').desc(), F('id').desc()],
+    )
+    pares = list(
+        Cliente.objects.filter(activo=True).exclude(identificacion='')
+        .annotate(superviviente_id=superviviente)
+        .filter(~Q(id=F('superviviente_id')))
+        .values_list('id', 'superviviente_id', 'nombre')
+        .order_by('superviviente_id', 'id')
+    )
+    for i in range(0, len(pares), TAMANO_LOTE):
+        bloque = pares[i:i + TAMANO_LOTE]
+        ids = [perdedor for perdedor, _, _ in bloque]
+        HistorialCliente.objects.filter(cliente_id__in=ids).update(
+            cliente_id=Case(
+                *[When(cliente_id=perdedor, then=Value(superviviente)) for perdedor, superviviente, _ in bloque],
+                default=F('cliente_id'),
+                output_field=BigIntegerField(),
+            ),
+        )
+        HistorialCliente.objects.bulk_create([
+            HistorialCliente(
+                cliente_id=superviviente,
+                campo='fusion_duplicado',
+                valor_anterior=f"{nombre} (#{perdedor})",
+                valor_nuevo=f"#{superviviente}",
+            )
+            for perdedor, superviviente, nombre in bloque
+        ])
+        Cliente.objects.filter(pk__in=ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0013_indices_marca_de_agua'),
+    ]
+
+    operations = [
+        migrations.RunPython(fusionar_duplicados_activos, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(condition=models.Q(('activo', True), models.Q(('identificacion', ''), _negated=True)), fields=('identificacion',), name='cliente_identificacion_activa_unica', violation_error_message='Ya existe un cliente activo con esta identificación.'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0014_identificacion_activa_unica'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParSimilar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('similitud_nombre', models.FloatField(default=0)),
+                ('similitud_compania', models.FloatField(default=0)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('fusionado', 'Fusionado'), ('descartado', 'No es duplicado')], db_index=True, default='pendiente', max_length=20)),
+                ('detectado_en', models.DateTimeField(auto_now_add=True)),
+                ('cliente_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente')),
+                ('cliente_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clientes.cliente')),
+                ('revisado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-puntaje'],
+                'constraints': [models.UniqueConstraint(fields=('cliente_a', 'cliente_b'), name='par_similar_unico')],
+            },
+        ),
+    ]
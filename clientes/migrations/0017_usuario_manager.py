@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:29
+
+import clientes.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0016_tareas_programadas'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='usuario',
+            managers=[
+                ('objects', clientes.models.UsuarioManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def copiar_fecha_edicion(apps, schema_editor):
+    # Las filas existentes no han cambiado desde que se crearon
+    HistorialCliente = apps.get_model('clientes', 'HistorialCliente')
+    HistorialCliente.objects.update(actualizado_en=F('fecha_edicion'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0017_usuario_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historialcliente',
+            name='actualizado_en',
+            field=models.DateTimeField(auto_now=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_fecha_edicion, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='historialcliente',
+            index=models.Index(fields=['actualizado_en', 'id'], name='historial_actualizado_idx'),
+        ),
+    ]
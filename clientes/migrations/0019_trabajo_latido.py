@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0018_historial_actualizado_en'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='latido_en',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
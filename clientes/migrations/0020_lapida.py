@@ -0,0 +1,26 @@
+# Generated by Django 5.2.7 on 2026-10-19 19:52
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0019_trabajo_latido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Lapida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tabla', models.CharField(choices=[('cliente', 'Cliente'), ('historial', 'Historial de cliente')], max_length=20)),
+                ('registro_id', models.BigIntegerField()),
+                ('borrado_en', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['borrado_en', 'id'], name='lapida_borrado_idx')],
+            },
+        ),
+    ]
@@ -1,15 +1,31 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 import uuid
 from django.db.models.fields.files import FieldFile
 from django.utils import timezone
 import pytz
 import os
 from django.conf import settings
+from django.core.files.storage import default_storage
 
 # -------------------------------
 # Usuario personalizado
 # -------------------------------
+class UsuarioQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # update() no emite post_save: se invalida aquí el usuario en caché
+        # (backends.UsuarioCacheadoBackend) de cada fila afectada
+        from .backends import invalidar_usuarios_cacheados
+        pks = list(self.values_list('pk', flat=True))
+        filas = super().update(**kwargs)
+        invalidar_usuarios_cacheados(pks)
+        return filas
+
+
+class UsuarioManager(UserManager.from_queryset(UsuarioQuerySet)):
+    pass
+
+
 class Usuario(AbstractUser):
     ROLES = (
         ('usuario', 'Usuario'),
@@ -18,9 +34,47 @@ class Usuario(AbstractUser):
     )
     rol = models.CharField(max_length=20, choices=ROLES, default='usuario')
 
+    objects = UsuarioManager()
+
     def __str__(self):
         return f"{self.username} ({self.get_rol_display()})"
 
+def formatear_fecha(fecha):
+    """Fecha en formato colombiano: DD-MM-YYYY, HH:MM AM/PM"""
+    if not fecha:
+        return None
+    colombia_tz = pytz.timezone('America/Bogota')
+    return timezone.localtime(fecha, colombia_tz).strftime('%d-%m-%Y, %I:%M %p')
+
+
+def url_logo(logo, identificacion):
+    """
+    URL del logo a partir del nombre guardado en el ImageField.
+    Si no hay logo cargado, busca un archivo en media/logos con el
+    identificador del cliente y extensiones comunes.
+    """
+    if logo:
+        try:
+            return default_storage.url(logo)
+        except Exception:
+            pass
+
+    if not identificacion:
+        return None
+
+    posibles_ext = ('.png', '.jpg', '.jpeg', '.webp')
+    for ext in posibles_ext:
+        disco_path = os.path.join(settings.MEDIA_ROOT, 'logos', f"{identificacion}{ext}")
+        if os.path.exists(disco_path):
+            return settings.MEDIA_URL + f"logos/{identificacion}{ext}"
+    return None
+
+
+class ClientesActivosManager(models.Manager):
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
 # -------------------------------
 # Cliente
 # -------------------------------
@@ -44,25 +98,38 @@ class Cliente(models.Model):
     )
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
+    # Huella (sha256) de la última fila de Excel importada para este cliente
+    huella_importacion = models.CharField(max_length=64, blank=True, null=True, editable=False)
+
+    # objects sigue siendo el manager por defecto (admin, relaciones, eliminados)
+    objects = models.Manager()
+    activos = ClientesActivosManager()
+
+    class Meta:
+        indexes = [
+            # Marca de agua de snapshot_directorio
+            models.Index(fields=['actualizado_en', 'id'], name='cliente_actualizado_idx'),
+        ]
+        constraints = [
+            # Solo puede haber un cliente activo por identificación (limpiar_duplicados)
+            models.UniqueConstraint(
+                fields=['identificacion'],
+                condition=models.Q(activo=True) & ~models.Q(identificacion=''),
+                name='cliente_identificacion_activa_unica',
+                violation_error_message='Ya existe un cliente activo con esta identificación.',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nombre} ({self.compania})"
 
     @property
     def fecha_eliminacion_formateada(self):
-        if self.fecha_eliminacion:
-            colombia_tz = pytz.timezone('America/Bogota')
-            fecha_colombia = timezone.localtime(self.fecha_eliminacion, colombia_tz)
-            return fecha_colombia.strftime('%d-%m-%Y, %I:%M %p')
-        return None
+        return formatear_fecha(self.fecha_eliminacion)
 
     @property
     def actualizado_en_formateado(self):
-        if self.actualizado_en:
-            colombia_tz = pytz.timezone('America/Bogota')
-            fecha_colombia = timezone.localtime(self.actualizado_en, colombia_tz)
-            return fecha_colombia.strftime('%d-%m-%Y, %I:%M %p')
-        return None
+        return formatear_fecha(self.actualizado_en)
 
     @property
     def google_maps_link(self):
@@ -81,23 +148,7 @@ class Cliente(models.Model):
         Si no hay logo cargado, intenta buscar un archivo en media/logos
         con el identificador del cliente y extensiones comunes.
         """
-        try:
-            if self.logo and hasattr(self.logo, 'url') and self.logo.url:
-                return self.logo.url
-        except Exception:
-            # Si el archivo referenciado no existe en disco, continuamos con el fallback
-            pass
-
-        # Fallback: buscar por identificacion en media/logos
-        if not self.identificacion:
-            return None
-
-        posibles_ext = ('.png', '.jpg', '.jpeg', '.webp')
-        for ext in posibles_ext:
-            disco_path = os.path.join(settings.MEDIA_ROOT, 'logos', f"{self.identificacion}{ext}")
-            if os.path.exists(disco_path):
-                return settings.MEDIA_URL + f"logos/{self.identificacion}{ext}"
-        return None
+        return url_logo(self.logo.name if self.logo else None, self.identificacion)
 
     def save(self, *args, usuario=None, **kwargs):
         """
@@ -118,7 +169,7 @@ class Cliente(models.Model):
             cambios = []
 
             # Campos que no queremos en historial
-            campos_ignorar = ['creado_en', 'actualizado_en', 'activo']
+            campos_ignorar = ['creado_en', 'actualizado_en', 'activo', 'huella_importacion']
 
             for field in self._meta.fields:
                 field_name = field.name
@@ -171,6 +222,15 @@ class HistorialCliente(models.Model):
         null=True
     )
     fecha_edicion = models.DateTimeField(auto_now_add=True)
+    # Cambia también con los UPDATE masivos (fusión de duplicados): marca de agua de snapshot_directorio
+    actualizado_en = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['fecha_edicion', 'id'], name='historial_fecha_idx'),
+            # Marca de agua de snapshot_directorio
+            models.Index(fields=['actualizado_en', 'id'], name='historial_actualizado_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # 🔹 Elimina microsegundos antes de guardar
@@ -210,3 +270,129 @@ class UsuarioCreado(models.Model):
     def __str__(self):
         creador = self.creador.username if self.creador else 'desconocido'
         return f"{self.usuario.username} creado por {creador}"
+
+
+# -------------------------------
+# Trabajos de importación desde Excel (procesados por un worker)
+# -------------------------------
+class TrabajoImportacion(models.Model):
+    ESTADOS = (
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    )
+    archivo = models.FileField(upload_to='importaciones/')
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', db_index=True)
+    creado_por = models.ForeignKey(
+        Usuario,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='importaciones'
+    )
+    creado_en = models.DateTimeField(auto_now_add=True)
+    iniciado_en = models.DateTimeField(null=True, blank=True)
+    # Lo renueva el worker con cada avance: si deja de latir, el trabajo se retoma
+    latido_en = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    finalizado_en = models.DateTimeField(null=True, blank=True)
+    total = models.PositiveIntegerField(default=0)
+    procesadas = models.PositiveIntegerField(default=0)
+    insertados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    sin_cambios = models.PositiveIntegerField(default=0)
+    fallidos = models.PositiveIntegerField(default=0)
+    errores = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-creado_en']
+
+    def __str__(self):
+        return f"Importación #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def porcentaje(self):
+        if not self.total:
+            return 100 if self.estado == 'completado' else 0
+        return int(self.procesadas * 100 / self.total)
+
+
+# -------------------------------
+# Posibles duplicados detectados por similitud (detectar_similares)
+# -------------------------------
+class ParSimilar(models.Model):
+    ESTADOS = (
+        ('pendiente', 'Pendiente'),
+        ('fusionado', 'Fusionado'),
+        ('descartado', 'No es duplicado'),
+    )
+    cliente_a = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='+')
+    cliente_b = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='+')
+    puntaje = models.FloatField()
+    similitud_nombre = models.FloatField(default=0)
+    similitud_compania = models.FloatField(default=0)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default='pendiente', db_index=True)
+    detectado_en = models.DateTimeField(auto_now_add=True)
+    revisado_por = models.ForeignKey(Usuario, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    class Meta:
+        ordering = ['-puntaje']
+        constraints = [
+            models.UniqueConstraint(fields=['cliente_a', 'cliente_b'], name='par_similar_unico'),
+        ]
+
+    def __str__(self):
+        return f"#{self.cliente_a_id} ~ #{self.cliente_b_id} ({self.puntaje:.2f})"
+
+
+# -------------------------------
+# Programador de tareas periódicas (comando programador)
+# -------------------------------
+class TareaProgramada(models.Model):
+    nombre = models.CharField(max_length=100, unique=True)
+    proxima_ejecucion = models.DateTimeField(default=timezone.now)
+    # Bloqueo con vencimiento: si un nodo muere, otro retoma la tarea al vencer
+    bloqueado_hasta = models.DateTimeField(null=True, blank=True)
+    bloqueado_por = models.CharField(max_length=255, blank=True, default='')
+    ultima_ejecucion = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.nombre
+
+
+class EjecucionTarea(models.Model):
+    tarea = models.ForeignKey(TareaProgramada, on_delete=models.CASCADE, related_name='ejecuciones')
+    nodo = models.CharField(max_length=255)
+    inicio = models.DateTimeField()
+    fin = models.DateTimeField()
+    duracion = models.FloatField(help_text='Segundos')
+    exito = models.BooleanField(default=True)
+    salida = models.TextField(blank=True, default='')
+
+    class Meta:
+        ordering = ['-inicio']
+
+    def __str__(self):
+        return f"{self.tarea.nombre} @ {self.inicio:%Y-%m-%d %H:%M} ({'ok' if self.exito else 'error'})"
+
+
+# -------------------------------
+# Lápidas: ids borrados definitivamente (purga, fusión de duplicados)
+# -------------------------------
+class Lapida(models.Model):
+    """snapshot_directorio las exporta con su propia marca de agua (borrado_en, id)."""
+    TABLAS = (
+        ('cliente', 'Cliente'),
+        ('historial', 'Historial de cliente'),
+    )
+    tabla = models.CharField(max_length=20, choices=TABLAS)
+    registro_id = models.BigIntegerField()
+    borrado_en = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['borrado_en', 'id'], name='lapida_borrado_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tabla} #{self.registro_id} borrado el {self.borrado_en:%Y-%m-%d %H:%M}"
@@ -0,0 +1,23 @@
+# -----------------------------
+# Evaluación de roles centralizada
+# -----------------------------
+ROLES_ADMIN = ('admin', 'superadmin')
+
+
+def tiene_rol(user, roles=ROLES_ADMIN):
+    """
+    True si el usuario es superusuario o su rol está en roles.
+    El resultado se memoriza en el objeto usuario, que vive lo mismo que
+    la petición: el decorador, la vista y sus comprobaciones no repiten la evaluación.
+    """
+    if not user.is_authenticated:
+        return False
+    memo = user.__dict__.setdefault('_permisos_memo', {})
+    clave = tuple(roles)
+    if clave not in memo:
+        memo[clave] = user.is_superuser or user.rol in clave
+    return memo[clave]
+
+
+def es_admin(user):
+    return tiene_rol(user, ROLES_ADMIN)
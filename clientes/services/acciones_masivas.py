@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import Cliente, HistorialCliente
+
+# Máximo de clientes por acción masiva (acota el tamaño del IN y de la transacción).
+# Una selección mayor se rechaza entera: nunca se aplica solo a una parte
+MAX_SELECCION = 5000
+
+
+def _comprobar_seleccion(ids):
+    ids = list(ids)
+    if len(ids) > MAX_SELECCION:
+        raise ValueError(f"La selección tiene {len(ids)} clientes; el máximo por acción es {MAX_SELECCION}.")
+    return ids
+
+
+def _texto_fecha(fecha):
+    # Mismo formato que usa Cliente.save() al registrar el historial
+    return str(fecha) if fecha is not None else ''
+
+
+def eliminar_clientes(ids, usuario):
+    """
+    Marca como eliminados los clientes activos indicados con un solo
+    UPDATE ... WHERE id IN (...) y registra el historial en un bulk_create.
+    Devuelve el número de clientes eliminados.
+    """
+    ahora = timezone.now().replace(microsecond=0)
+    with transaction.atomic():
+        qs = Cliente.objects.select_for_update().filter(pk__in=_comprobar_seleccion(ids), activo=True)
+        anteriores = list(qs.values_list('id', 'fecha_eliminacion'))
+        if not anteriores:
+            return 0
+        Cliente.objects.filter(pk__in=[pk for pk, _ in anteriores]).update(
+            activo=False, fecha_eliminacion=ahora, actualizado_en=ahora,
+        )
+        HistorialCliente.objects.bulk_create([
+            HistorialCliente(
+                cliente_id=pk, campo='fecha_eliminacion',
+                valor_anterior=_texto_fecha(anterior), valor_nuevo=_texto_fecha(ahora),
+                editado_por=usuario, fecha_edicion=ahora,
+            )
+            for pk, anterior in anteriores
+        ], batch_size=500)
+    return len(anteriores)
+
+
+def restaurar_clientes(ids, usuario):
+    """
+    Restaura los clientes eliminados indicados con un solo UPDATE.
+    Se omiten los que chocarían con la restricción de identificación activa
+    única: los que ya tienen un cliente activo con la misma identificación y,
+    si se seleccionan varios con la misma, todos menos el eliminado más reciente.
+    Devuelve (restaurados, omitidos).
+    """
+    ahora = timezone.now().replace(microsecond=0)
+    with transaction.atomic():
+        candidatos = list(
+            Cliente.objects.select_for_update()
+            .filter(pk__in=_comprobar_seleccion(ids), activo=False)
+            .order_by('-fecha_eliminacion', '-id')
+            .values_list('id', 'identificacion', 'fecha_eliminacion')
+        )
+        identificaciones = {ident for _, ident, _ in candidatos if ident}
+        ocupadas = set(
+            Cliente.activos.filter(identificacion__in=identificaciones)
+            .values_list('identificacion', flat=True)
+        )
+        restaurar = []
+        for pk, ident, fecha in candidatos:
+            if ident:
+                if ident in ocupadas:
+                    continue
+                ocupadas.add(ident)
+            restaurar.append((pk, fecha))
+
+        if restaurar:
+            Cliente.objects.filter(pk__in=[pk for pk, _ in restaurar]).update(
+                activo=True, fecha_eliminacion=None, actualizado_en=ahora,
+            )
+            HistorialCliente.objects.bulk_create([
+                HistorialCliente(
+                    cliente_id=pk, campo='fecha_eliminacion',
+                    valor_anterior=_texto_fecha(fecha), valor_nuevo='',
+                    editado_por=usuario, fecha_edicion=ahora,
+                )
+                for pk, fecha in restaurar
+            ], batch_size=500)
+    return len(restaurar), len(candidatos) - len(restaurar)
@@ -0,0 +1,100 @@
+import csv
+import io
+import os
+
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from clientes.models import Usuario, UsuarioCreado
+from clientes.services.hash_paralelo import hashear_passwords
+
+COLUMNAS_OBLIGATORIAS = ('username', 'password')
+ROLES_VALIDOS = {codigo for codigo, _ in Usuario.ROLES}
+
+
+class ErrorAltaUsuarios(Exception):
+    pass
+
+
+def leer_csv(archivo):
+    """
+    Lee un CSV (ruta, archivo de texto o subido) con columnas
+    username,password y opcionalmente email,rol.
+    """
+    if isinstance(archivo, (str, os.PathLike)):
+        with open(archivo, encoding='utf-8-sig', newline='') as f:
+            return leer_csv(f)
+    contenido = archivo.read()
+    if isinstance(contenido, bytes):
+        contenido = contenido.decode('utf-8-sig')
+    lector = csv.DictReader(io.StringIO(contenido))
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in (lector.fieldnames or [])]
+    if faltantes:
+        raise ErrorAltaUsuarios(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+    return [
+        {
+            'username': (fila.get('username') or '').strip(),
+            'email': (fila.get('email') or '').strip(),
+            'password': fila.get('password') or '',
+            'rol': (fila.get('rol') or 'usuario').strip().lower(),
+        }
+        for fila in lector
+    ]
+
+
+def validar_filas(filas, permitir_roles=True):
+    """
+    Devuelve la lista de errores ("Fila N: ...") sin tocar la BD más que
+    para una consulta de usernames existentes.
+    Con permitir_roles=False todas las filas se crean con rol 'usuario'.
+    """
+    errores = []
+    vistos = set()
+    existentes = set(
+        Usuario.objects.filter(username__in=[f['username'] for f in filas]).values_list('username', flat=True)
+    )
+    for n, fila in enumerate(filas, start=2):  # fila 1 = encabezado
+        if not permitir_roles:
+            fila['rol'] = 'usuario'
+        usuario = Usuario(username=fila['username'], email=fila['email'])
+        if not fila['username']:
+            errores.append(f"Fila {n}: falta el username.")
+            continue
+        if fila['username'] in vistos:
+            errores.append(f"Fila {n}: '{fila['username']}' está repetido en el archivo.")
+        elif fila['username'] in existentes:
+            errores.append(f"Fila {n}: el usuario '{fila['username']}' ya existe.")
+        vistos.add(fila['username'])
+        if fila['rol'] not in ROLES_VALIDOS:
+            errores.append(f"Fila {n}: rol '{fila['rol']}' no válido.")
+        if fila['email']:
+            try:
+                validate_email(fila['email'])
+            except ValidationError:
+                errores.append(f"Fila {n}: correo '{fila['email']}' no válido.")
+        try:
+            validate_password(fila['password'], usuario)
+        except ValidationError as e:
+            errores.append(f"Fila {n}: {' '.join(e.messages)}")
+    return errores
+
+
+def crear_usuarios(filas, creador=None, procesos=None):
+    """
+    Crea los usuarios (ya validados) y sus registros UsuarioCreado con
+    bulk_create en una sola transacción. Devuelve los usuarios creados.
+    """
+    hashes = hashear_passwords([f['password'] for f in filas], procesos)
+    usuarios = [
+        Usuario(username=f['username'], email=f['email'], rol=f['rol'], password=h)
+        for f, h in zip(filas, hashes)
+    ]
+    with transaction.atomic():
+        usuarios = Usuario.objects.bulk_create(usuarios, batch_size=500)
+        UsuarioCreado.objects.bulk_create(
+            [UsuarioCreado(creador=creador, usuario=u) for u in usuarios],
+            batch_size=500,
+        )
+    return usuarios
@@ -0,0 +1,113 @@
+"""
+Medición del arranque: cuánto tarda un proceso limpio en tener Django listo
+(settings, apps, URLconf con vistas y admin) y qué módulos se lo llevan.
+
+Se mide en un subproceso con `python -X importtime`, porque en el proceso
+actual todo está ya importado. Lo usan el comando `perfil_arranque` y la
+prueba de presupuesto de arranque.
+"""
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+
+# Lo mismo que hace un worker antes de su primera petición: cargar wsgi.py
+# (django.setup() y sus ganchos) y resolver la URLconf
+CODIGO_ARRANQUE = (
+    "import time; inicio = time.perf_counter(); "
+    "import directorio_project.wsgi; "
+    "from django.urls import get_resolver; get_resolver().url_patterns; "
+    "print(time.perf_counter() - inicio)"
+)
+
+# Integraciones que solo se cargan al usarse: no deben aparecer al arrancar
+# (paquetes completos o módulos concretos, como django.test)
+MODULOS_DIFERIDOS = (
+    'resend', 'dotenv', 'requests', 'httpx', 'openpyxl', 'pandas', 'numpy', 'PIL', 'pyarrow', 'django.test',
+)
+
+
+class Importacion:
+    __slots__ = ('modulo', 'propio_us', 'acumulado_us', 'nivel', 'importado_por')
+
+    def __init__(self, modulo, propio_us, acumulado_us, nivel):
+        self.modulo = modulo
+        self.propio_us = propio_us
+        self.acumulado_us = acumulado_us
+        self.nivel = nivel
+        self.importado_por = None
+
+    @property
+    def paquete(self):
+        return self.modulo.split('.', 1)[0]
+
+
+def medir(settings_module=None):
+    """Arranca Django en un proceso nuevo. Devuelve (segundos, [Importacion])."""
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module or settings.SETTINGS_MODULE}
+    proceso = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', CODIGO_ARRANQUE],
+        cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"El arranque falló:\n{proceso.stderr[-2000:]}")
+    segundos = float(proceso.stdout.strip().splitlines()[-1])
+    return segundos, leer_importtime(proceso.stderr)
+
+
+def medir_varias(repeticiones=3, settings_module=None):
+    """
+    Repite la medición (la primera puede pagar la compilación de .pyc o el
+    disco frío). Devuelve ([segundos...], importaciones de la última).
+    """
+    tiempos, importaciones = [], []
+    for _ in range(repeticiones):
+        segundos, importaciones = medir(settings_module)
+        tiempos.append(segundos)
+    return tiempos, importaciones
+
+
+def leer_importtime(salida):
+    """
+    Interpreta la salida de -X importtime ("import time: propio | acumulado | módulo",
+    con dos espacios de sangría por nivel). Cada módulo aparece después de los
+    que importa, así que recorriéndola al revés se sabe quién lo importó.
+    """
+    importaciones = []
+    for linea in salida.splitlines():
+        if not linea.startswith('import time:'):
+            continue
+        propio, acumulado, nombre = linea[len('import time:'):].split('|')
+        if not propio.strip().isdigit():
+            continue  # cabecera
+        modulo = nombre.strip()
+        nivel = (len(nombre) - len(nombre.lstrip()) - 1) // 2
+        importaciones.append(Importacion(modulo, int(propio), int(acumulado), nivel))
+
+    ultimo_por_nivel = {}
+    for importacion in reversed(importaciones):
+        importacion.importado_por = ultimo_por_nivel.get(importacion.nivel - 1)
+        ultimo_por_nivel[importacion.nivel] = importacion.modulo
+    return importaciones
+
+
+def por_paquete(importaciones):
+    """[(paquete, microsegundos propios, módulos)] de mayor a menor."""
+    totales = defaultdict(lambda: [0, 0])
+    for importacion in importaciones:
+        totales[importacion.paquete][0] += importacion.propio_us
+        totales[importacion.paquete][1] += 1
+    return sorted(((p, us, n) for p, (us, n) in totales.items()), key=lambda t: t[1], reverse=True)
+
+
+def diferidos_cargados(importaciones):
+    """Los MODULOS_DIFERIDOS que aparecen en una medición (deberían ser ninguno)."""
+    nombres = {n for i in importaciones for n in (i.paquete, i.modulo)}
+    return sorted(nombres & set(MODULOS_DIFERIDOS))
+
+
+def mediana_ms(tiempos):
+    return statistics.median(tiempos) * 1000
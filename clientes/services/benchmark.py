@@ -0,0 +1,129 @@
+import statistics
+import time
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.core.signals import request_finished, request_started
+
+from clientes.models import Cliente
+from clientes.services.listado import CAMPOS_LISTA, FilaCliente, proyectar_pagina
+
+# Pruebas registradas, en orden de ejecución: (nombre, función, destructiva)
+PRUEBAS = []
+
+
+def prueba(destructiva=False):
+    def registrar(funcion):
+        PRUEBAS.append((funcion.__name__, funcion, destructiva))
+        return funcion
+    return registrar
+
+
+def resumen(tiempos, operaciones=1):
+    """Estadísticas en milisegundos de una lista de duraciones en segundos."""
+    ordenados = sorted(tiempos)
+    mediana = statistics.median(ordenados)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {
+        'repeticiones': len(tiempos),
+        'operaciones_por_repeticion': operaciones,
+        'min_ms': round(ordenados[0] * 1000, 3),
+        'mediana_ms': round(mediana * 1000, 3),
+        'p95_ms': round(p95 * 1000, 3),
+        'max_ms': round(ordenados[-1] * 1000, 3),
+        'ops_por_segundo': round(operaciones / mediana, 1) if mediana else None,
+    }
+
+
+def cronometrar(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def _pagina_lista(query, search_field='all', pagina=1):
+    # Mismo camino que lista_clientes, sin la llamada a la API de estados
+    from clientes.views import filtrar_clientes
+    qs = filtrar_clientes(Cliente.activos.all(), query, search_field).values_list(*CAMPOS_LISTA)
+    page_obj = Paginator(qs, 6).get_page(pagina)
+    return proyectar_pagina(page_obj)
+
+
+@prueba()
+def lista_sin_busqueda(repeticiones):
+    return resumen(cronometrar(lambda: _pagina_lista(''), repeticiones))
+
+
+@prueba()
+def lista_ultima_pagina(repeticiones):
+    return resumen(cronometrar(lambda: _pagina_lista('', pagina='last'), repeticiones))
+
+
+@prueba()
+def busqueda_comun(repeticiones):
+    return resumen(cronometrar(lambda: _pagina_lista('acme'), repeticiones))
+
+
+@prueba()
+def busqueda_sin_resultados(repeticiones):
+    return resumen(cronometrar(lambda: _pagina_lista('zzzz-no-existe'), repeticiones))
+
+
+@prueba()
+def busqueda_por_identificacion(repeticiones):
+    return resumen(cronometrar(lambda: _pagina_lista('0000', 'identificacion'), repeticiones))
+
+
+@prueba()
+def cliente_save_historial(repeticiones):
+    """Cliente.save con un campo cambiado: SELECT del original, diff e INSERT de historial."""
+    pks = list(Cliente.activos.order_by('pk').values_list('pk', flat=True)[:repeticiones])
+    clientes = {c.pk: c for c in Cliente.objects.filter(pk__in=pks)}
+    tiempos = []
+    for n, pk in enumerate(pks):
+        cliente = clientes[pk]
+        cliente.nombre = f"{cliente.nombre[:80]} {n}"
+        inicio = time.perf_counter()
+        cliente.save()
+        tiempos.append(time.perf_counter() - inicio)
+    return resumen(tiempos)
+
+
+@prueba()
+def logo_url_modelo(repeticiones):
+    """Cliente.logo_url sobre 1000 instancias (con y sin logo: el fallback hace stat en disco)."""
+    clientes = list(Cliente.objects.order_by('pk')[:1000])
+    return resumen(cronometrar(lambda: [c.logo_url for c in clientes], repeticiones), len(clientes))
+
+
+@prueba()
+def proyeccion_filas(repeticiones):
+    """FilaCliente (logo_url y etiqueta de estado precalculados; las fechas las formatea la plantilla) sobre 1000 filas."""
+    filas = list(Cliente.objects.order_by('pk').values_list(*CAMPOS_LISTA)[:1000])
+    return resumen(cronometrar(lambda: [FilaCliente(f, {}) for f in filas], repeticiones), len(filas))
+
+
+@prueba()
+def conexion_por_peticion(repeticiones):
+    """
+    Ciclo de conexión de una petición corta con la configuración actual
+    (CONN_MAX_AGE, health checks, pool): request_started, una consulta y
+    request_finished, que es cuando Django cierra o devuelve la conexión.
+    """
+    def peticion():
+        request_started.send(sender=None)
+        Cliente.activos.filter(pk=0).exists()
+        request_finished.send(sender=None)
+    return resumen(cronometrar(peticion, repeticiones))
+
+
+@prueba(destructiva=True)
+def purga_eliminados(repeticiones):
+    """limpiar_clientes_eliminados sobre los eliminados fuera de la retención (una sola vez)."""
+    pendientes = Cliente.objects.filter(activo=False).count()
+    tiempos = cronometrar(lambda: call_command('limpiar_clientes_eliminados', stdout=StringIO()), 1)
+    return resumen(tiempos, pendientes)
@@ -0,0 +1,236 @@
+"""
+Generador de carga HTTP contra una instancia en marcha (runserver, gunicorn...).
+
+Cada hilo inicia sesión por accounts/login/ y repite una mezcla ponderada de
+acciones (lista, búsqueda, detalle, edición y eliminación), midiendo la
+latencia de cada una. No usa el ORM: solo habla HTTP con la instancia.
+"""
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+
+MEZCLA_POR_DEFECTO = {'lista': 50, 'busqueda': 25, 'detalle': 15, 'editar': 7, 'eliminar': 3}
+TERMINOS_BUSQUEDA = ['acme', 'roofing', 'global', 'garcía', 'solar', 'sierra', 'ana', 'luis', 'llc', 'zzz']
+ENLACE_DETALLE = re.compile(r'/clientes/(\d+)/')
+
+
+class ErrorCarga(Exception):
+    pass
+
+
+class ExtractorFormulario(HTMLParser):
+    """Extrae los campos (input y select) de un formulario, como los enviaría el navegador."""
+
+    def __init__(self, form_id=None):
+        super().__init__()
+        self.form_id = form_id
+        self.dentro = form_id is None
+        self.campos = {}
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == 'form' and self.form_id is not None:
+            self.dentro = attrs.get('id') == self.form_id
+        if not self.dentro:
+            return
+        nombre = attrs.get('name')
+        if tag == 'input' and nombre and attrs.get('type') not in ('file', 'submit', 'checkbox'):
+            self.campos[nombre] = attrs.get('value') or ''
+        elif tag == 'select' and nombre:
+            self._select = nombre
+            self.campos.setdefault(nombre, '')
+        elif tag == 'option' and self._select and 'selected' in attrs:
+            self.campos[self._select] = attrs.get('value') or ''
+
+    def handle_endtag(self, tag):
+        if tag == 'select':
+            self._select = None
+        elif tag == 'form' and self.form_id is not None:
+            self.dentro = False
+
+
+def extraer_formulario(html, form_id=None):
+    extractor = ExtractorFormulario(form_id)
+    extractor.feed(html)
+    return extractor.campos
+
+
+def percentil(ordenados, p):
+    """Percentil por rango más cercano sobre una lista ya ordenada."""
+    if not ordenados:
+        return None
+    indice = max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados) + 0.5)) - 1))
+    return ordenados[indice]
+
+
+class Registro:
+    """Latencias y errores por acción, compartidos entre hilos."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencias = defaultdict(list)
+        self.errores = defaultdict(int)
+
+    def anotar(self, accion, segundos, ok):
+        with self._lock:
+            self.latencias[accion].append(segundos)
+            if not ok:
+                self.errores[accion] += 1
+
+    def resumen(self, duracion):
+        acciones = {}
+        for accion, tiempos in sorted(self.latencias.items()):
+            ordenados = sorted(tiempos)
+            acciones[accion] = {
+                'peticiones': len(ordenados),
+                'errores': self.errores[accion],
+                'por_segundo': round(len(ordenados) / duracion, 2),
+                'p50_ms': round(percentil(ordenados, 50) * 1000, 1),
+                'p95_ms': round(percentil(ordenados, 95) * 1000, 1),
+                'p99_ms': round(percentil(ordenados, 99) * 1000, 1),
+                'max_ms': round(ordenados[-1] * 1000, 1),
+            }
+        total = sum(a['peticiones'] for a in acciones.values())
+        return {
+            'duracion_s': round(duracion, 2),
+            'peticiones': total,
+            'errores': sum(a['errores'] for a in acciones.values()),
+            'por_segundo': round(total / duracion, 2) if duracion else None,
+            'acciones': acciones,
+        }
+
+
+class Visitante:
+    """Un usuario simulado con su propia sesión HTTP."""
+
+    def __init__(self, base_url, registro, clientes, rng, solo_sinteticos=True, timeout=30):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.registro = registro
+        self.clientes = clientes  # pks vistos en las páginas, compartidos entre visitantes
+        self.rng = rng
+        self.solo_sinteticos = solo_sinteticos
+        self.timeout = timeout
+        self.sesion = requests.Session()
+
+    def url(self, ruta):
+        return urljoin(self.base_url, ruta.lstrip('/'))
+
+    def _medir(self, accion, metodo, ruta, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.sesion.request(metodo, self.url(ruta), timeout=self.timeout, **kwargs)
+            ok = respuesta.status_code < 400
+        except requests.RequestException:
+            respuesta, ok = None, False
+        self.registro.anotar(accion, time.perf_counter() - inicio, ok)
+        return respuesta
+
+    def _csrf(self):
+        return self.sesion.cookies.get('csrftoken', '')
+
+    def iniciar_sesion(self, usuario, password):
+        self.sesion.get(self.url('accounts/login/'), timeout=self.timeout)
+        respuesta = self._medir('login', 'post', 'accounts/login/', data={
+            'username': usuario, 'password': password, 'csrfmiddlewaretoken': self._csrf(),
+        }, headers={'Referer': self.url('accounts/login/')}, allow_redirects=False)
+        if respuesta is None or 'sessionid' not in self.sesion.cookies:
+            raise ErrorCarga(f"No se pudo iniciar sesión como '{usuario}'.")
+
+    def _recordar_clientes(self, respuesta):
+        if respuesta is not None and respuesta.ok:
+            self.clientes.update(int(pk) for pk in ENLACE_DETALLE.findall(respuesta.text))
+
+    def _cliente_al_azar(self):
+        pks = tuple(self.clientes)
+        return self.rng.choice(pks) if pks else None
+
+    # -----------------------------
+    # Acciones
+    # -----------------------------
+    def lista(self):
+        self._recordar_clientes(self._medir('lista', 'get', '', params={'page': self.rng.randint(1, 20)}))
+
+    def busqueda(self):
+        termino = self.rng.choice(TERMINOS_BUSQUEDA)
+        self._recordar_clientes(self._medir('busqueda', 'get', '', params={'q': termino, 'field': 'all'}))
+
+    def detalle(self, pk=None):
+        pk = pk or self._cliente_al_azar()
+        if pk is None:
+            return self.lista()
+        return self._medir('detalle', 'get', f'clientes/{pk}/')
+
+    def _formulario_editable(self):
+        """Abre el detalle de un cliente y devuelve (pk, campos) si se puede modificar."""
+        pk = self._cliente_al_azar()
+        if pk is None:
+            return None, None
+        respuesta = self.detalle(pk)
+        if respuesta is None or not respuesta.ok:
+            return None, None
+        campos = extraer_formulario(respuesta.text, 'clienteForm')
+        if not campos or (self.solo_sinteticos and not campos.get('identificacion', '').startswith('SYN-')):
+            return None, None
+        return pk, campos
+
+    def editar(self):
+        pk, campos = self._formulario_editable()
+        if pk is None:
+            return
+        campos['nombre'] = f"{campos.get('nombre', '')[:80].rsplit(' #', 1)[0]} #{self.rng.randint(1, 9999)}"
+        self._medir('editar', 'post', f'clientes/{pk}/', data=campos,
+                    headers={'Referer': self.url(f'clientes/{pk}/')}, allow_redirects=False)
+
+    def eliminar(self):
+        pk, campos = self._formulario_editable()
+        if pk is None:
+            return
+        self._medir('eliminar', 'post', f'eliminar/{pk}/', data={
+            'csrfmiddlewaretoken': self._csrf(), 'confirmacion': 'eliminar',
+        }, headers={'Referer': self.url('')}, allow_redirects=False)
+        self.clientes.discard(pk)
+
+
+def ejecutar_carga(base_url, usuario, password, duracion=30.0, concurrencia=10, mezcla=None,
+                   semilla=None, solo_sinteticos=True, log=print):
+    """
+    Lanza `concurrencia` visitantes durante `duracion` segundos y devuelve el
+    resumen con peticiones por segundo y p50/p95/p99 por acción.
+    """
+    mezcla = mezcla or MEZCLA_POR_DEFECTO
+    acciones, pesos = zip(*mezcla.items())
+    registro = Registro()
+    clientes = set()
+    fin = [None]
+    errores_hilos = []
+
+    def trabajar(n):
+        rng = random.Random(None if semilla is None else semilla + n)
+        visitante = Visitante(base_url, registro, clientes, rng, solo_sinteticos)
+        try:
+            visitante.iniciar_sesion(usuario, password)
+            visitante.lista()
+            while time.monotonic() < fin[0]:
+                getattr(visitante, rng.choices(acciones, pesos)[0])()
+        except ErrorCarga as e:
+            errores_hilos.append(str(e))
+
+    inicio = time.monotonic()
+    fin[0] = inicio + duracion
+    hilos = [threading.Thread(target=trabajar, args=(n,), daemon=True) for n in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    if errores_hilos and len(errores_hilos) == concurrencia:
+        raise ErrorCarga(errores_hilos[0])
+    for error in set(errores_hilos):
+        log(f"⚠️ {error}")
+    return registro.resumen(time.monotonic() - inicio)
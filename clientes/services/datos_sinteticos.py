@@ -0,0 +1,103 @@
+import io
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from clientes.models import Cliente, HistorialCliente
+
+# Todos los clientes generados llevan este prefijo en la identificación
+PREFIJO = 'SYN-'
+
+NOMBRES = ['Ana', 'Luis', 'María', 'Carlos', 'Sofía', 'Jorge', 'Lucía', 'Pedro', 'Elena', 'Andrés',
+           'Valentina', 'Diego', 'Camila', 'Mateo', 'Isabella', 'Santiago', 'Daniela', 'Miguel']
+APELLIDOS = ['García', 'Rodríguez', 'Martínez', 'López', 'González', 'Pérez', 'Sánchez', 'Ramírez',
+             'Torres', 'Flores', 'Rivera', 'Gómez', 'Díaz', 'Reyes', 'Morales', 'Ortiz']
+RAICES = ['Acme', 'Roofing', 'Techos', 'Global', 'Andina', 'Norte', 'Pacific', 'Solar', 'Delta',
+          'Summit', 'Atlas', 'Vertex', 'Sierra', 'Cóndor', 'Horizonte', 'Prime']
+FORMAS = ['Inc', 'LLC', 'S.A.S.', 'Ltda', 'Corp', 'Group']
+ESTADOS = ['TX', 'FL', 'CA', 'NY', 'GA', 'NC', 'AZ', 'CO', 'IL', 'NJ', '']
+CAMPOS_HISTORIAL = ['nombre', 'compania', 'correo', 'pais', 'direccion']
+
+
+def generar_logos(cantidad, semilla=0):
+    """Crea `cantidad` PNG pequeños y deterministas en logos/ y devuelve sus nombres."""
+    rng = random.Random(semilla)
+    nombres = []
+    for i in range(cantidad):
+        nombre = f"logos/sintetico_{semilla}_{i:04d}.png"
+        color = tuple(rng.randrange(256) for _ in range(3))
+        if not default_storage.exists(nombre):
+            buffer = io.BytesIO()
+            Image.new('RGB', (64, 64), color).save(buffer, format='PNG')
+            default_storage.save(nombre, ContentFile(buffer.getvalue()))
+        nombres.append(nombre)
+    return nombres
+
+
+def generar_clientes(cantidad, semilla=0, historial_por_cliente=2, proporcion_logo=0.3,
+                     logos_distintos=50, proporcion_eliminados=0.1, creado_por=None, lote=5000, progreso=None):
+    """
+    Inserta `cantidad` clientes sintéticos con bulk_create, de forma
+    determinista para una misma semilla. Una parte tiene logo (compartido
+    entre `logos_distintos` archivos) y otra está eliminada hace más de
+    PURGA_DIAS_RETENCION días, para que la purga tenga trabajo.
+    Devuelve (clientes, historiales) insertados.
+    """
+    rng = random.Random(semilla)
+    logos = generar_logos(logos_distintos, semilla) if proporcion_logo > 0 and logos_distintos else []
+    ahora = timezone.now().replace(microsecond=0)
+    retencion = settings.PURGA_DIAS_RETENCION
+    inicial = Cliente.objects.filter(identificacion__startswith=f"{PREFIJO}{semilla}-").count()
+
+    total_clientes = 0
+    total_historial = 0
+    for desde in range(0, cantidad, lote):
+        clientes = []
+        for i in range(inicial + desde, inicial + min(desde + lote, cantidad)):
+            eliminado = rng.random() < proporcion_eliminados
+            nombre = f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}"
+            clientes.append(Cliente(
+                nombre=nombre,
+                compania=f"{rng.choice(RAICES)} {rng.choice(RAICES)} {rng.choice(FORMAS)}",
+                identificacion=f"{PREFIJO}{semilla}-{i:08d}",
+                correo=f"cliente{i}@ejemplo.com",
+                pais=rng.choice(ESTADOS),
+                direccion=f"{rng.randint(1, 9999)} Main St",
+                logo=rng.choice(logos) if logos and rng.random() < proporcion_logo else None,
+                activo=not eliminado,
+                fecha_eliminacion=ahora - timedelta(days=rng.randint(retencion + 1, retencion + 90)) if eliminado else None,
+                creado_por=creado_por,
+            ))
+
+        with transaction.atomic():
+            clientes = Cliente.objects.bulk_create(clientes, batch_size=1000)
+            historial = [
+                HistorialCliente(
+                    cliente=cliente,
+                    campo=campo,
+                    valor_anterior=f"valor {rng.randint(0, 10**6)}",
+                    valor_nuevo=f"valor {rng.randint(0, 10**6)}",
+                    editado_por=creado_por,
+                    fecha_edicion=ahora - timedelta(minutes=rng.randint(0, 60 * 24 * 365)),
+                )
+                for cliente in clientes
+                for campo in rng.sample(CAMPOS_HISTORIAL, min(historial_por_cliente, len(CAMPOS_HISTORIAL)))
+            ]
+            HistorialCliente.objects.bulk_create(historial, batch_size=1000)
+
+        total_clientes += len(clientes)
+        total_historial += len(historial)
+        if progreso:
+            progreso(total_clientes, cantidad)
+    return total_clientes, total_historial
+
+
+def borrar_sinteticos():
+    """Borra los clientes generados (el historial cae en cascada)."""
+    return Cliente.objects.filter(identificacion__startswith=PREFIJO).delete()[1].get('clientes.Cliente', 0)
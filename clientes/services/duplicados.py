@@ -0,0 +1,76 @@
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, F, Q, Value, When, Window
+from django.db.models.functions import FirstValue
+from django.utils import timezone
+
+from clientes.services.lapidas import registrar_borrado_clientes
+
+TAMANO_LOTE = 500
+
+
+def perdedores_por_superviviente(Cliente, incluir_eliminados=False):
+    """
+    Una sola consulta con función de ventana: para cada identificación repetida
+    el superviviente es el cliente activo más reciente (o el más reciente si
+    ninguno está activo). Devuelve [(id_perdedor, id_superviviente, nombre), ...].
+    Las identificaciones vacías no se consideran duplicados.
+
+    Por defecto solo se fusionan clientes activos: los eliminados siguen en su
+    ventana de restauración y los borra la purga cuando vence. Con
+    incluir_eliminados=True también se fusionan (y borran) los eliminados.
+    """
+    superviviente = Window(
+        expression=FirstValue('id'),
+        partition_by=[F('identificacion')],
+        order_by=[F('activo').desc(), F('creado_en').desc(), F('id').desc()],
+    )
+    candidatos = Cliente.objects.exclude(identificacion='')
+    if not incluir_eliminados:
+        candidatos = candidatos.filter(activo=True)
+    filas = (
+        candidatos
+        .annotate(superviviente_id=superviviente)
+        .filter(~Q(id=F('superviviente_id')))
+        .values_list('id', 'superviviente_id', 'nombre')
+        .order_by('superviviente_id', 'id')
+    )
+    return list(filas)
+
+
+def fusionar_duplicados(Cliente, HistorialCliente, lote=TAMANO_LOTE, log=None, incluir_eliminados=False):
+    """
+    Mueve el historial de los duplicados a su superviviente con UPDATE por lotes,
+    deja constancia de la fusión en el historial y borra los duplicados
+    (con lápida para el snapshot incremental).
+    Devuelve el número de clientes eliminados.
+    """
+    pares = perdedores_por_superviviente(Cliente, incluir_eliminados)
+    eliminados = 0
+    for i in range(0, len(pares), lote):
+        bloque = pares[i:i + lote]
+        ids = [perdedor for perdedor, _, _ in bloque]
+        with transaction.atomic():
+            HistorialCliente.objects.filter(cliente_id__in=ids).update(
+                cliente_id=Case(
+                    *[When(cliente_id=perdedor, then=Value(superviviente)) for perdedor, superviviente, _ in bloque],
+                    default=F('cliente_id'),
+                    output_field=BigIntegerField(),
+                ),
+                # update() no aplica auto_now: el snapshot incremental debe ver el cambio
+                actualizado_en=timezone.now(),
+            )
+            HistorialCliente.objects.bulk_create([
+                HistorialCliente(
+                    cliente_id=superviviente,
+                    campo='fusion_duplicado',
+                    valor_anterior=f"{nombre} (#{perdedor})",
+                    valor_nuevo=f"#{superviviente}",
+                )
+                for perdedor, superviviente, nombre in bloque
+            ])
+            # El historial ya pasó al superviviente: la lápida es solo del cliente
+            registrar_borrado_clientes(ids)
+            eliminados += Cliente.objects.filter(pk__in=ids).delete()[1].get(Cliente._meta.label, 0)
+        if log:
+            log(f"  - Lote de {len(bloque)} duplicados fusionados")
+    return eliminados
@@ -0,0 +1,217 @@
+import hashlib
+import posixpath
+import re
+import zipfile
+from io import BytesIO
+from xml.etree import ElementTree as ET
+
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+# -----------------------------
+# Namespaces OOXML
+# -----------------------------
+NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'r': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'rel': 'http://schemas.openxmlformats.org/package/2006/relationships',
+    'xdr': 'http://schemas.openxmlformats.org/drawingml/2006/spreadsheetDrawing',
+    'a': 'http://schemas.openxmlformats.org/drawingml/2006/main',
+    'xlrd': 'http://schemas.microsoft.com/office/spreadsheetml/2017/richdata',
+    'rvrel': 'http://schemas.microsoft.com/office/spreadsheetml/2022/richvaluerel',
+}
+
+REL_DRAWING = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/drawing'
+REL_RICH_VALUE = 'http://schemas.microsoft.com/office/2017/06/relationships/rdRichValue'
+REL_RICH_VALUE_REL = 'http://schemas.microsoft.com/office/2022/10/relationships/richValueRel'
+REL_RICH_VALUE_STRUCT = 'http://schemas.microsoft.com/office/2017/06/relationships/rdRichValueStructure'
+REL_SHEET_METADATA = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/sheetMetadata'
+
+# Prefijo de los logos generados por la importación: el nombre es el hash del contenido
+PREFIJO_LOGO_IMPORTADO = 'logos/excel_'
+
+
+def _leer_xml(zf, parte):
+    try:
+        return ET.fromstring(zf.read(parte))
+    except KeyError:
+        return None
+
+
+def _ruta_rels(parte):
+    carpeta, nombre = posixpath.split(parte)
+    return posixpath.join(carpeta, '_rels', f'{nombre}.rels')
+
+
+def _leer_rels(zf, parte):
+    """Devuelve {rId: (tipo, ruta_absoluta_en_zip)} para una parte del paquete."""
+    raiz = _leer_xml(zf, _ruta_rels(parte))
+    if raiz is None:
+        return {}
+    carpeta = posixpath.dirname(parte)
+    rels = {}
+    for rel in raiz.findall('rel:Relationship', NS):
+        destino = rel.get('Target', '')
+        if destino.startswith('/'):
+            ruta = destino.lstrip('/')
+        else:
+            ruta = posixpath.normpath(posixpath.join(carpeta, destino))
+        rels[rel.get('Id')] = (rel.get('Type'), ruta)
+    return rels
+
+
+def _primera_hoja(zf):
+    libro = _leer_xml(zf, 'xl/workbook.xml')
+    rels = _leer_rels(zf, 'xl/workbook.xml')
+    hoja = libro.find('main:sheets/main:sheet', NS)
+    return rels[hoja.get(f"{{{NS['r']}}}id")][1]
+
+
+def _fila_de_celda(referencia):
+    return int(re.sub(r'[^0-9]', '', referencia))
+
+
+# -----------------------------
+# Imágenes flotantes (xl/drawings/*.xml)
+# -----------------------------
+def _imagenes_por_anclaje(zf, hoja):
+    mapa = {}
+    for tipo, dibujo in _leer_rels(zf, hoja).values():
+        if tipo != REL_DRAWING:
+            continue
+        raiz = _leer_xml(zf, dibujo)
+        if raiz is None:
+            continue
+        rels_dibujo = _leer_rels(zf, dibujo)
+        for anclaje in list(raiz):
+            desde = anclaje.find('xdr:from/xdr:row', NS)
+            blip = anclaje.find('.//xdr:pic/xdr:blipFill/a:blip', NS)
+            if desde is None or blip is None:
+                continue
+            rel = rels_dibujo.get(blip.get(f"{{{NS['r']}}}embed"))
+            if rel:
+                # xdr:row es 0-based; las filas de Excel empiezan en 1
+                mapa.setdefault(int(desde.text) + 1, rel[1])
+    return mapa
+
+
+# -----------------------------
+# Imágenes dentro de celda (xl/richData, "Colocar en celda")
+# -----------------------------
+def _imagenes_en_celda(zf, hoja):
+    rels_libro = {tipo: ruta for tipo, ruta in _leer_rels(zf, 'xl/workbook.xml').values()}
+    if REL_RICH_VALUE not in rels_libro or REL_SHEET_METADATA not in rels_libro:
+        return {}
+
+    metadata = _leer_xml(zf, rels_libro[REL_SHEET_METADATA])
+    rich_values = _leer_xml(zf, rels_libro[REL_RICH_VALUE])
+    if metadata is None or rich_values is None:
+        return {}
+
+    # Posición de la clave LocalImageIdentifier en cada estructura
+    posiciones = []
+    estructuras = _leer_xml(zf, rels_libro.get(REL_RICH_VALUE_STRUCT, ''))
+    for s in (estructuras if estructuras is not None else []):
+        claves = [k.get('n') for k in s.findall('xlrd:k', NS)]
+        posiciones.append(claves.index('_rvRel:LocalImageIdentifier') if '_rvRel:LocalImageIdentifier' in claves else None)
+
+    # rich value -> ruta de la imagen
+    ruta_rv_rel = rels_libro.get(REL_RICH_VALUE_REL)
+    rv_rel = _leer_xml(zf, ruta_rv_rel) if ruta_rv_rel else None
+    rels_rv = _leer_rels(zf, ruta_rv_rel) if ruta_rv_rel else {}
+    imagenes_rel = [
+        rels_rv.get(rel.get(f"{{{NS['r']}}}id"), (None, None))[1]
+        for rel in (rv_rel if rv_rel is not None else [])
+    ]
+    imagen_por_rv = []
+    for rv in rich_values.findall('xlrd:rv', NS):
+        estructura = int(rv.get('s', 0))
+        pos = posiciones[estructura] if estructura < len(posiciones) else 0
+        valores = rv.findall('xlrd:v', NS)
+        ruta = None
+        if pos is not None and pos < len(valores):
+            indice = int(valores[pos].text)
+            if indice < len(imagenes_rel):
+                ruta = imagenes_rel[indice]
+        imagen_por_rv.append(ruta)
+
+    # valueMetadata (vm, 1-based) -> futureMetadata -> rich value
+    futuros = [
+        int(rvb.get('i'))
+        for rvb in metadata.findall('main:futureMetadata/main:bk/main:extLst/main:ext/xlrd:rvb', NS)
+    ]
+    valores_meta = []
+    for bk in metadata.findall('main:valueMetadata/main:bk', NS):
+        rc = bk.find('main:rc', NS)
+        v = int(rc.get('v')) if rc is not None else -1
+        valores_meta.append(futuros[v] if 0 <= v < len(futuros) else None)
+
+    mapa = {}
+    raiz_hoja = _leer_xml(zf, hoja)
+    for celda in raiz_hoja.iterfind('.//main:sheetData/main:row/main:c[@vm]', NS):
+        vm = int(celda.get('vm')) - 1
+        rv = valores_meta[vm] if 0 <= vm < len(valores_meta) else None
+        ruta = imagen_por_rv[rv] if rv is not None and rv < len(imagen_por_rv) else None
+        if ruta:
+            mapa.setdefault(_fila_de_celda(celda.get('r')), ruta)
+    return mapa
+
+
+def mapear_imagenes_por_fila(excel_path):
+    """
+    Devuelve {fila_excel (1-based): bytes de la imagen} para la primera hoja.
+    Usa los anclajes de xl/drawings y las imágenes en celda de xl/richData,
+    de modo que una misma imagen reutilizada en varias filas se asigna a todas.
+    """
+    with zipfile.ZipFile(excel_path, 'r') as zf:
+        hoja = _primera_hoja(zf)
+        rutas = _imagenes_en_celda(zf, hoja)
+        for fila, ruta in _imagenes_por_anclaje(zf, hoja).items():
+            rutas.setdefault(fila, ruta)
+
+        contenido = {}
+        mapa = {}
+        for fila, ruta in rutas.items():
+            if ruta not in contenido:
+                try:
+                    contenido[ruta] = zf.read(ruta)
+                except KeyError:
+                    continue
+            mapa[fila] = contenido[ruta]
+    return mapa
+
+
+# -----------------------------
+# Caché de logos por hash de contenido
+# -----------------------------
+def hash_imagen(img_bytes):
+    return hashlib.sha256(img_bytes).hexdigest()
+
+
+def nombre_logo_importado(img_hash):
+    return f"{PREFIJO_LOGO_IMPORTADO}{img_hash[:32]}.png"
+
+
+def obtener_logo_cacheado(img_bytes, cache=None):
+    """
+    Convierte la imagen a PNG una sola vez por hash y la guarda en el storage
+    como logos/excel_<hash>.png. Si el archivo ya existe (importación previa)
+    no se vuelve a procesar. Devuelve el nombre del archivo en el storage.
+    """
+    img_hash = hash_imagen(img_bytes)
+    if cache is not None and img_hash in cache:
+        return cache[img_hash]
+
+    nombre = nombre_logo_importado(img_hash)
+    if not default_storage.exists(nombre):
+        img = Image.open(BytesIO(img_bytes))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        buffer = BytesIO()
+        img.save(buffer, format='PNG')
+        nombre = default_storage.save(nombre, ContentFile(buffer.getvalue()))
+
+    if cache is not None:
+        cache[img_hash] = nombre
+    return nombre
@@ -0,0 +1,76 @@
+import csv
+import tempfile
+
+from django.utils import timezone
+
+# Filas leídas de la BD por cada viaje del cursor
+CHUNK_SIZE = 2000
+
+# (campo, encabezado); los campos de contacto solo se exportan a admin/superadmin
+COLUMNAS_BASICAS = [
+    ('codigo_cliente', 'Código'),
+    ('nombre', 'Cliente'),
+    ('compania', 'Compañía'),
+    ('identificacion', 'ID'),
+    ('pais', 'Estado'),
+    ('creado_en', 'Creado en'),
+    ('actualizado_en', 'Actualizado en'),
+]
+COLUMNAS_ADMIN = [
+    ('correo', 'Correo'),
+    ('direccion', 'Dirección'),
+]
+
+
+class _Eco:
+    """Pseudo-buffer para csv.writer: devuelve la línea en vez de guardarla."""
+    def write(self, value):
+        return value
+
+
+def columnas_exportacion(incluir_contacto):
+    return COLUMNAS_BASICAS + (COLUMNAS_ADMIN if incluir_contacto else [])
+
+
+def _valor(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'tzinfo'):
+        return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M:%S')
+    return str(valor)
+
+
+def filas_exportacion(queryset, columnas):
+    """Recorre el queryset con un cursor por bloques, sin instanciar modelos."""
+    campos = [campo for campo, _ in columnas]
+    for fila in queryset.values_list(*campos).iterator(chunk_size=CHUNK_SIZE):
+        yield [_valor(v) for v in fila]
+
+
+def generar_csv(queryset, columnas):
+    """Generador de líneas CSV para StreamingHttpResponse."""
+    writer = csv.writer(_Eco())
+    # BOM para que Excel abra el UTF-8 correctamente
+    yield '\ufeff' + writer.writerow([encabezado for _, encabezado in columnas])
+    for fila in filas_exportacion(queryset, columnas):
+        yield writer.writerow(fila)
+
+
+def generar_xlsx(queryset, columnas):
+    """
+    Escribe el libro en modo write-only (las filas van a disco, no a memoria)
+    y devuelve un archivo temporal listo para enviarse por bloques.
+    """
+    # openpyxl solo se carga al exportar a Excel (pesa al arrancar cada worker)
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Clientes')
+    ws.append([encabezado for _, encabezado in columnas])
+    for fila in filas_exportacion(queryset, columnas):
+        ws.append(fila)
+
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    archivo.seek(0)
+    return archivo
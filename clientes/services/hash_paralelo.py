@@ -0,0 +1,34 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Este módulo no importa modelos: con 'spawn' (Windows/macOS) los procesos
+# lo importan antes de que Django esté configurado.
+from django.contrib.auth.hashers import make_password
+
+# Por debajo de este número de contraseñas se hashea en el propio proceso:
+# arrancar un proceso (con django.setup) cuesta más que varios hashes
+MIN_PARA_POOL = 32
+# Tope de procesos: el hash satura la CPU y el servidor comparte máquina
+MAX_PROCESOS = 4
+# Dentro de una petición web (admin) se usan menos para no dejar sin CPU a los workers
+PROCESOS_PETICION = 2
+
+
+def _iniciar_proceso(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def hashear_passwords(passwords, procesos=None):
+    """Aplica make_password en paralelo con hasta MAX_PROCESOS procesos."""
+    procesos = min(procesos or os.cpu_count() or 1, MAX_PROCESOS)
+    if procesos == 1 or len(passwords) < MIN_PARA_POOL:
+        return [make_password(p) for p in passwords]
+    procesos = min(procesos, len(passwords))
+    with ProcessPoolExecutor(
+        max_workers=procesos,
+        initializer=_iniciar_proceso,
+        initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),),
+    ) as pool:
+        return list(pool.map(make_password, passwords, chunksize=max(1, len(passwords) // (procesos * 4))))
@@ -0,0 +1,226 @@
+import hashlib
+
+import pandas as pd
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from clientes.models import Cliente
+from clientes.services.excel_imagenes import (
+    PREFIJO_LOGO_IMPORTADO,
+    hash_imagen,
+    mapear_imagenes_por_fila,
+    obtener_logo_cacheado,
+)
+
+COLUMNAS_REQUERIDAS = ['cliente', 'compania', 'id']
+TAMANO_LOTE = 500
+
+
+class ErrorImportacion(Exception):
+    pass
+
+
+def _texto(valor):
+    return '' if pd.isna(valor) else str(valor).strip()
+
+
+def calcular_huella(nombre, compania, img_hash):
+    """Huella de una fila: cambia solo si cambia algún dato importado."""
+    contenido = '\x1f'.join([nombre, compania, img_hash or ''])
+    return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+
+def leer_excel(excel_path):
+    """Lee la primera hoja, normaliza columnas y descarta filas sin ID."""
+    try:
+        df = pd.read_excel(excel_path, sheet_name=0)
+    except FileNotFoundError:
+        raise ErrorImportacion(f"No se encontró el archivo Excel en la ruta: {excel_path}")
+    except Exception as e:
+        raise ErrorImportacion(f"Ocurrió un error al leer el archivo Excel: {e}")
+
+    df.columns = [str(col).strip().lower().replace('í', 'i').replace('ñ', 'n') for col in df.columns]
+    if not all(col in df.columns for col in COLUMNAS_REQUERIDAS):
+        raise ErrorImportacion("El archivo Excel debe contener las columnas: 'Cliente', 'Compañía', 'ID'.")
+
+    df = df.dropna(subset=['id'])
+    df = df[df['id'].astype(str).str.strip() != '']
+    return df
+
+
+def _existentes_por_identificacion(identificaciones):
+    """
+    {identificacion: [(pk, huella, activo), ...]} consultando en lotes, con los
+    activos primero y después los eliminados del más reciente al más antiguo.
+    """
+    existentes = {}
+    identificaciones = list(identificaciones)
+    for i in range(0, len(identificaciones), TAMANO_LOTE):
+        lote = identificaciones[i:i + TAMANO_LOTE]
+        filas = (
+            Cliente.objects.filter(identificacion__in=lote)
+            .order_by('-activo', F('fecha_eliminacion').desc(nulls_first=True), '-pk')
+            .values_list('identificacion', 'pk', 'huella_importacion', 'activo')
+        )
+        for identificacion, pk, huella, activo in filas:
+            existentes.setdefault(identificacion, []).append((pk, huella, activo))
+    return existentes
+
+
+def _asignar_logo(cliente, nombre_logo):
+    """Asigna el logo importado salvo que el cliente tenga uno subido a mano."""
+    if not nombre_logo:
+        return False
+    if cliente.logo and cliente.logo.name == nombre_logo:
+        return False
+    if cliente.logo and not cliente.logo.name.startswith(PREFIJO_LOGO_IMPORTADO):
+        return False
+    cliente.logo.name = nombre_logo
+    return True
+
+
+def importar_clientes(excel_path, log=print, progreso=None):
+    """
+    Importa clientes y logos desde el Excel de forma incremental.
+
+    Cada fila tiene una huella (nombre, compañía y hash del logo) que se guarda
+    en Cliente.huella_importacion. Las filas cuya huella no cambió no se tocan,
+    así que ni se actualiza `actualizado_en` ni se genera historial.
+    Se compara con el cliente activo de cada identificación. Si solo hay
+    clientes eliminados, el archivo manda: se restaura el eliminado más
+    reciente (con su historial) en lugar de crear otro.
+    Devuelve un resumen con insertados, actualizados, sin_cambios y fallidos.
+    `progreso(procesadas, total)` se llama a medida que avanzan las filas.
+    """
+    resumen = {'total': 0, 'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'fallidos': 0, 'errores': []}
+
+    def avanzar():
+        if progreso:
+            hechas = resumen['insertados'] + resumen['actualizados'] + resumen['sin_cambios'] + resumen['fallidos']
+            progreso(hechas, resumen['total'])
+
+    def fallo(identificacion, mensaje):
+        resumen['fallidos'] += 1
+        resumen['errores'].append(f"ID {identificacion}: {mensaje}")
+        log(f"❌ ERROR al procesar al cliente con ID {identificacion}: {mensaje}")
+
+    df = leer_excel(excel_path)
+    resumen['total'] = len(df)
+    log(f"Se procesarán {len(df)} filas con ID válido.")
+
+    try:
+        imagenes_por_fila = mapear_imagenes_por_fila(excel_path)
+    except Exception as e:
+        log(f"⚠️ No se pudieron leer las imágenes del Excel: {e}")
+        imagenes_por_fila = {}
+
+    # -----------------------------
+    # Calcular huellas de todas las filas
+    # -----------------------------
+    filas = []
+    vistos = set()
+    for index, row in df.iterrows():
+        identificacion = str(row['id']).strip()
+        if identificacion in vistos:
+            fallo(identificacion, "identificación repetida en el archivo")
+            continue
+        vistos.add(identificacion)
+
+        # La fila 1 de Excel es el encabezado; el índice 0 del DataFrame es la fila 2
+        img_bytes = imagenes_por_fila.get(index + 2)
+        img_hash = hash_imagen(img_bytes) if img_bytes else None
+        nombre = _texto(row.get('cliente'))
+        compania = _texto(row.get('compania'))
+        filas.append((identificacion, nombre, compania, img_bytes, calcular_huella(nombre, compania, img_hash)))
+
+    existentes = _existentes_por_identificacion(vistos)
+    cache_logos = {}
+
+    # -----------------------------
+    # Clasificar filas: nuevas, modificadas o sin cambios
+    # -----------------------------
+    nuevos = []
+    modificados = []
+    for identificacion, nombre, compania, img_bytes, huella in filas:
+        previos = existentes.get(identificacion, [])
+        activos = [previo for previo in previos if previo[2]]
+        if len(activos) > 1:
+            fallo(identificacion, "hay varios clientes activos con esta identificación (ejecuta limpiar_duplicados)")
+        elif activos and activos[0][1] == huella:
+            resumen['sin_cambios'] += 1
+        elif activos:
+            modificados.append((activos[0][0], identificacion, nombre, compania, img_bytes, huella, False))
+        elif previos:
+            # Solo eliminados: se restaura el más reciente
+            modificados.append((previos[0][0], identificacion, nombre, compania, img_bytes, huella, True))
+        else:
+            nuevos.append((identificacion, nombre, compania, img_bytes, huella))
+    avanzar()
+
+    # -----------------------------
+    # Insertar nuevos en lotes
+    # -----------------------------
+    for i in range(0, len(nuevos), TAMANO_LOTE):
+        lote = []
+        for identificacion, nombre, compania, img_bytes, huella in nuevos[i:i + TAMANO_LOTE]:
+            try:
+                cliente = Cliente(identificacion=identificacion, nombre=nombre, compania=compania, huella_importacion=huella)
+                if img_bytes:
+                    cliente.logo.name = obtener_logo_cacheado(img_bytes, cache_logos)
+                lote.append(cliente)
+            except Exception as e:
+                fallo(identificacion, e)
+        try:
+            with transaction.atomic():
+                Cliente.objects.bulk_create(lote)
+            resumen['insertados'] += len(lote)
+            for cliente in lote:
+                log(f"✅ Cliente nuevo creado: {cliente.nombre} (ID: {cliente.identificacion})")
+        except Exception as e:
+            for cliente in lote:
+                fallo(cliente.identificacion, e)
+        avanzar()
+
+    # -----------------------------
+    # Actualizar solo los modificados (con historial)
+    # -----------------------------
+    for j in range(0, len(modificados), TAMANO_LOTE):
+        lote = modificados[j:j + TAMANO_LOTE]
+        clientes = Cliente.objects.in_bulk([item[0] for item in lote])
+        for pk, identificacion, nombre, compania, img_bytes, huella, restaurar in lote:
+            cliente = clientes.get(pk)
+            if cliente is None:
+                fallo(identificacion, "el cliente fue eliminado durante la importación")
+                continue
+            try:
+                cambio = cliente.nombre != nombre or cliente.compania != compania or restaurar
+                if restaurar:
+                    cliente.activo = True
+                    cliente.fecha_eliminacion = None
+                cliente.nombre = nombre
+                cliente.compania = compania
+                if img_bytes:
+                    cambio = _asignar_logo(cliente, obtener_logo_cacheado(img_bytes, cache_logos)) or cambio
+                cliente.huella_importacion = huella
+
+                if cambio:
+                    with transaction.atomic():
+                        cliente.save()
+                    resumen['actualizados'] += 1
+                    if restaurar:
+                        log(f"♻️ Cliente eliminado restaurado por la importación: {cliente.nombre} (ID: {identificacion})")
+                    else:
+                        log(f"ℹ️ Cliente existente actualizado: {cliente.nombre} (ID: {identificacion})")
+                else:
+                    # Datos idénticos: solo se registra la huella (sin historial). actualizado_en
+                    # avanza para que el snapshot incremental exporte la huella nueva
+                    Cliente.objects.filter(pk=pk).update(
+                        huella_importacion=huella, actualizado_en=timezone.now().replace(microsecond=0),
+                    )
+                    resumen['sin_cambios'] += 1
+            except Exception as e:
+                fallo(identificacion, e)
+        avanzar()
+
+    return resumen
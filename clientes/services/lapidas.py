@@ -0,0 +1,21 @@
+from django.utils import timezone
+
+from clientes.models import HistorialCliente, Lapida
+
+TAMANO_LOTE = 500
+
+
+def registrar_borrado_clientes(ids):
+    """
+    Deja lápida de los clientes que se van a borrar y de su historial (que se
+    borra en cascada). Se llama justo antes del DELETE, en su misma transacción.
+    """
+    ids = list(ids)
+    if not ids:
+        return 0
+    ahora = timezone.now()
+    historial = HistorialCliente.objects.filter(cliente_id__in=ids).values_list('id', flat=True)
+    lapidas = [Lapida(tabla='cliente', registro_id=pk, borrado_en=ahora) for pk in ids]
+    lapidas += [Lapida(tabla='historial', registro_id=pk, borrado_en=ahora) for pk in historial.iterator()]
+    Lapida.objects.bulk_create(lapidas, batch_size=TAMANO_LOTE)
+    return len(lapidas)
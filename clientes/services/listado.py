@@ -0,0 +1,48 @@
+from django.core.paginator import Paginator
+
+from clientes.models import url_logo
+
+# Solo las columnas que pintan las tarjetas de lista y eliminados
+CAMPOS_LISTA = (
+    'pk', 'nombre', 'compania', 'identificacion', 'correo', 'pais', 'logo',
+    'creado_en', 'fecha_eliminacion',
+)
+
+
+class FilaCliente:
+    """Fila ligera para las tarjetas: sin instancia de modelo; las fechas las formatea la plantilla con |date."""
+    __slots__ = (
+        'pk', 'nombre', 'compania', 'identificacion', 'correo', 'pais',
+        'creado_en', 'fecha_eliminacion', 'logo_url', 'estado_label',
+    )
+
+    def __init__(self, fila, code_to_name):
+        (self.pk, self.nombre, self.compania, self.identificacion, self.correo,
+         self.pais, logo, self.creado_en, self.fecha_eliminacion) = fila
+        self.logo_url = url_logo(logo, self.identificacion)
+        self.estado_label = etiqueta_estado(self.pais, code_to_name)
+
+
+def etiqueta_estado(pais, code_to_name):
+    """Etiqueta legible para estado ("CODE - Name")."""
+    code = (pais or '').strip()
+    if not code:
+        return "No asignado"
+    name = code_to_name.get(code)
+    return f"{code} - {name}" if name else code
+
+
+def proyectar_pagina(page_obj, code_to_name=None):
+    """Convierte las tuplas de values_list de una página en FilaCliente."""
+    code_to_name = code_to_name or {}
+    page_obj.object_list = [FilaCliente(fila, code_to_name) for fila in page_obj.object_list]
+    return page_obj
+
+
+async def apaginar(queryset, por_pagina, numero):
+    """Paginator.get_page con el ORM asíncrono: cuenta y trae la página con acount y async for."""
+    paginator = Paginator(queryset, por_pagina)
+    paginator.count = await queryset.acount()
+    page_obj = paginator.get_page(numero)
+    page_obj.object_list = [fila async for fila in page_obj.object_list]
+    return page_obj
@@ -0,0 +1,163 @@
+"""
+Precalentamiento tras un despliegue: conexiones a la BD, lista de estados,
+carpeta de logos, plantillas compiladas y primeras páginas de la lista.
+
+Lo usan el comando `precalentar` y, con PRECALENTAR_AL_ARRANCAR, wsgi.py y
+asgi.py al cargar cada worker. Las cachés de proceso (plantillas, caché
+local, conexiones) solo sirven en el proceso que las calienta: el comando
+calienta la caché compartida, la BD y el disco; el gancho, cada worker.
+"""
+import logging
+import os
+import threading
+import time
+from functools import partial
+from pathlib import Path
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import reverse
+
+from clientes.services.states_api import fetch_us_states
+
+logger = logging.getLogger('directorio.precalentar')
+
+PAGINAS_LISTA = 3
+
+
+# -----------------------------
+# Pasos (cada uno devuelve un texto corto con lo que hizo)
+# -----------------------------
+def conexiones():
+    """Abre la conexión (o el pool, con DB_POOL) de cada base de datos configurada."""
+    for alias in connections:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+    return f"{len(connections.all())} bases de datos"
+
+
+def estados():
+    cantidad = len(fetch_us_states())
+    if not cantidad:
+        # fetch_us_states no lanza: una lista vacía es que la API falló
+        raise RuntimeError("la API de estados no devolvió datos")
+    return f"{cantidad} estados"
+
+
+def logos():
+    """Lee la carpeta de logos: la primera búsqueda por identificación no paga el disco frío."""
+    carpeta = Path(settings.MEDIA_ROOT) / 'logos'
+    if not carpeta.is_dir():
+        return "sin carpeta de logos"
+    with os.scandir(carpeta) as entradas:
+        archivos = sum(1 for entrada in entradas if entrada.is_file())
+    return f"{archivos} archivos"
+
+
+def plantillas():
+    """Compila las plantillas del proyecto (las del admin se compilan al usarse)."""
+    compiladas = 0
+    for carpeta in plantillas_del_proyecto():
+        for ruta in carpeta.rglob('*.html'):
+            get_template(ruta.relative_to(carpeta).as_posix())
+            compiladas += 1
+    return f"{compiladas} plantillas"
+
+
+def plantillas_del_proyecto():
+    carpetas = [Path(d) for engine in engines.all() for d in engine.dirs]
+    carpetas += [
+        Path(app.path) / 'templates' for app in apps.get_app_configs()
+        if Path(app.path).is_relative_to(settings.BASE_DIR)
+    ]
+    return [c for c in carpetas if c.is_dir()]
+
+
+def lista_clientes(paginas=PAGINAS_LISTA, usuario=None):
+    """Ejecuta la vista de la lista para las primeras páginas, como lo haría un usuario."""
+    from django.test import RequestFactory
+
+    from clientes.views import lista_clientes as vista
+
+    usuario = usuario or usuario_precalentamiento()
+    if usuario is None:
+        return "sin usuarios activos: omitido"
+    fabrica = RequestFactory()
+    for pagina in range(1, paginas + 1):
+        request = fabrica.get(reverse('lista_clientes'), {'page': pagina})
+        request.user = usuario
+
+        async def auser(usuario=usuario):
+            return usuario
+        request.auser = auser
+        respuesta = async_to_sync(vista)(request) if iscoroutinefunction(vista) else vista(request)
+        if respuesta.status_code != 200:
+            raise RuntimeError(f"la página {pagina} respondió {respuesta.status_code}")
+    return f"{paginas} páginas"
+
+
+def usuario_precalentamiento():
+    # Un superadmin pinta la versión más completa de las tarjetas
+    Usuario = get_user_model()
+    activos = Usuario.objects.filter(is_active=True)
+    return activos.filter(rol='superadmin').first() or activos.first()
+
+
+PASOS = {
+    'conexiones': conexiones,
+    'estados': estados,
+    'logos': logos,
+    'plantillas': plantillas,
+    'lista': lista_clientes,
+}
+
+
+# -----------------------------
+# Ejecución
+# -----------------------------
+def precalentar(pasos=None, paginas=PAGINAS_LISTA, usuario=None):
+    """
+    Ejecuta los pasos en orden y devuelve [(paso, segundos, detalle, error)].
+    Un paso que falla no detiene a los demás.
+    """
+    funciones = {**PASOS, 'lista': partial(lista_clientes, paginas, usuario)}
+    resultados = []
+    for nombre in pasos or PASOS:
+        inicio = time.perf_counter()
+        detalle, error = None, None
+        try:
+            detalle = funciones[nombre]()
+        except Exception as e:
+            error = str(e)
+        resultados.append((nombre, time.perf_counter() - inicio, detalle, error))
+    return resultados
+
+
+def al_arrancar():
+    """
+    Gancho de wsgi.py/asgi.py. En un hilo aparte porque bajo ASGI el módulo se
+    importa dentro del bucle de eventos, donde el ORM síncrono no se permite;
+    se espera a que termine para que el worker no atienda peticiones en frío.
+    """
+    if not getattr(settings, 'PRECALENTAR_AL_ARRANCAR', False):
+        return
+
+    def ejecutar():
+        try:
+            resultados = precalentar()
+        finally:
+            connections.close_all()
+        for nombre, segundos, detalle, error in resultados:
+            if error:
+                logger.warning("Precalentamiento %s falló en %.2fs: %s", nombre, segundos, error)
+            else:
+                logger.info("Precalentamiento %s: %s en %.2fs", nombre, detalle, segundos)
+
+    hilo = threading.Thread(target=ejecutar, name='precalentar')
+    hilo.start()
+    hilo.join()
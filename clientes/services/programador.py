@@ -0,0 +1,141 @@
+import os
+import random
+import logging
+import socket
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from clientes.models import EjecucionTarea, TareaProgramada
+
+# Tareas por defecto: ejecuciones pequeñas y frecuentes en lugar de grandes y esporádicas.
+# Se pueden sobrescribir con TAREAS_PERIODICAS en settings.
+#   cada: segundos entre ejecuciones
+#   jitter: segundos aleatorios extra para que los nodos no coincidan
+#   bloqueo: vencimiento del bloqueo si el nodo muere a mitad de la tarea (mientras
+#            la tarea corre se renueva cada bloqueo/3 segundos)
+# limpiar_duplicados solo fusiona clientes activos: los eliminados esperan a la purga
+TAREAS_POR_DEFECTO = {
+    'limpiar_clientes_eliminados': {
+        'comando': 'limpiar_clientes_eliminados', 'args': ['--lote', '200'],
+        'cada': 15 * 60, 'jitter': 60, 'bloqueo': 30 * 60,
+    },
+    'limpiar_duplicados': {
+        'comando': 'limpiar_duplicados', 'args': [],
+        'cada': 6 * 3600, 'jitter': 300, 'bloqueo': 3600,
+    },
+    'detectar_similares': {
+        'comando': 'detectar_similares', 'args': [],
+        'cada': 24 * 3600, 'jitter': 1800, 'bloqueo': 2 * 3600,
+    },
+}
+
+# Máximo de caracteres de salida guardados por ejecución
+MAX_SALIDA = 10000
+
+logger = logging.getLogger(__name__)
+
+
+def tareas_registradas():
+    return getattr(settings, 'TAREAS_PERIODICAS', TAREAS_POR_DEFECTO)
+
+
+def nombre_nodo():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def sincronizar_tareas():
+    """Crea en la BD las tareas registradas que aún no existen."""
+    existentes = set(TareaProgramada.objects.values_list('nombre', flat=True))
+    TareaProgramada.objects.bulk_create(
+        [TareaProgramada(nombre=nombre) for nombre in tareas_registradas() if nombre not in existentes],
+        ignore_conflicts=True,
+    )
+
+
+def tomar_tarea(nombre, nodo, bloqueo):
+    """
+    Intenta reservar una tarea vencida con un UPDATE condicional.
+    Solo un nodo obtiene filas afectadas = 1; funciona igual en SQLite y PostgreSQL.
+    """
+    ahora = timezone.now()
+    return TareaProgramada.objects.filter(
+        Q(bloqueado_hasta__isnull=True) | Q(bloqueado_hasta__lt=ahora),
+        nombre=nombre,
+        proxima_ejecucion__lte=ahora,
+    ).update(bloqueado_hasta=ahora + timedelta(seconds=bloqueo), bloqueado_por=nodo) == 1
+
+
+def renovar_bloqueo(nombre, nodo, bloqueo):
+    """Alarga el bloqueo si sigue siendo de este nodo. False si otro nodo ya lo tomó."""
+    return TareaProgramada.objects.filter(nombre=nombre, bloqueado_por=nodo).update(
+        bloqueado_hasta=timezone.now() + timedelta(seconds=bloqueo),
+    ) == 1
+
+
+class RenovadorBloqueo(threading.Thread):
+    """Mantiene el bloqueo mientras la tarea corre, para que otro nodo no la repita."""
+
+    def __init__(self, nombre, nodo, bloqueo):
+        super().__init__(name=f"bloqueo-{nombre}", daemon=True)
+        self.nombre, self.nodo, self.bloqueo = nombre, nodo, bloqueo
+        self.perdido = False
+        self._parar = threading.Event()
+
+    def run(self):
+        try:
+            while not self._parar.wait(self.bloqueo / 3):
+                if not renovar_bloqueo(self.nombre, self.nodo, self.bloqueo):
+                    self.perdido = True
+                    logger.warning("La tarea %s perdió el bloqueo en %s", self.nombre, self.nodo)
+                    return
+        finally:
+            # Conexión propia del hilo
+            connection.close()
+
+    def detener(self):
+        self._parar.set()
+        self.join()
+
+
+def ejecutar_tarea(nombre, config, nodo):
+    """Ejecuta el comando de la tarea, guarda la ejecución y programa la siguiente."""
+    inicio = timezone.now()
+    t0 = time.monotonic()
+    salida = StringIO()
+    exito = True
+    renovador = RenovadorBloqueo(nombre, nodo, config.get('bloqueo', 3600))
+    renovador.start()
+    try:
+        call_command(config['comando'], *config.get('args', []), stdout=salida, stderr=salida)
+    except Exception as e:
+        exito = False
+        salida.write(f"\nERROR: {e}")
+    finally:
+        renovador.detener()
+    duracion = time.monotonic() - t0
+    fin = timezone.now()
+    if renovador.perdido:
+        salida.write("\nAVISO: el bloqueo se perdió durante la ejecución; otro nodo pudo repetir la tarea.")
+
+    tarea = TareaProgramada.objects.get(nombre=nombre)
+    EjecucionTarea.objects.create(
+        tarea=tarea, nodo=nodo, inicio=inicio, fin=fin, duracion=duracion,
+        exito=exito, salida=salida.getvalue()[-MAX_SALIDA:],
+    )
+    espera = config['cada'] + random.uniform(0, config.get('jitter', 0))
+    # Solo quien conserva el bloqueo programa la siguiente ejecución
+    TareaProgramada.objects.filter(nombre=nombre, bloqueado_por=nodo).update(
+        ultima_ejecucion=fin,
+        proxima_ejecucion=fin + timedelta(seconds=espera),
+        bloqueado_hasta=None,
+        bloqueado_por='',
+    )
+    return exito, duracion
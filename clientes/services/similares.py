@@ -0,0 +1,170 @@
+import re
+import unicodedata
+import zlib
+from array import array
+
+import numpy as np
+
+# Primo de Mersenne 2^31 - 1: (a * x + b) cabe en int64 sin desbordarse
+PRIMO = (1 << 31) - 1
+
+# Formas societarias que no ayudan a distinguir compañías
+SUFIJOS = {'inc', 'llc', 'ltd', 'sa', 'sas', 'srl', 'ltda', 'cia'}
+
+
+def normalizar(texto):
+    """Minúsculas, sin tildes ni puntuación, sin formas societarias."""
+    if not texto:
+        return ''
+    texto = unicodedata.normalize('NFKD', str(texto)).encode('ascii', 'ignore').decode('ascii').lower()
+    palabras = [p for p in re.split(r'[^a-z0-9]+', texto) if p and p not in SUFIJOS]
+    return ' '.join(palabras)
+
+
+def _shingles(texto, k=3):
+    # Sin espacios: "Tech Corp" y "TechCorp" comparten los mismos trigramas
+    texto = texto.replace(' ', '')
+    if not texto:
+        return ()
+    if len(texto) <= k:
+        return (texto,)
+    return {texto[i:i + k] for i in range(len(texto) - k + 1)}
+
+
+def firmas_minhash(textos, num_hashes=60, semilla=7):
+    """
+    Firma MinHash (n, num_hashes) de los trigramas de cada texto, calculada con numpy.
+    Las filas sin texto quedan marcadas en la máscara devuelta y no generan candidatos.
+    """
+    longitudes = np.zeros(len(textos), dtype=np.int64)
+    valores = array('q')
+    for i, texto in enumerate(textos):
+        shingles = _shingles(texto)
+        longitudes[i] = len(shingles)
+        valores.extend(zlib.crc32(s.encode('utf-8')) for s in shingles)
+
+    x = np.frombuffer(valores, dtype=np.int64) % PRIMO
+    con_texto = longitudes > 0
+    inicios = (np.cumsum(longitudes) - longitudes)[con_texto]
+
+    rng = np.random.default_rng(semilla)
+    a = rng.integers(1, PRIMO, size=num_hashes, dtype=np.int64)
+    b = rng.integers(0, PRIMO, size=num_hashes, dtype=np.int64)
+
+    firmas = np.full((len(textos), num_hashes), PRIMO, dtype=np.int64)
+    if len(x):
+        for j in range(num_hashes):
+            h = (a[j] * x + b[j]) % PRIMO
+            firmas[con_texto, j] = np.minimum.reduceat(h, inicios)
+    return firmas, con_texto
+
+
+def pares_candidatos(firmas, con_texto, bandas=12, max_bloque=100):
+    """
+    LSH por bandas: dos filas son candidatas si coinciden en todas las
+    posiciones de alguna banda. Los bloques gigantes (nombres genéricos)
+    se descartan para no volver a un problema cuadrático.
+    Devuelve un array (m, 2) de índices i < j sin repetir.
+    """
+    filas_por_banda = firmas.shape[1] // bandas
+    indices = np.flatnonzero(con_texto)
+    pares = []
+    for banda in range(bandas):
+        bloque = firmas[indices, banda * filas_por_banda:(banda + 1) * filas_por_banda].astype(np.uint64)
+        # Clave de la banda: combinación polinómica (el desbordamiento uint64 es intencional)
+        clave = np.zeros(len(indices), dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for col in range(bloque.shape[1]):
+                clave = clave * np.uint64(1000003) + bloque[:, col]
+
+        orden = np.argsort(clave, kind='stable')
+        _, inicios, cuentas = np.unique(clave[orden], return_index=True, return_counts=True)
+        validos = (cuentas > 1) & (cuentas <= max_bloque)
+        pares_banda = []
+        for inicio, cuenta in zip(inicios[validos], cuentas[validos]):
+            miembros = np.sort(indices[orden[inicio:inicio + cuenta]])
+            i, j = np.triu_indices(cuenta, k=1)
+            pares_banda.append(np.stack([miembros[i], miembros[j]], axis=1))
+        if pares_banda:
+            pares.append(np.unique(np.concatenate(pares_banda), axis=0))
+
+    if not pares:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.unique(np.concatenate(pares), axis=0)
+
+
+def _codigos(textos):
+    """Textos como matriz (n, largo máximo) de códigos de carácter, rellena con 0, y sus largos."""
+    largos = np.fromiter((len(t) for t in textos), dtype=np.int64, count=len(textos))
+    codigos = np.zeros((len(textos), max(int(largos.max(initial=0)), 1)), dtype=np.uint32)
+    for i, texto in enumerate(textos):
+        if texto:
+            codigos[i, :len(texto)] = np.frombuffer(texto.encode('utf-32-le'), dtype=np.uint32)
+    return codigos, largos
+
+
+def similitud_edicion(textos, pares):
+    """
+    1 - distancia de Levenshtein / largo del texto más largo, para cada par.
+    Programación dinámica fila a fila vectorizada sobre todos los pares: la
+    dependencia dentro de la fila (inserciones) se resuelve con un mínimo
+    acumulado, así que solo se itera sobre los caracteres del primer texto.
+    """
+    if not len(pares):
+        return np.empty(0)
+    codigos, largos = _codigos(textos)
+    a, b = codigos[pares[:, 0]], codigos[pares[:, 1]]
+    largo_a, largo_b = largos[pares[:, 0]], largos[pares[:, 1]]
+    filas = np.arange(len(pares))
+    columnas = np.arange(b.shape[1] + 1)
+
+    anterior = np.broadcast_to(columnas, (len(pares), len(columnas))).copy()
+    distancia = largo_b.copy()  # los textos vacíos quedan a distancia largo_b
+    for i in range(1, int(largo_a.max(initial=0)) + 1):
+        sustitucion = anterior[:, :-1] + (a[:, i - 1, None] != b)
+        actual = np.empty_like(anterior)
+        actual[:, 0] = i
+        actual[:, 1:] = np.minimum(anterior[:, 1:] + 1, sustitucion)
+        actual = np.minimum.accumulate(actual - columnas, axis=1) + columnas
+        terminan = largo_a == i
+        distancia[terminan] = actual[filas[terminan], largo_b[terminan]]
+        anterior = actual
+
+    mayor = np.maximum(largo_a, largo_b)
+    return np.where(mayor > 0, 1 - distancia / np.maximum(mayor, 1), 0.0)
+
+
+def detectar_similares(filas, umbral=0.6, peso_nombre=0.6, num_hashes=60, bandas=12, max_bloque=100):
+    """
+    filas: lista de (id, nombre, compania).
+    Devuelve [(id_a, id_b, puntaje, sim_nombre, sim_compania)] con id_a < id_b
+    y puntaje >= umbral.
+    """
+    if len(filas) < 2:
+        return []
+    ids = np.asarray([f[0] for f in filas], dtype=np.int64)
+    nombres = [normalizar(f[1]) for f in filas]
+    companias = [normalizar(f[2]) for f in filas]
+    firmas_n, con_n = firmas_minhash(nombres, num_hashes)
+    firmas_c, con_c = firmas_minhash(companias, num_hashes)
+
+    candidatos = np.unique(np.concatenate([
+        pares_candidatos(firmas_n, con_n, bandas, max_bloque),
+        pares_candidatos(firmas_c, con_c, bandas, max_bloque),
+    ]), axis=0)
+    if not len(candidatos):
+        return []
+
+    # MinHash solo elige candidatos: el puntaje es la similitud real de los textos,
+    # que sí distingue "tech corp" de "techcorp" (mismos trigramas sin espacios)
+    sim_n = similitud_edicion(nombres, candidatos)
+    sim_c = similitud_edicion(companias, candidatos)
+    puntaje = peso_nombre * sim_n + (1 - peso_nombre) * sim_c
+
+    seleccion = puntaje >= umbral
+    a = ids[candidatos[seleccion, 0]]
+    b = ids[candidatos[seleccion, 1]]
+    return [
+        (int(min(x, y)), int(max(x, y)), float(p), float(n), float(c))
+        for x, y, p, n, c in zip(a, b, puntaje[seleccion], sim_n[seleccion], sim_c[seleccion])
+    ]
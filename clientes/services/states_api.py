@@ -1,31 +1,91 @@
-import requests
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+from directorio_project import metricas
+
+CLAVE_CACHE = 'estados_us'
+# Si la API falla se guarda la lista vacía poco tiempo, para no esperar el timeout en cada petición
+TTL_FALLO = 60
+
 
 def fetch_us_states():
-    url = "https://api.entrenandolatinosinroofing.com/api/v1/states/?format=json"
+    """Estados de EE. UU. desde la caché; solo se consulta la API al vencer (STATES_API_CACHE_TTL)."""
+    estados = cache.get(CLAVE_CACHE)
+    if estados is None:
+        estados = descargar_estados()
+        cache.set(CLAVE_CACHE, estados, settings.STATES_API_CACHE_TTL if estados else TTL_FALLO)
+    return estados
+
+
+async def afetch_us_states():
+    """Versión asíncrona de fetch_us_states para las vistas ASGI: no bloquea el bucle de eventos."""
+    estados = await cache.aget(CLAVE_CACHE)
+    if estados is None:
+        estados = await adescargar_estados()
+        await cache.aset(CLAVE_CACHE, estados, settings.STATES_API_CACHE_TTL if estados else TTL_FALLO)
+    return estados
 
+
+async def adescargar_estados():
     try:
-        resp = requests.get(url, timeout=8)
+        import httpx
+    except ImportError:
+        # Sin httpx, la descarga síncrona va a un hilo aparte (no al de la BD)
+        return await sync_to_async(descargar_estados, thread_sensitive=False)()
 
+    inicio = time.perf_counter()
+    try:
+        async with httpx.AsyncClient(timeout=8) as client:
+            resp = await client.get(settings.STATES_API_URL)
         resp.raise_for_status()
+        estados = normalizar_estados(resp.json())
+    except Exception as e:
+        print("ERROR FETCH API:", str(e))
+        metricas.api_estados(time.perf_counter() - inicio, error=type(e).__name__)
+        return []
+    metricas.api_estados(time.perf_counter() - inicio)
+    return estados
 
-        data = resp.json()
 
-        # Validar que la API devolvió una lista
-        if not isinstance(data, list):
-            print("ERROR: API no devolvió una lista:", data)
-            return []
+def descargar_estados():
+    # requests se importa al usar la API, no al arrancar cada worker o comando
+    import requests
 
-        estados = []
+    url = settings.STATES_API_URL
+    inicio = time.perf_counter()
 
-        for item in data:
-            name = item.get("name")
-            code = item.get("geoname_code") or item.get("slug")
+    try:
+        resp = requests.get(url, timeout=8)
 
-            if name and code:
-                estados.append({"name": name, "code": code})
+        resp.raise_for_status()
 
-        return estados
+        estados = normalizar_estados(resp.json())
 
     except Exception as e:
         print("ERROR FETCH API:", str(e))
+        metricas.api_estados(time.perf_counter() - inicio, error=type(e).__name__)
         return []
+
+    metricas.api_estados(time.perf_counter() - inicio)
+    return estados
+
+
+def normalizar_estados(data):
+    # Validar que la API devolvió una lista
+    if not isinstance(data, list):
+        print("ERROR: API no devolvió una lista:", data)
+        return []
+
+    estados = []
+
+    for item in data:
+        name = item.get("name")
+        code = item.get("geoname_code") or item.get("slug")
+
+        if name and code:
+            estados.append({"name": name, "code": code})
+
+    return estados
@@ -1,3 +1,1181 @@
-from django.test import TestCase
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from datetime import timedelta
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from directorio_project import consultas_lentas, metricas, perfilador, replicas
+from directorio_project.middleware import ReplicaMiddleware
+
+from .backends import clave_usuario
+from .models import (
+    Cliente, EjecucionTarea, HistorialCliente, ParSimilar, TareaProgramada,
+    TrabajoImportacion, Usuario, UsuarioCreado,
+)
+from .services.arranque import diferidos_cargados, medir_varias, mediana_ms
+from .services.duplicados import fusionar_duplicados
+from .services.programador import ejecutar_tarea, renovar_bloqueo, tomar_tarea
+from .services.precalentar import PASOS, precalentar
+from .services.states_api import CLAVE_CACHE
+
+ESTADOS = [{'name': 'Texas', 'code': 'TX'}, {'name': 'Florida', 'code': 'FL'}]
+
+_secuencia = count()
+
+
+# -----------------------------
+# Presupuestos de consultas por vista
+# -----------------------------
+# Cada vista debe hacer el mismo número de consultas con pocos o muchos
+# registros (sin N+1) y nunca más que su techo. Si un cambio legítimo
+# necesita más consultas, sube el techo en el mismo commit y explica por qué.
+#   (nombre, método, url(test), datos(test), techo)
+PRESUPUESTOS_VISTAS = [
+    ('lista', 'get', lambda t: reverse('lista_clientes'), None, 2),
+    ('lista_busqueda', 'get', lambda t: reverse('lista_clientes') + '?q=cliente&field=all', None, 2),
+    ('agregar', 'get', lambda t: reverse('agregar_cliente'), None, 0),
+    ('exportar_csv', 'get', lambda t: reverse('exportar_clientes') + '?formato=csv', None, 1),
+    ('exportar_xlsx', 'get', lambda t: reverse('exportar_clientes') + '?formato=xlsx', None, 1),
+    ('detalle', 'get', lambda t: reverse('detalle_cliente', args=[t.cliente_activo().pk]), None, 2),
+    ('detalle_editar', 'post', lambda t: reverse('detalle_cliente', args=[t.cliente_activo().pk]),
+     lambda t: t.datos_edicion(t.cliente_activo()), 8),
+    ('eliminar', 'post', lambda t: reverse('eliminar_cliente', args=[t.cliente_activo().pk]), None, 6),
+    ('eliminar_masivo', 'post', lambda t: reverse('eliminar_clientes_masivo'),
+     lambda t: {'ids': t.ids_activos(5)}, 5),
+    ('eliminados', 'get', lambda t: reverse('clientes_eliminados'), None, 2),
+    ('restaurar', 'get', lambda t: reverse('restaurar_cliente', args=[t.cliente_eliminado().pk]), None, 8),
+    ('restaurar_masivo', 'post', lambda t: reverse('restaurar_clientes_masivo'),
+     lambda t: {'ids': t.ids_eliminados(5)}, 6),
+    ('crear_usuario', 'get', lambda t: reverse('crear_usuario'), None, 0),
+    ('usuarios_creados', 'get', lambda t: reverse('usuarios_creados'), None, 2),
+    ('similares', 'get', lambda t: reverse('clientes_similares'), None, 2),
+    ('resolver_similar', 'post', lambda t: reverse('resolver_similar', args=[t.par_pendiente().pk]),
+     lambda t: {'accion': 'descartar'}, 4),
+    ('importar', 'get', lambda t: reverse('importar_excel'), None, 1),
+    ('estado_importacion', 'get', lambda t: reverse('estado_importacion', args=[t.trabajo.pk]), None, 1),
+]
+
+PRESUPUESTOS_ADMIN = [
+    ('cliente', 6),
+    ('usuario', 6),
+    ('historialcliente', 7),
+    ('usuariocreado', 5),
+    ('trabajoimportacion', 5),
+    ('parsimilar', 5),
+    ('tareaprogramada', 5),
+    ('ejecuciontarea', 6),
+]
+
+
+class SinHTTPSaliente:
+    """Registra (y bloquea) cualquier petición HTTP saliente hecha con requests."""
+
+    def __enter__(self):
+        self.llamadas = []
+
+        def bloquear(sesion, peticion, **kwargs):
+            self.llamadas.append(peticion.url)
+            raise ConnectionError(f"HTTP saliente no permitido: {peticion.url}")
+
+        self._parche = mock.patch('requests.Session.send', bloquear)
+        self._parche.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parche.stop()
+
+
+class PresupuestoConsultasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_superuser('admin_prueba', 'admin@ejemplo.com', 'clave', rol='superadmin')
+        cls.trabajo = TrabajoImportacion.objects.create(archivo='importaciones/prueba.xlsx', creado_por=cls.admin)
+        cls.tarea = TareaProgramada.objects.create(nombre='tarea_prueba')
+
+    def setUp(self):
+        # Los techos suponen la caché compartida de producción (Redis), con el
+        # usuario de la sesión en caché; en un solo proceso LocMemCache equivale
+        compartida = mock.patch('clientes.backends.cache_compartida', return_value=True)
+        compartida.start()
+        self.addCleanup(compartida.stop)
+        cache.clear()
+        cache.set(CLAVE_CACHE, ESTADOS)
+        self.client.force_login(self.admin)
+        # Calienta sesión y usuario en caché: se mide solo el trabajo de la vista
+        self.client.get(reverse('usuarios_creados'))
+
+    # -----------------------------
+    # Datos
+    # -----------------------------
+    def sembrar(self, n):
+        editores = [
+            Usuario.objects.create_user(f"editor{next(_secuencia)}", password='clave')
+            for _ in range(3)
+        ]
+        clientes = []
+        for i in range(n):
+            k = next(_secuencia)
+            clientes.append(Cliente.objects.create(
+                nombre=f"Cliente {k}", compania=f"Compania {k}", identificacion=f"ID-{k}",
+                correo=f"cliente{k}@ejemplo.com", pais='TX', creado_por=editores[i % 3],
+                logo=f"logos/logo{k}.png" if i % 2 else None,
+            ))
+        for i, cliente in enumerate(clientes):
+            HistorialCliente.objects.create(
+                cliente=cliente, campo='nombre', valor_anterior='a', valor_nuevo='b', editado_por=editores[i % 3],
+            )
+            # El historial del primer cliente crece con los datos (detalle muestra su historial)
+            HistorialCliente.objects.create(
+                cliente=Cliente.objects.order_by('pk').first(), campo='compania',
+                valor_anterior='x', valor_nuevo='y', editado_por=editores[i % 3],
+            )
+        eliminados = []
+        for i in range(n):
+            k = next(_secuencia)
+            eliminados.append(Cliente(
+                nombre=f"Eliminado {k}", compania='X', identificacion=f"DEL-{k}", activo=False,
+                fecha_eliminacion='2024-01-01T00:00:00Z', creado_por=editores[i % 3],
+            ))
+        Cliente.objects.bulk_create(eliminados)
+        for i in range(0, n - 1, 2):
+            ParSimilar.objects.create(cliente_a=clientes[i], cliente_b=clientes[i + 1], puntaje=0.9,
+                                      similitud_nombre=0.9, similitud_compania=0.9)
+        for editor in editores:
+            UsuarioCreado.objects.create(creador=self.admin, usuario=editor)
+        for _ in range(n):
+            TrabajoImportacion.objects.create(archivo='importaciones/x.xlsx', creado_por=editores[0])
+            EjecucionTarea.objects.create(tarea=self.tarea, nodo='n', inicio='2024-01-01T00:00:00Z',
+                                          fin='2024-01-01T00:00:01Z', duracion=1.0)
+
+    def cliente_activo(self):
+        return Cliente.activos.order_by('pk').first()
+
+    def datos_edicion(self, cliente):
+        # Mismos valores salvo el nombre: un solo registro de historial por edición
+        return {
+            'nombre': f"Editado {next(_secuencia)}", 'compania': cliente.compania,
+            'identificacion': cliente.identificacion, 'correo': cliente.correo or '',
+            'pais': cliente.pais or '', 'direccion': cliente.direccion or '',
+        }
+
+    def cliente_eliminado(self):
+        return Cliente.objects.filter(activo=False).order_by('pk').first()
+
+    def ids_activos(self, n):
+        return list(Cliente.activos.order_by('-pk').values_list('pk', flat=True)[:n])
+
+    def ids_eliminados(self, n):
+        return list(Cliente.objects.filter(activo=False).order_by('-pk').values_list('pk', flat=True)[:n])
+
+    def par_pendiente(self):
+        return ParSimilar.objects.filter(estado='pendiente').order_by('pk').first()
+
+    # -----------------------------
+    # Medición
+    # -----------------------------
+    def medir(self, metodo, url, datos=None):
+        with SinHTTPSaliente() as http, CaptureQueriesContext(connection) as consultas:
+            respuesta = getattr(self.client, metodo)(url, datos) if datos is not None else getattr(self.client, metodo)(url)
+            if respuesta.streaming:
+                b''.join(respuesta.streaming_content)
+        self.assertLess(respuesta.status_code, 400, url)
+        self.assertEqual(http.llamadas, [], f"{url} hizo HTTP saliente")
+        return len(consultas)
+
+    def comprobar(self, casos):
+        self.sembrar(3)
+        pocos = {nombre: self.medir(metodo, url(self), datos(self) if datos else None)
+                 for nombre, metodo, url, datos, _ in casos}
+        self.sembrar(30)
+        muchos = {nombre: self.medir(metodo, url(self), datos(self) if datos else None)
+                  for nombre, metodo, url, datos, _ in casos}
+        for nombre, _, _, _, techo in casos:
+            with self.subTest(vista=nombre):
+                self.assertEqual(pocos[nombre], muchos[nombre],
+                                 f"{nombre}: las consultas crecen con los datos ({pocos[nombre]} -> {muchos[nombre]})")
+                self.assertLessEqual(muchos[nombre], techo, f"{nombre}: {muchos[nombre]} consultas, techo {techo}")
+
+    # -----------------------------
+    # Pruebas
+    # -----------------------------
+    def test_vistas_clientes(self):
+        self.comprobar(PRESUPUESTOS_VISTAS)
+
+    def test_changelists_admin(self):
+        casos = [
+            (modelo, 'get', lambda t, m=modelo: reverse(f'admin:clientes_{m}_changelist'), None, techo)
+            for modelo, techo in PRESUPUESTOS_ADMIN
+        ]
+        self.comprobar(casos)
+
+    def test_estados_se_piden_una_vez(self):
+        cache.clear()
+        with mock.patch('clientes.services.states_api.descargar_estados', return_value=ESTADOS) as descargar:
+            self.client.get(reverse('lista_clientes'))
+            self.client.get(reverse('agregar_cliente'))
+        self.assertEqual(descargar.call_count, 1)
+
+
+
+# -----------------------------
+# Fusión de duplicados (limpiar_duplicados)
+# -----------------------------
+class FusionDuplicadosTests(TestCase):
+
+    def crear(self, nombre, activo=True, creado_en=None):
+        cliente = Cliente.objects.create(
+            nombre=nombre, compania='C', identificacion='DUP-1', activo=activo,
+            fecha_eliminacion=None if activo else timezone.now(),
+        )
+        if creado_en:
+            Cliente.objects.filter(pk=cliente.pk).update(creado_en=creado_en)
+        HistorialCliente.objects.create(cliente=cliente, campo='nombre', valor_anterior='-', valor_nuevo=nombre)
+        return cliente
+
+    def test_no_toca_eliminados_por_defecto(self):
+        activo = self.crear('Activo')
+        eliminado = self.crear('Eliminado', activo=False)
+
+        self.assertEqual(fusionar_duplicados(Cliente, HistorialCliente), 0)
+        self.assertTrue(Cliente.objects.filter(pk=eliminado.pk).exists())
+        self.assertEqual(HistorialCliente.objects.filter(cliente=activo).count(), 1)
+
+    def test_superviviente_activo_recibe_el_historial(self):
+        eliminado = self.crear('Eliminado', activo=False, creado_en='2030-01-01T00:00:00Z')
+        activo = self.crear('Activo', creado_en='2020-01-01T00:00:00Z')
+
+        self.assertEqual(fusionar_duplicados(Cliente, HistorialCliente, incluir_eliminados=True), 1)
+        # Gana el activo aunque el eliminado sea más reciente
+        self.assertEqual(list(Cliente.objects.values_list('pk', flat=True)), [activo.pk])
+        campos = sorted(HistorialCliente.objects.filter(cliente=activo).values_list('campo', 'valor_nuevo'))
+        self.assertEqual(campos, [('fusion_duplicado', f"#{activo.pk}"), ('nombre', 'Activo'), ('nombre', 'Eliminado')])
+        fusion = HistorialCliente.objects.get(campo='fusion_duplicado')
+        self.assertEqual(fusion.valor_anterior, f"Eliminado (#{eliminado.pk})")
+
+    def test_sin_activos_sobrevive_el_mas_reciente(self):
+        self.crear('Viejo', activo=False, creado_en='2020-01-01T00:00:00Z')
+        reciente = self.crear('Reciente', activo=False, creado_en='2021-01-01T00:00:00Z')
+
+        fusionar_duplicados(Cliente, HistorialCliente, incluir_eliminados=True)
+        self.assertEqual(list(Cliente.objects.values_list('pk', flat=True)), [reciente.pk])
+        self.assertEqual(HistorialCliente.objects.filter(cliente=reciente, campo='nombre').count(), 2)
+
+
+class MigracionDuplicadosTests(TransactionTestCase):
+    """Una BD con duplicados activos en 0013 debe poder migrar hasta el final."""
+    ANTES = [('clientes', '0013_indices_marca_de_agua')]
+
+    def test_migrar_desde_0013_con_duplicados(self):
+        from django.db.migrations.executor import MigrationExecutor
+        executor = MigrationExecutor(connection)
+        ultimas = executor.loader.graph.leaf_nodes('clientes')
+        executor.migrate(self.ANTES)
+        apps = executor.loader.project_state(self.ANTES).apps
+        Cliente0013 = apps.get_model('clientes', 'Cliente')
+        Historial0013 = apps.get_model('clientes', 'HistorialCliente')
+        viejo = Cliente0013.objects.create(nombre='Viejo', compania='C', identificacion='MIG-1')
+        nuevo = Cliente0013.objects.create(nombre='Nuevo', compania='C', identificacion='MIG-1')
+        eliminado = Cliente0013.objects.create(nombre='Baja', compania='C', identificacion='MIG-1', activo=False)
+        Cliente0013.objects.filter(pk=viejo.pk).update(creado_en=timezone.now() - timedelta(days=1))
+        Historial0013.objects.create(cliente_id=viejo.pk, campo='nombre', valor_nuevo='Viejo')
+
+        executor = MigrationExecutor(connection)
+        executor.migrate(ultimas)
+
+        self.assertEqual(set(Cliente.objects.values_list('pk', flat=True)), {nuevo.pk, eliminado.pk})
+        self.assertEqual(
+            sorted(HistorialCliente.objects.filter(cliente_id=nuevo.pk).values_list('campo', flat=True)),
+            ['fusion_duplicado', 'nombre'],
+        )
+
+
+# -----------------------------
+# Usuario de la sesión en caché
+# -----------------------------
+class UsuarioCacheadoTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        cache.set(CLAVE_CACHE, ESTADOS)
+        self.usuario = Usuario.objects.create_user('cacheado', password='clave')
+        self.client.force_login(self.usuario)
+
+    def assertSinAcceso(self):
+        respuesta = self.client.get(reverse('lista_clientes'))
+        self.assertEqual(respuesta.status_code, 302)
+        self.assertIn(reverse('login'), respuesta['Location'])
+
+    def test_sin_cache_compartida_no_guarda_usuarios(self):
+        self.client.get(reverse('lista_clientes'))
+        self.assertIsNone(cache.get(clave_usuario(self.usuario.pk)))
+
+    @mock.patch('clientes.backends.cache_compartida', return_value=True)
+    def test_desactivar_con_save_corta_el_acceso(self, _):
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 200)
+        self.assertIsNotNone(cache.get(clave_usuario(self.usuario.pk)))
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertSinAcceso()
+
+    @mock.patch('clientes.backends.cache_compartida', return_value=True)
+    def test_desactivar_con_update_corta_el_acceso(self, _):
+        self.assertEqual(self.client.get(reverse('lista_clientes')).status_code, 200)
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertSinAcceso()
+
+
+# -----------------------------
+# Programador: bloqueo entre nodos
+# -----------------------------
+class ProgramadorTests(TestCase):
+    CONFIG = {'comando': 'limpiar_duplicados', 'args': ['--dry-run'], 'cada': 60, 'bloqueo': 300}
+
+    def setUp(self):
+        self.tarea = TareaProgramada.objects.create(nombre='duplicados')
+
+    def test_un_solo_nodo_toma_la_tarea(self):
+        self.assertTrue(tomar_tarea('duplicados', 'nodo-a', 300))
+        self.assertFalse(tomar_tarea('duplicados', 'nodo-b', 300))
+
+    def test_bloqueo_vencido_pasa_a_otro_nodo(self):
+        tomar_tarea('duplicados', 'nodo-a', 300)
+        TareaProgramada.objects.filter(pk=self.tarea.pk).update(bloqueado_hasta=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(tomar_tarea('duplicados', 'nodo-b', 300))
+        # El nodo original ya no puede renovarlo
+        self.assertFalse(renovar_bloqueo('duplicados', 'nodo-a', 300))
+        self.assertTrue(renovar_bloqueo('duplicados', 'nodo-b', 300))
+
+    def test_ejecucion_libera_y_reprograma(self):
+        tomar_tarea('duplicados', 'nodo-a', 300)
+        exito, _ = ejecutar_tarea('duplicados', self.CONFIG, 'nodo-a')
+        self.tarea.refresh_from_db()
+        self.assertTrue(exito)
+        self.assertEqual((self.tarea.bloqueado_por, self.tarea.bloqueado_hasta), ('', None))
+        self.assertGreater(self.tarea.proxima_ejecucion, timezone.now())
+
+    def test_sin_bloqueo_no_reprograma_la_tarea_de_otro(self):
+        tomar_tarea('duplicados', 'nodo-a', 300)
+
+        def robar(*args, **kwargs):
+            TareaProgramada.objects.filter(pk=self.tarea.pk).update(bloqueado_por='nodo-b')
+
+        with mock.patch('clientes.services.programador.call_command', side_effect=robar):
+            ejecutar_tarea('duplicados', self.CONFIG, 'nodo-a')
+        self.tarea.refresh_from_db()
+        self.assertEqual(self.tarea.bloqueado_por, 'nodo-b')
+        self.assertIsNone(self.tarea.ultima_ejecucion)
+
+
+class RenovadorBloqueoTests(TransactionTestCase):
+
+    def test_renueva_mientras_la_tarea_corre(self):
+        TareaProgramada.objects.create(nombre='larga')
+        tomar_tarea('larga', 'nodo-a', 0.3)
+        vistos = []
+
+        def tarea_larga(*args, **kwargs):
+            for _ in range(3):
+                time.sleep(0.2)
+                vistos.append((timezone.now(), TareaProgramada.objects.get(nombre='larga').bloqueado_hasta))
+
+        config = {'comando': 'x', 'cada': 60, 'bloqueo': 0.3}
+        with mock.patch('clientes.services.programador.call_command', side_effect=tarea_larga):
+            ejecutar_tarea('larga', config, 'nodo-a')
+        # Dura el doble que el bloqueo y nunca llega a vencer
+        for ahora, hasta in vistos:
+            self.assertGreater(hasta, ahora)
+
+
+# -----------------------------
+# Snapshot incremental (snapshot_directorio)
+# -----------------------------
+class SnapshotDirectorioTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.destino = Path(carpeta.name)
+
+    def snapshot(self):
+        call_command('snapshot_directorio', destino=str(self.destino), margen=0, stdout=StringIO())
+
+    def leer(self, tabla, patron='*.parquet'):
+        import pandas as pd
+        archivos = sorted((self.destino / tabla).glob(patron))
+        return archivos, (pd.concat(pd.read_parquet(a) for a in archivos) if archivos else None)
+
+    def hace_un_rato(self, *modelos):
+        # Las fechas de Cliente van sin microsegundos: se alejan del instante del corte
+        antes = timezone.now() - timedelta(seconds=2)
+        for modelo in modelos:
+            modelo.objects.update(actualizado_en=antes)
+
+    def test_sin_cambios_no_escribe_archivos(self):
+        Cliente.objects.create(nombre='A', compania='C', identificacion='S-1')
+        self.hace_un_rato(Cliente, HistorialCliente)
+        self.snapshot()
+        archivos, _ = self.leer('cliente')
+        self.snapshot()
+        self.assertEqual(self.leer('cliente')[0], archivos)
+
+    def test_borrados_y_updates_masivos_llegan_al_snapshot(self):
+        borrado = Cliente.objects.create(nombre='B', compania='C', identificacion='S-2')
+        otro = Cliente.objects.create(nombre='O', compania='C', identificacion='S-3')
+        historial = HistorialCliente.objects.create(cliente=borrado, campo='nombre', valor_nuevo='B')
+        self.hace_un_rato(Cliente, HistorialCliente)
+        self.snapshot()
+
+        # Fusión: el historial pasa a otro cliente y el duplicado se borra
+        Cliente.objects.filter(pk=borrado.pk).update(activo=False, identificacion='S-3')
+        self.hace_un_rato(Cliente)
+        fusionar_duplicados(Cliente, HistorialCliente, incluir_eliminados=True)
+        self.hace_un_rato(HistorialCliente)
+        self.snapshot()
+
+        _, lapidas = self.leer('cliente', 'cliente_borrados_*.parquet')
+        self.assertEqual(list(lapidas['id']), [borrado.pk])
+        _, filas = self.leer('historial', 'historial_2*.parquet')
+        ultima = filas[filas['id'] == historial.pk].iloc[-1]
+        self.assertEqual(ultima['cliente_id'], otro.pk)
+
+        # Las lápidas tienen su propia marca de agua: no se repiten
+        archivos, _ = self.leer('cliente', 'cliente_borrados_*.parquet')
+        self.snapshot()
+        self.assertEqual(self.leer('cliente', 'cliente_borrados_*.parquet')[0], archivos)
+
+    def test_la_purga_deja_lapidas_del_cliente_y_su_historial(self):
+        viejo = timezone.now() - timedelta(days=90)
+        cliente = Cliente.objects.create(nombre='P', compania='C', identificacion='S-4')
+        historial = HistorialCliente.objects.create(cliente=cliente, campo='nombre', valor_nuevo='P')
+        Cliente.objects.filter(pk=cliente.pk).update(activo=False, fecha_eliminacion=viejo)
+        call_command('limpiar_clientes_eliminados', stdout=StringIO())
+        self.snapshot()
+
+        _, lapidas = self.leer('cliente', 'cliente_borrados_*.parquet')
+        self.assertEqual(list(lapidas['id']), [cliente.pk])
+        _, lapidas = self.leer('historial', 'historial_borrados_*.parquet')
+        self.assertEqual(list(lapidas['id']), [historial.pk])
+
+# -----------------------------
+# Acciones masivas (eliminar / restaurar)
+# -----------------------------
+class AccionesMasivasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin_masivo', password='x', rol='admin')
+
+    def setUp(self):
+        cache.set(CLAVE_CACHE, ESTADOS)
+        self.client.force_login(self.admin)
+
+    def mensajes(self, respuesta):
+        return [str(m) for m in respuesta.context['messages']] if respuesta.context else []
+
+    def test_eliminar_todos_los_resultados_de_la_busqueda(self):
+        for i in range(3):
+            Cliente.objects.create(nombre=f'Acme {i}', compania='C', identificacion=f'M-{i}')
+        otro = Cliente.objects.create(nombre='Otra', compania='C', identificacion='M-9')
+        self.client.post(reverse('eliminar_clientes_masivo'), {'todos': '1', 'q': 'Acme', 'field': 'nombre'})
+        self.assertEqual(Cliente.activos.count(), 1)
+        self.assertTrue(Cliente.activos.filter(pk=otro.pk).exists())
+        self.assertEqual(HistorialCliente.objects.filter(campo='fecha_eliminacion').count(), 3)
+
+    def test_restaurar_omite_identificaciones_ocupadas(self):
+        ahora = timezone.now()
+        libre = Cliente.objects.create(nombre='L', compania='C', identificacion='R-1', activo=False, fecha_eliminacion=ahora)
+        ocupado = Cliente.objects.create(nombre='O', compania='C', identificacion='R-2', activo=False, fecha_eliminacion=ahora)
+        Cliente.objects.create(nombre='A', compania='C', identificacion='R-2')
+        respuesta = self.client.post(reverse('restaurar_clientes_masivo'), {'ids': [libre.pk, ocupado.pk]}, follow=True)
+        libre.refresh_from_db()
+        ocupado.refresh_from_db()
+        self.assertTrue(libre.activo)
+        self.assertFalse(ocupado.activo)
+        self.assertTrue(any('1 clientes no se restauraron' in m for m in self.mensajes(respuesta)))
+
+    @mock.patch('clientes.views.MAX_SELECCION', 2)
+    def test_seleccion_mayor_que_el_maximo_se_rechaza_entera(self):
+        for i in range(3):
+            Cliente.objects.create(nombre=f'Acme {i}', compania='C', identificacion=f'X-{i}')
+        respuesta = self.client.post(reverse('eliminar_clientes_masivo'), {'todos': '1', 'q': 'Acme'}, follow=True)
+        self.assertEqual(Cliente.activos.count(), 3)
+        self.assertTrue(any('supera el máximo' in m for m in self.mensajes(respuesta)))
+
+
+# -----------------------------
+# Alta masiva de usuarios desde CSV
+# -----------------------------
+class AltaUsuariosCsvTests(TestCase):
+
+    CSV = (
+        "username,password,email,rol\n"
+        "ana_csv,Clave-Segura-123,ana@example.com,admin\n"
+        "luis_csv,Clave-Segura-456,,usuario\n"
+    )
+
+    def test_admin_crea_usuarios_sin_arrancar_procesos(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        admin_sitio = Usuario.objects.create_superuser('root_csv', 'root@example.com', 'x')
+        self.client.force_login(admin_sitio)
+        archivo = SimpleUploadedFile('usuarios.csv', self.CSV.encode(), content_type='text/csv')
+        with mock.patch('clientes.services.hash_paralelo.ProcessPoolExecutor') as pool:
+            respuesta = self.client.post(reverse('admin:clientes_usuario_importar_csv'), {'archivo': archivo})
+        self.assertRedirects(respuesta, reverse('admin:clientes_usuario_changelist'))
+        pool.assert_not_called()
+        ana = Usuario.objects.get(username='ana_csv')
+        self.assertEqual(ana.rol, 'admin')
+        self.assertTrue(ana.check_password('Clave-Segura-123'))
+        self.assertEqual(UsuarioCreado.objects.filter(creador=admin_sitio).count(), 2)
+
+    def test_errores_no_crean_ningun_usuario(self):
+        from clientes.services.alta_usuarios import leer_csv, validar_filas
+        Usuario.objects.create_user('luis_csv', password='x')
+        errores = validar_filas(leer_csv(StringIO(self.CSV)))
+        self.assertEqual(errores, ["Fila 3: el usuario 'luis_csv' ya existe."])
+
+    def test_pool_limitado(self):
+        from clientes.services import hash_paralelo
+        with mock.patch('os.cpu_count', return_value=64), \
+                mock.patch.object(hash_paralelo, 'ProcessPoolExecutor') as pool:
+            pool.return_value.__enter__.return_value.map.return_value = []
+            hash_paralelo.hashear_passwords(['x'] * hash_paralelo.MIN_PARA_POOL)
+        self.assertEqual(pool.call_args.kwargs['max_workers'], hash_paralelo.MAX_PROCESOS)
+
+
+# -----------------------------
+# Worker de importaciones
+# -----------------------------
+class WorkerImportacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = Usuario.objects.create_user(username='admin_imp', password='x', rol='admin')
+
+    def trabajo(self, **campos):
+        return TrabajoImportacion.objects.create(archivo='importaciones/x.xlsx', creado_por=self.admin, **campos)
+
+    def recuperar(self):
+        from clientes.management.commands.procesar_importaciones import Command
+        Command(stdout=StringIO()).recuperar_abandonados(latido_max=60)
+
+    def test_trabajo_sin_latido_vuelve_a_la_cola(self):
+        hace_rato = timezone.now() - timedelta(minutes=5)
+        caido = self.trabajo(estado='procesando', iniciado_en=hace_rato, latido_en=hace_rato, intentos=1)
+        vivo = self.trabajo(estado='procesando', iniciado_en=hace_rato, latido_en=timezone.now(), intentos=1)
+        agotado = self.trabajo(estado='procesando', iniciado_en=hace_rato, latido_en=hace_rato, intentos=3)
+        self.recuperar()
+        estados = dict(TrabajoImportacion.objects.values_list('pk', 'estado'))
+        self.assertEqual(estados[caido.pk], 'pendiente')
+        self.assertEqual(estados[vivo.pk], 'procesando')
+        self.assertEqual(estados[agotado.pk], 'fallido')
+
+    def test_estado_sin_permiso_responde_json(self):
+        trabajo = self.trabajo()
+        url = reverse('estado_importacion', args=[trabajo.pk])
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 401)
+        self.assertIn('error', respuesta.json())
+
+        usuario = Usuario.objects.create_user(username='normal_imp', password='x', rol='usuario')
+        self.client.force_login(usuario)
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 403)
+        self.assertIn('error', respuesta.json())
+
+
+
+class LatidoImportacionTests(TransactionTestCase):
+
+    def test_late_mientras_lee_el_excel(self):
+        from clientes.management.commands.procesar_importaciones import Command
+        admin = Usuario.objects.create_user(username='admin_latido', password='x', rol='admin')
+        TrabajoImportacion.objects.create(archivo='importaciones/x.xlsx', creado_por=admin)
+        trabajo = Command().tomar_trabajo()
+        vistos = []
+
+        def importar_lento(*args, **kwargs):
+            # Sin llamar a progreso: p. ej. leyendo un libro grande
+            for _ in range(3):
+                time.sleep(0.2)
+                vistos.append((timezone.now(), TrabajoImportacion.objects.get(pk=trabajo.pk).latido_en))
+            return {'total': 0, 'insertados': 0, 'actualizados': 0, 'sin_cambios': 0, 'fallidos': 0, 'errores': []}
+
+        ruta = 'clientes.management.commands.procesar_importaciones.importar_clientes'
+        with mock.patch(ruta, side_effect=importar_lento):
+            Command(stdout=StringIO()).procesar(trabajo, latido_max=0.3)
+        for ahora, latido in vistos:
+            self.assertLess((ahora - latido).total_seconds(), 0.3)
+        self.assertEqual(TrabajoImportacion.objects.get(pk=trabajo.pk).estado, 'completado')
+
+# -----------------------------
+# Importación incremental desde Excel
+# -----------------------------
+class ImportadorExcelTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        self.ruta = Path(carpeta.name) / 'clientes.xlsx'
+
+    def importar(self, filas):
+        from openpyxl import Workbook
+        from clientes.services.importador_excel import importar_clientes
+        libro = Workbook()
+        hoja = libro.active
+        hoja.append(['Cliente', 'Compañía', 'ID'])
+        for fila in filas:
+            hoja.append(fila)
+        libro.save(self.ruta)
+        return importar_clientes(self.ruta, log=lambda mensaje: None)
+
+    def test_solo_se_tocan_las_filas_que_cambian(self):
+        resumen = self.importar([['Ana', 'Acme', 'E-1'], ['Luis', 'Beta', 'E-2']])
+        self.assertEqual((resumen['insertados'], resumen['sin_cambios']), (2, 0))
+        historial = HistorialCliente.objects.count()
+
+        resumen = self.importar([['Ana', 'Acme', 'E-1'], ['Luis', 'Beta', 'E-2']])
+        self.assertEqual((resumen['insertados'], resumen['actualizados'], resumen['sin_cambios']), (0, 0, 2))
+        self.assertEqual(HistorialCliente.objects.count(), historial)
+
+        resumen = self.importar([['Ana María', 'Acme', 'E-1'], ['Luis', 'Beta', 'E-2'], ['Eva', 'Gamma', 'E-3']])
+        self.assertEqual((resumen['insertados'], resumen['actualizados'], resumen['sin_cambios']), (1, 1, 1))
+        self.assertEqual(Cliente.objects.get(identificacion='E-1').nombre, 'Ana María')
+        self.assertTrue(HistorialCliente.objects.filter(campo='nombre', valor_nuevo='Ana María').exists())
+
+    def test_prefiere_el_activo_y_restaura_si_solo_hay_eliminados(self):
+        ahora = timezone.now()
+        activo = Cliente.objects.create(nombre='Ana', compania='Acme', identificacion='E-1')
+        Cliente.objects.create(nombre='Ana vieja', compania='Acme', identificacion='E-1', activo=False, fecha_eliminacion=ahora)
+        antiguo = Cliente.objects.create(nombre='Luis', compania='Beta', identificacion='E-2', activo=False,
+                                         fecha_eliminacion=ahora - timedelta(days=3))
+        reciente = Cliente.objects.create(nombre='Luis', compania='Beta', identificacion='E-2', activo=False,
+                                          fecha_eliminacion=ahora - timedelta(days=1))
+
+        resumen = self.importar([['Ana María', 'Acme', 'E-1'], ['Luis', 'Beta', 'E-2']])
+        self.assertEqual((resumen['insertados'], resumen['actualizados'], resumen['fallidos']), (0, 2, 0))
+        activo.refresh_from_db()
+        self.assertEqual(activo.nombre, 'Ana María')
+        self.assertEqual(list(Cliente.activos.filter(identificacion='E-2').values_list('pk', flat=True)), [reciente.pk])
+        antiguo.refresh_from_db()
+        self.assertFalse(antiguo.activo)
+
+    def test_identificacion_repetida_en_el_archivo(self):
+        resumen = self.importar([['Ana', 'Acme', 'E-1'], ['Otra', 'Acme', 'E-1']])
+        self.assertEqual((resumen['insertados'], resumen['fallidos']), (1, 1))
+        self.assertIn('repetida', resumen['errores'][0])
+
+
+# -----------------------------
+# Exportación CSV / XLSX
+# -----------------------------
+class ExportarClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        Cliente.objects.create(nombre='Acme Uno', compania='C', identificacion='X-1', correo='uno@acme.com')
+        Cliente.objects.create(nombre='Beta', compania='C', identificacion='X-2')
+        Cliente.objects.create(nombre='Acme Baja', compania='C', identificacion='X-3', activo=False, fecha_eliminacion=timezone.now())
+
+    def exportar(self, rol, **params):
+        usuario = Usuario.objects.create_user(f'exporta_{rol}', password='x', rol=rol)
+        self.client.force_login(usuario)
+        return self.client.get(reverse('exportar_clientes'), params)
+
+    def test_csv_respeta_busqueda_y_rol(self):
+        import csv
+        respuesta = self.exportar('usuario', q='Acme')
+        self.assertTrue(respuesta.streaming)
+        filas = list(csv.reader(b''.join(respuesta.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertNotIn('Correo', filas[0])
+        self.assertEqual([fila[filas[0].index('ID')] for fila in filas[1:]], ['X-1'])
+
+    def test_xlsx_con_contacto_para_admin(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+        respuesta = self.exportar('admin', formato='xlsx')
+        hoja = load_workbook(BytesIO(b''.join(respuesta.streaming_content))).active
+        filas = list(hoja.values)
+        self.assertIn('Correo', filas[0])
+        self.assertEqual(sorted(fila[filas[0].index('ID')] for fila in filas[1:]), ['X-1', 'X-2'])
+
+
+# -----------------------------
+# Purga de clientes eliminados
+# -----------------------------
+class PurgaClientesTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = override_settings(MEDIA_ROOT=carpeta.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        self.logos = Path(carpeta.name) / 'logos'
+        self.logos.mkdir()
+
+    def cliente(self, identificacion, dias_eliminado=None, logo=''):
+        cliente = Cliente.objects.create(nombre=identificacion, compania='C', identificacion=identificacion)
+        campos = {'logo': logo}
+        if dias_eliminado is not None:
+            campos.update(activo=False, fecha_eliminacion=timezone.now() - timedelta(days=dias_eliminado))
+        Cliente.objects.filter(pk=cliente.pk).update(**campos)
+        if logo:
+            (self.logos.parent / logo).write_bytes(b'png')
+        return cliente
+
+    def test_borra_por_lotes_y_respeta_logos_compartidos(self):
+        for i in range(5):
+            self.cliente(f'P-{i}', dias_eliminado=40, logo='logos/excel_compartido.png' if i == 0 else f'logos/excel_{i}.png')
+        reciente = self.cliente('P-reciente', dias_eliminado=5)
+        activo = self.cliente('P-activo', logo='logos/excel_compartido.png')
+        HistorialCliente.objects.create(cliente_id=Cliente.objects.get(identificacion='P-1').pk, campo='nombre')
+
+        salida = StringIO()
+        call_command('limpiar_clientes_eliminados', lote=2, stdout=salida)
+
+        self.assertEqual(set(Cliente.objects.values_list('pk', flat=True)), {reciente.pk, activo.pk})
+        self.assertEqual(salida.getvalue().count('Lote de'), 3)
+        self.assertFalse(HistorialCliente.objects.filter(campo='nombre').exists())
+        self.assertEqual(sorted(p.name for p in self.logos.iterdir()), ['excel_compartido.png'])
+
+    def test_dry_run_no_borra(self):
+        self.cliente('P-0', dias_eliminado=40)
+        call_command('limpiar_clientes_eliminados', dry_run=True, stdout=StringIO())
+        self.assertEqual(Cliente.objects.count(), 1)
+
+    @override_settings(PURGA_DIAS_RETENCION=7)
+    def test_la_retencion_sale_de_settings(self):
+        admin = Usuario.objects.create_user('purga_admin', password='x', rol='admin')
+        cliente = self.cliente('P-0')
+        self.cliente('P-1', dias_eliminado=10)
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('eliminar_cliente', args=[cliente.pk]))
+        self.assertIn('en 7 días', str(list(get_messages(respuesta.wsgi_request))[0]))
+
+        call_command('limpiar_clientes_eliminados', stdout=StringIO())
+        self.assertEqual(list(Cliente.objects.values_list('pk', flat=True)), [cliente.pk])
+
+
+# -----------------------------
+# Clientes similares (MinHash/LSH)
+# -----------------------------
+class ClientesSimilaresTests(TestCase):
+
+    def test_normalizar(self):
+        from clientes.services.similares import normalizar
+        self.assertEqual(normalizar('Compañía Técnica, SA'), 'compania tecnica')
+
+    def test_detecta_variantes_y_no_lo_distinto(self):
+        from clientes.services.similares import detectar_similares
+        filas = [
+            (1, 'Tech Corp Inc.', 'Roofing Latinos'),
+            (2, 'TechCorp', 'Roofing Latinos LLC'),
+            (3, 'Panadería Sol', 'Hornos del Norte'),
+        ]
+        pares = detectar_similares(filas)
+        self.assertEqual([(a, b) for a, b, *_ in pares], [(1, 2)])
+        _, _, puntaje, sim_nombre, sim_compania = pares[0]
+        self.assertGreaterEqual(puntaje, 0.6)
+        # Distancia de edición real: 'tech corp' -> 'techcorp' es un borrado de 9 caracteres
+        self.assertAlmostEqual(sim_nombre, 8 / 9)
+        self.assertEqual(sim_compania, 1.0)
+
+    def test_similitud_edicion(self):
+        import numpy as np
+        from clientes.services.similares import similitud_edicion
+        textos = ['kitten', 'sitting', '', 'flaw', 'lawn']
+        similitudes = similitud_edicion(textos, np.array([[0, 1], [0, 2], [2, 2], [3, 4]]))
+        self.assertEqual(list(np.round(similitudes, 4)), [round(1 - 3 / 7, 4), 0.0, 0.0, 0.5])
+
+    def test_bloques_genericos_se_ignoran(self):
+        from clientes.services.similares import detectar_similares
+        filas = [(i, 'Cliente', '') for i in range(1, 6)]
+        self.assertEqual(len(detectar_similares(filas)), 10)
+        self.assertEqual(detectar_similares(filas, max_bloque=4), [])
+
+    def test_comando_conserva_pares_revisados(self):
+        a = Cliente.objects.create(nombre='Tech Corp', compania='Roofing', identificacion='L-1')
+        b = Cliente.objects.create(nombre='TechCorp Inc', compania='Roofing', identificacion='L-2')
+        Cliente.objects.create(nombre='Otra Cosa', compania='Distinta', identificacion='L-3')
+        call_command('detectar_similares', stdout=StringIO())
+        par = ParSimilar.objects.get()
+        self.assertEqual((par.cliente_a_id, par.cliente_b_id, par.estado), (a.pk, b.pk, 'pendiente'))
+
+        ParSimilar.objects.update(estado='descartado')
+        call_command('detectar_similares', stdout=StringIO())
+        self.assertEqual(list(ParSimilar.objects.values_list('estado', flat=True)), ['descartado'])
+
+    def test_comando_vuelve_a_puntuar_los_pendientes(self):
+        a = Cliente.objects.create(nombre='Tech Corp', compania='Roofing', identificacion='L-1')
+        b = Cliente.objects.create(nombre='TechCorp', compania='Roofing', identificacion='L-2')
+        c = Cliente.objects.create(nombre='Tech Corp', compania='Roofing', identificacion='L-3')
+        ParSimilar.objects.create(cliente_a=a, cliente_b=b, puntaje=0.1)
+        d = Cliente.objects.create(nombre='Otra', compania='Distinta', identificacion='L-4')
+        ParSimilar.objects.create(cliente_a=a, cliente_b=c, puntaje=0.1, estado='descartado')
+        obsoleto = ParSimilar.objects.create(cliente_a=a, cliente_b=d, puntaje=0.9)
+
+        call_command('detectar_similares', stdout=StringIO())
+        pendiente = ParSimilar.objects.get(cliente_a=a, cliente_b=b)
+        self.assertGreater(pendiente.puntaje, 0.9)
+        self.assertEqual(ParSimilar.objects.get(cliente_a=a, cliente_b=c).puntaje, 0.1)
+        self.assertFalse(ParSimilar.objects.filter(pk=obsoleto.pk).exists())
+
+    def test_un_par_se_resuelve_una_sola_vez(self):
+        a = Cliente.objects.create(nombre='Tech Corp', compania='Roofing', identificacion='L-1')
+        b = Cliente.objects.create(nombre='TechCorp', compania='Roofing', identificacion='L-2')
+        par = ParSimilar.objects.create(cliente_a=a, cliente_b=b, puntaje=0.9)
+        primero = Usuario.objects.create_user('revisa_1', password='x', rol='admin')
+        segundo = Usuario.objects.create_user('revisa_2', password='x', rol='admin')
+        url = reverse('resolver_similar', args=[par.pk])
+
+        self.client.force_login(primero)
+        self.client.post(url, {'accion': 'conservar_a'})
+        self.client.force_login(segundo)
+        self.client.post(url, {'accion': 'conservar_b'})
+
+        self.assertEqual(list(Cliente.activos.values_list('pk', flat=True)), [a.pk])
+        par.refresh_from_db()
+        self.assertEqual((par.estado, par.revisado_por_id), ('fusionado', primero.pk))
+
+
+# -----------------------------
+# Router de réplicas
+# -----------------------------
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICA_FIJAR_SEGUNDOS=10)
+class RouterReplicasTests(SimpleTestCase):
+    """Decisiones del router; no hace falta una segunda BD real."""
+
+    def setUp(self):
+        self.router = replicas.RouterReplicas()
+        self.factory = RequestFactory()
+
+    def peticion(self, request, escribir=False):
+        """Pasa la petición por ReplicaMiddleware y una vista de lectura; devuelve (bd de lectura, respuesta)."""
+        leidas = []
+
+        @replicas.lectura_en_replica
+        def vista(request):
+            leidas.append(self.router.db_for_read(Cliente))
+            if escribir:
+                self.router.db_for_write(Cliente)
+                leidas.append(self.router.db_for_read(Cliente))
+            return HttpResponse()
+
+        respuesta = ReplicaMiddleware(vista)(request)
+        return leidas, respuesta
+
+    def test_get_lee_de_la_replica(self):
+        leidas, respuesta = self.peticion(self.factory.get('/'))
+        self.assertEqual(leidas, ['replica'])
+        self.assertNotIn(replicas.COOKIE_FIJAR, respuesta.cookies)
+
+    def test_post_lee_de_la_primaria_y_fija(self):
+        leidas, respuesta = self.peticion(self.factory.post('/'), escribir=True)
+        self.assertEqual(leidas, [None, None])
+        self.assertEqual(respuesta.cookies[replicas.COOKIE_FIJAR]['max-age'], 10)
+
+    def test_tras_escribir_lee_de_la_primaria(self):
+        leidas, respuesta = self.peticion(self.factory.get('/'), escribir=True)
+        self.assertEqual(leidas, ['replica', None])
+        self.assertIn(replicas.COOKIE_FIJAR, respuesta.cookies)
+
+    def test_cookie_vigente_fija_a_la_primaria(self):
+        request = self.factory.get('/')
+        request.COOKIES[replicas.COOKIE_FIJAR] = str(time.time() + 5)
+        self.assertEqual(self.peticion(request)[0], [None])
+        request = self.factory.get('/')
+        request.COOKIES[replicas.COOKIE_FIJAR] = str(time.time() - 1)
+        self.assertEqual(self.peticion(request)[0], ['replica'])
+
+    def test_sesiones_no_fijan_y_se_leen_de_la_primaria(self):
+        from django.contrib.sessions.models import Session
+        leidas = []
+
+        @replicas.lectura_en_replica
+        def vista(request):
+            leidas.append(self.router.db_for_read(Session))
+            self.router.db_for_write(Session)
+            leidas.append(self.router.db_for_read(Cliente))
+            return HttpResponse()
+
+        respuesta = ReplicaMiddleware(vista)(self.factory.get('/'))
+        self.assertEqual(leidas, ['default', 'replica'])
+        self.assertNotIn(replicas.COOKIE_FIJAR, respuesta.cookies)
+
+    def test_middleware_debajo_de_sesiones(self):
+        from django.conf import settings
+        middleware = settings.MIDDLEWARE
+        self.assertLess(
+            middleware.index('django.contrib.sessions.middleware.SessionMiddleware'),
+            middleware.index('directorio_project.middleware.ReplicaMiddleware'),
+        )
+
+    def test_fuera_de_peticion_usa_la_primaria(self):
+        # Comandos, programador, worker de importación
+        self.assertIsNone(self.router.db_for_read(Cliente))
+        self.assertEqual(self.router.db_for_write(Cliente), 'default')
+
+    def test_migraciones_solo_en_la_primaria(self):
+        self.assertTrue(self.router.allow_migrate('default', 'clientes'))
+        self.assertFalse(self.router.allow_migrate('replica', 'clientes'))
+
+
+# -----------------------------
+# Consultas lentas: agrupación por forma de SQL
+# -----------------------------
+class ConsultasLentasTests(SimpleTestCase):
+
+    def test_normalizar_sql(self):
+        self.assertEqual(
+            consultas_lentas.normalizar_sql(
+                "SELECT * FROM t WHERE id IN (%s, %s, %s) AND nombre = 'ana'\n LIMIT 6 OFFSET 12"),
+            "SELECT * FROM t WHERE id IN (...) AND nombre = ? LIMIT ? OFFSET ?",
+        )
+        self.assertEqual(consultas_lentas.normalizar_sql('SELECT "t0"."a1" FROM "t0"'), 'SELECT "t0"."a1" FROM "t0"')
+
+    def test_agrupar_por_forma(self):
+        registros = [
+            {'fecha': '1', 'sql': 'SELECT 1 FROM t WHERE id IN (%s, %s)', 'duracion_ms': 300, 'origen': 'lista_clientes'},
+            {'fecha': '2', 'sql': 'SELECT 1 FROM t WHERE id IN (%s)', 'duracion_ms': 500, 'origen': 'detalle_cliente'},
+            {'fecha': '3', 'sql': 'UPDATE t SET a = %s', 'duracion_ms': 250, 'origen': None},
+        ]
+        grupos = consultas_lentas.agrupar_por_forma(registros)
+        self.assertEqual([g['veces'] for g in grupos], [2, 1])
+        self.assertEqual(grupos[0]['total_ms'], 800)
+        self.assertEqual(grupos[0]['peor']['fecha'], '2')
+        self.assertEqual(grupos[1]['origenes'], [('(sin vista)', 1)])
+
+    def registrado(self, sql, params):
+        import json
+        conexion = mock.Mock(alias='default')
+        with mock.patch.object(consultas_lentas.logger, 'info') as info, \
+                mock.patch.object(consultas_lentas, 'explicar', return_value='plan'):
+            consultas_lentas.registrar(conexion, sql, params, False, 0.5)
+        return json.loads(info.call_args.args[0])
+
+    def test_parametros_enmascarados(self):
+        registro = self.registrado('SELECT * FROM "clientes_cliente" WHERE "correo" = %s AND "id" > %s', ['ana@x.com', 7])
+        self.assertEqual(registro['parametros'], ['<str:9>', 7])
+        self.assertEqual(registro['explain'], 'plan')
+        registro = self.registrado('UPDATE "clientes_usuario" SET "password" = %s WHERE "id" = %s', ['pbkdf2_sha256$...', 1])
+        self.assertEqual((registro['parametros'], registro['explain']), ([], None))
+
+    def test_plan_sin_literales(self):
+        # PostgreSQL copia los valores en el plan: "Filter: ((correo)::text = 'ana@x.com'::text)"
+        conexion = mock.MagicMock(alias='default', in_atomic_block=False)
+        conexion.ops.explain_query_prefix.return_value = 'EXPLAIN'
+        conexion.cursor.return_value.__enter__.return_value.fetchall.return_value = [
+            ("Seq Scan on clientes_cliente  (cost=0.00..1.01 rows=1 width=8)",),
+            ("  Filter: (((correo)::text = 'ana@x.com'::text) AND ((nombre)::text ~~* '%juan%'::text))",),
+        ]
+        plan = consultas_lentas.explicar(conexion, 'SELECT * FROM "clientes_cliente" WHERE "correo" = %s', ['ana@x.com'])
+        self.assertNotIn('ana@x.com', plan)
+        self.assertNotIn('juan', plan)
+        self.assertIn("Filter: (((correo)::text = '?'::text)", plan)
+
+    def test_lee_los_archivos_de_todos_los_procesos(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        base = Path(carpeta.name) / 'consultas_lentas.jsonl'
+        (base.parent / 'consultas_lentas.10.jsonl').write_text('{"fecha": "2", "sql": "B"}\n', encoding='utf-8')
+        (base.parent / 'consultas_lentas.20.jsonl').write_text('{"fecha": "3", "sql": "C"}\n', encoding='utf-8')
+        (base.parent / 'consultas_lentas.20.jsonl.1').write_text('{"fecha": "1", "sql": "A"}\nroto\n', encoding='utf-8')
+        with override_settings(CONSULTAS_LENTAS_ARCHIVO=str(base)):
+            self.assertEqual([r['sql'] for r in consultas_lentas.leer_registros()], ['A', 'B', 'C'])
+
+
+# -----------------------------
+# Perfilador a demanda
+# -----------------------------
+class PerfiladorTests(TestCase):
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = override_settings(PERFILES_DIR=carpeta.name)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+        cache.set(CLAVE_CACHE, ESTADOS)
+
+    def test_solo_superadmin_puede_perfilar(self):
+        admin = Usuario.objects.create_user('admin_normal', password='clave', rol='admin')
+        self.client.force_login(admin)
+        respuesta = self.client.get(reverse('lista_clientes') + '?perfilar=1')
+        self.assertFalse(respuesta.has_header('X-Perfil'))
+        self.assertEqual(perfilador.listar(), [])
+
+    def test_superadmin_guarda_perfil_folded(self):
+        superadmin = Usuario.objects.create_user('super_perfil', password='clave', rol='superadmin')
+        self.client.force_login(superadmin)
+        self.assertFalse(self.client.get(reverse('lista_clientes')).has_header('X-Perfil'))
+
+        respuesta = self.client.get(reverse('lista_clientes'), HTTP_X_PERFILAR='1')
+        perfil_id = respuesta['X-Perfil']
+        [perfil] = perfilador.listar()
+        self.assertEqual((perfil['id'], perfil['vista'], perfil['usuario']), (perfil_id, 'lista_clientes', 'super_perfil'))
+        # Formato folded: "marco;marco;... muestras"
+        for linea in perfilador.ruta_perfil(perfil_id).read_text(encoding='utf-8').splitlines():
+            pila, _, muestras = linea.rpartition(' ')
+            self.assertTrue(pila and muestras.isdigit(), linea)
+
+
+@override_settings(PERFILADOR_INTERVALO_MS=1)
+class MuestreadorAsincronoTests(SimpleTestCase):
+    """Bajo ASGI solo entra lo de esta petición: ni otras tareas del bucle ni otros hilos."""
+
+    def test_solo_la_tarea_y_el_hilo_de_la_peticion(self):
+        import asyncio
+        import threading
+        parar = threading.Event()
+
+        def hilo_ajeno():
+            while not parar.is_set():
+                sum(range(100))
+
+        def girar(segundos):
+            fin = time.perf_counter() + segundos
+            while time.perf_counter() < fin:
+                pass
+
+        def esta_peticion():
+            girar(0.05)
+
+        def otra_peticion():
+            girar(0.05)
+
+        async def otra_tarea():
+            otra_peticion()
+
+        async def principal():
+            muestreador = await perfilador.iniciar_asincrono()
+            otra = asyncio.create_task(otra_tarea())
+            esta_peticion()
+            await otra
+            muestreador.detener()
+            return muestreador
+
+        ajeno = threading.Thread(target=hilo_ajeno, daemon=True)
+        ajeno.start()
+        try:
+            muestreador = asyncio.run(principal())
+        finally:
+            parar.set()
+            ajeno.join()
+        pilas = ' '.join(muestreador.pilas)
+        self.assertIn('esta_peticion', pilas)
+        self.assertNotIn('otra_peticion', pilas)
+        self.assertNotIn('hilo_ajeno', pilas)
+        self.assertEqual(sorted(muestreador.hilos.values()), ['bucle', 'sync'])
+
+
+class PaginasRendimientoTests(TestCase):
+    """Páginas de admin/rendimiento/: consultas lentas para admins, perfiles solo para quien perfila."""
+
+    def setUp(self):
+        carpeta = tempfile.TemporaryDirectory()
+        self.addCleanup(carpeta.cleanup)
+        ajustes = override_settings(PERFILES_DIR=carpeta.name, CONSULTAS_LENTAS_ARCHIVO=str(Path(carpeta.name) / 'cl.jsonl'))
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def entrar(self, rol):
+        usuario = Usuario.objects.create_user(f'staff_{rol}', password='clave', rol=rol, is_staff=True)
+        self.client.force_login(usuario)
+
+    def test_admin_ve_consultas_lentas_pero_no_perfiles(self):
+        self.entrar('admin')
+        self.assertEqual(self.client.get(reverse('consultas_lentas')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('perfiles')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('perfiles_descargar', args=['x'])).status_code, 403)
+        self.assertNotContains(self.client.get(reverse('admin:index')), reverse('perfiles'))
+
+    def test_superadmin_ve_perfiles(self):
+        self.entrar('superadmin')
+        self.assertEqual(self.client.get(reverse('perfiles')).status_code, 200)
+        self.assertEqual(self.client.get(reverse('perfiles_detalle', args=['no-existe'])).status_code, 404)
+
+    def test_staff_sin_rol_no_entra(self):
+        self.entrar('usuario')
+        self.assertEqual(self.client.get(reverse('consultas_lentas')).status_code, 403)
+
+
+class MetricasTests(TestCase):
+
+    def setUp(self):
+        cache.set(CLAVE_CACHE, ESTADOS)
+
+    def muestra(self, nombre, **etiquetas):
+        return metricas.REGISTRY.get_sample_value(nombre, etiquetas) or 0
+
+    def test_latencia_por_nombre_de_url(self):
+        usuario = Usuario.objects.create_user('metricas', password='clave', rol='usuario')
+        self.client.force_login(usuario)
+        etiquetas = {'vista': 'lista_clientes', 'metodo': 'GET', 'estado': '200'}
+        antes = self.muestra('directorio_peticion_segundos_count', **etiquetas)
+        consultas_antes = self.muestra('directorio_db_consultas_total', bd='default')
+
+        self.client.get(reverse('lista_clientes'))
+
+        self.assertEqual(self.muestra('directorio_peticion_segundos_count', **etiquetas), antes + 1)
+        self.assertGreater(self.muestra('directorio_db_consultas_total', bd='default'), consultas_antes)
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('directorio_peticion_segundos_bucket{', texto)
+
+    @override_settings(METRICAS_TOKEN='secreto')
+    def test_token_obligatorio(self):
+        self.assertEqual(self.client.get(reverse('metricas')).status_code, 403)
+        respuesta = self.client.get(reverse('metricas'), HTTP_AUTHORIZATION='Bearer secreto')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_gunicorn_marca_workers_muertos(self):
+        import runpy
+        from django.conf import settings
+        conf = runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))
+        worker = mock.Mock(pid=4321)
+        with mock.patch.dict('os.environ', {'PROMETHEUS_MULTIPROC_DIR': '/tmp/metricas'}), \
+                mock.patch('prometheus_client.multiprocess.mark_process_dead') as marcar:
+            conf['child_exit'](None, worker)
+        marcar.assert_called_once_with(4321, '/tmp/metricas')
+
+
+class PrecalentarTests(TestCase):
+
+    def test_todos_los_pasos_sin_errores(self):
+        cache.set(CLAVE_CACHE, ESTADOS)
+        Usuario.objects.create_user('super_calentar', password='clave', rol='superadmin')
+        resultados = precalentar(paginas=2)
+        self.assertEqual([nombre for nombre, *_ in resultados], list(PASOS))
+        self.assertEqual([error for *_, error in resultados], [None] * len(PASOS))
+        self.assertEqual(dict((nombre, detalle) for nombre, _, detalle, _ in resultados)['lista'], '2 páginas')
+
+
+# Arranque de un proceso limpio (django.setup() + URLconf): lo paga cada
+# worker al reciclarse y cada comando del programador. Holgado para CI lentos
+PRESUPUESTO_ARRANQUE_MS = 1000
+
+
+class ArranqueTests(SimpleTestCase):
+
+    def test_presupuesto_de_arranque(self):
+        tiempos, importaciones = medir_varias(repeticiones=2)
+        cargados = diferidos_cargados(importaciones)
+        self.assertEqual(cargados, [], "Estas integraciones deben importarse al usarse, no al arrancar")
+        lentos = sorted(importaciones, key=lambda i: i.acumulado_us, reverse=True)[:5]
+        self.assertLessEqual(
+            mediana_ms(tiempos), PRESUPUESTO_ARRANQUE_MS,
+            "Arranque fuera de presupuesto (ver manage.py perfil_arranque). Lo más lento: "
+            + ', '.join(f"{i.modulo} {i.acumulado_us / 1000:.0f} ms" for i in lentos),
+        )
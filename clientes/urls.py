@@ -4,12 +4,19 @@ from . import views
 urlpatterns = [
     path('', views.lista_clientes, name='lista_clientes'),
     path('agregar/', views.agregar_cliente, name='agregar_cliente'),
+    path('exportar/', views.exportar_clientes, name='exportar_clientes'),
     path('eliminar/<int:pk>/', views.eliminar_cliente, name='eliminar_cliente'),
+    path('eliminar/masivo/', views.eliminar_clientes_masivo, name='eliminar_clientes_masivo'),
     # path('registro/', views.registro, name='registro'),  # Ruta pública deshabilitada
     path('clientes/<int:pk>/', views.detalle_cliente, name='detalle_cliente'),
     path('eliminados/', views.clientes_eliminados, name='clientes_eliminados'),
     path('restaurar/<int:pk>/', views.restaurar_cliente, name='restaurar_cliente'),
+    path('restaurar/masivo/', views.restaurar_clientes_masivo, name='restaurar_clientes_masivo'),
     path('usuarios/nuevo/', views.crear_usuario, name='crear_usuario'),
     path('usuarios/creados/', views.usuarios_creados, name='usuarios_creados'),
+    path('similares/', views.clientes_similares, name='clientes_similares'),
+    path('similares/<int:pk>/resolver/', views.resolver_similar, name='resolver_similar'),
+    path('importar/', views.importar_excel, name='importar_excel'),
+    path('importar/<int:pk>/estado/', views.estado_importacion, name='estado_importacion'),
 
 ]
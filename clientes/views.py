@@ -1,14 +1,25 @@
-from django.shortcuts import render, redirect, get_object_or_404
+import asyncio
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import JsonResponse, StreamingHttpResponse, FileResponse
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 from functools import wraps
 from django.utils import timezone
 from django.core.paginator import Paginator
-from .models import Cliente, Usuario, HistorialCliente, UsuarioCreado
-from .forms import ClienteForm, RegistroForm
-from django.db.models import Q
-from .services.states_api import fetch_us_states
+from .models import Cliente, Usuario, HistorialCliente, UsuarioCreado, TrabajoImportacion, ParSimilar
+from .forms import ClienteForm, RegistroForm, ImportacionForm
+from django.db import transaction, IntegrityError
+from django.db.models import Q, Case, When, Value, IntegerField
+from directorio_project.replicas import alias_lectura, lectura_en_replica
+from .permisos import es_admin, tiene_rol
+from .services.states_api import afetch_us_states
+from .services.exportar import columnas_exportacion, generar_csv, generar_xlsx
+from .services.listado import CAMPOS_LISTA, apaginar, proyectar_pagina
+from .services.acciones_masivas import eliminar_clientes, restaurar_clientes, MAX_SELECCION
 
 
 # -----------------------------
@@ -38,7 +49,7 @@ def registro(request):
 # -----------------------------
 @login_required
 def crear_usuario(request):
-    if not (request.user.is_superuser or request.user.rol in ['admin', 'superadmin']):
+    if not es_admin(request.user):
         messages.error(request, "🚫 No tienes permiso para crear usuarios.")
         return redirect('lista_clientes')
 
@@ -70,9 +81,18 @@ def rol_requerido(roles):
     Si no cumple, muestra un mensaje y redirige a la lista de clientes.
     """
     def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def _async_view(request, *args, **kwargs):
+                if tiene_rol(await request.auser(), roles):
+                    return await view_func(request, *args, **kwargs)
+                messages.error(request, "🚫 No tienes permiso para acceder a esta página.")
+                return redirect('lista_clientes')
+            return _async_view
+
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
-            if request.user.is_authenticated and (request.user.rol in roles or request.user.is_superuser):
+            if tiene_rol(request.user, roles):
                 return view_func(request, *args, **kwargs)
             messages.error(request, "🚫 No tienes permiso para acceder a esta página.")
             return redirect('lista_clientes')
@@ -84,6 +104,7 @@ def rol_requerido(roles):
 # -----------------------------
 @login_required
 @rol_requerido(['admin', 'superadmin'])
+@lectura_en_replica
 def usuarios_creados(request):
     registros = UsuarioCreado.objects.filter(creador=request.user).select_related('usuario').order_by('-creado_en')
     paginator = Paginator(registros, 15)
@@ -92,101 +113,138 @@ def usuarios_creados(request):
     return render(request, 'clientes/usuarios_creados.html', { 'registros': page_obj })
 
 
+# -----------------------------
+# Render desde vistas asíncronas
+# -----------------------------
+async def arender(request, template_name, context):
+    """
+    render() en el hilo síncrono: los context processors y la plantilla leen
+    la sesión, el usuario y los mensajes, que pueden ir a la BD.
+    """
+    return await sync_to_async(render)(request, template_name, context)
+
+
+# -----------------------------
+# Filtro de búsqueda compartido por la lista y la exportación
+# -----------------------------
+CAMPOS_BUSQUEDA = ['nombre', 'compania', 'identificacion', 'correo', 'pais']
+
+
+def filtrar_clientes(clientes, query, search_field):
+    """
+    Aplica la búsqueda de lista_clientes a un queryset.
+    Con 'all' o 'nombre' prioriza en SQL las coincidencias al inicio del nombre.
+    """
+    if not query:
+        return clientes.order_by('-creado_en')
+
+    # Construir filtro según el campo seleccionado
+    if search_field in CAMPOS_BUSQUEDA:
+        clientes = clientes.filter(Q(**{f'{search_field}__icontains': query}))
+    else:  # 'all' u otros valores no esperados
+        clientes = clientes.filter(
+            Q(nombre__icontains=query) |
+            Q(compania__icontains=query) |
+            Q(identificacion__icontains=query) |
+            Q(correo__icontains=query)
+        )
+
+    # Orden preferente por coincidencias de nombre cuando aplique
+    if search_field in ['all', 'nombre']:
+        prioridad = Case(
+            When(nombre__istartswith=query, then=Value(0)),
+            When(nombre__icontains=query, then=Value(1)),
+            default=Value(2),
+            output_field=IntegerField(),
+        )
+        return clientes.order_by(prioridad, '-creado_en')
+    return clientes.order_by('-creado_en')
+
+
 # -----------------------------
 # Listar clientes activos con búsqueda y paginación (más recientes primero)
 # -----------------------------
 @login_required
-def lista_clientes(request):
+@lectura_en_replica
+async def lista_clientes(request):
     query = request.GET.get('q', '').strip()  # Limpia espacios
     search_field = request.GET.get('field', 'all')
 
-    # Base: clientes activos, los más recientes primero
-    clientes_list = Cliente.objects.filter(activo=True).order_by('-creado_en')
-
-    if query:
-        # Construir filtro según el campo seleccionado
-        if search_field == 'nombre':
-            clientes_list = clientes_list.filter(Q(nombre__icontains=query))
-        elif search_field == 'compania':
-            clientes_list = clientes_list.filter(Q(compania__icontains=query))
-        elif search_field == 'identificacion':
-            clientes_list = clientes_list.filter(Q(identificacion__icontains=query))
-        elif search_field == 'correo':
-            clientes_list = clientes_list.filter(Q(correo__icontains=query))
-        elif search_field == 'pais':
-            clientes_list = clientes_list.filter(Q(pais__icontains=query))
-        else:  # 'all' u otros valores no esperados
-            clientes_list = clientes_list.filter(
-                Q(nombre__icontains=query) |
-                Q(compania__icontains=query) |
-                Q(identificacion__icontains=query) |
-                Q(correo__icontains=query)
-            )
-
-        # Orden preferente por coincidencias de nombre cuando aplique
-        if search_field in ['all', 'nombre']:
-            query_lower = query.lower()
-            clientes_list = sorted(
-                clientes_list,
-                key=lambda c: (
-                    0 if c.nombre.lower().startswith(query_lower) else
-                    1 if query_lower in c.nombre.lower() else
-                    2
-                )
-            )
-
-    # Paginación
-    paginator = Paginator(clientes_list, 6)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Base: clientes activos, los más recientes primero (con filtro de búsqueda)
+    # Solo se leen las columnas que pintan las tarjetas
+    clientes_list = filtrar_clientes(Cliente.activos.all(), query, search_field).values_list(*CAMPOS_LISTA)
+
+    # Paginación y estados a la vez: la BD no espera a la API
+    page_obj, estados = await asyncio.gather(
+        apaginar(clientes_list, 6, request.GET.get('page')),
+        afetch_us_states(),
+    )
 
     # Construir etiqueta legible para estado ("CODE - Name") en cada cliente de la página
-    try:
-        estados = fetch_us_states()
-        code_to_name = {e.get('code'): e.get('name') for e in estados if e.get('code') and e.get('name')}
-    except Exception:
-        code_to_name = {}
-
-    for c in page_obj:
-        code = (c.pais or '').strip()
-        if code:
-            name = code_to_name.get(code)
-            c.estado_label = f"{code} - {name}" if name else code
-        else:
-            c.estado_label = "No asignado"
+    code_to_name = {e.get('code'): e.get('name') for e in estados if e.get('code') and e.get('name')}
+
+    proyectar_pagina(page_obj, code_to_name)
 
-    return render(request, 'clientes/lista.html', {
+    return await arender(request, 'clientes/lista.html', {
         'page_obj': page_obj,
         'query': query,
         'search_field': search_field,
     })
 
 
+# -----------------------------
+# Exportar clientes activos (CSV o XLSX) respetando la búsqueda actual
+# -----------------------------
+@login_required
+@lectura_en_replica
+def exportar_clientes(request):
+    query = request.GET.get('q', '').strip()
+    search_field = request.GET.get('field', 'all')
+    formato = request.GET.get('formato', 'csv')
+
+    # El CSV se genera al enviar la respuesta, fuera de la vista: la BD de lectura se fija aquí
+    clientes = filtrar_clientes(Cliente.activos.using(alias_lectura()), query, search_field)
+    columnas = columnas_exportacion(incluir_contacto=es_admin(request.user))
+    nombre = f"clientes_{timezone.localdate():%Y%m%d}"
+
+    if formato == 'xlsx':
+        return FileResponse(
+            generar_xlsx(clientes, columnas),
+            as_attachment=True,
+            filename=f"{nombre}.xlsx",
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+
+    response = StreamingHttpResponse(generar_csv(clientes, columnas), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}.csv"'
+    return response
+
+
 # -----------------------------
 # Agregar cliente
 # -----------------------------
 @login_required
 @rol_requerido(['admin', 'superadmin'])
-def agregar_cliente(request):
+async def agregar_cliente(request):
+    estados = await afetch_us_states()
     if request.method == 'POST':
-        form = ClienteForm(request.POST, request.FILES)
-        if form.is_valid():
+        form = ClienteForm(request.POST, request.FILES, estados=estados)
+        # is_valid consulta la BD (identificación duplicada)
+        if await sync_to_async(form.is_valid)():
             cliente = form.save(commit=False)
-            cliente.creado_por = request.user
-            cliente.save()
+            cliente.creado_por = await request.auser()
+            await cliente.asave()
             messages.success(request, "✅ Cliente agregado exitosamente.")
             return redirect('lista_clientes')
         else:
             messages.error(request, "❌ Ocurrió un error al agregar el cliente.")
-            estados = fetch_us_states()
-            return render(request, 'clientes/agregar.html', {
+            return await arender(request, 'clientes/agregar.html', {
                 'form': form,
                 'estados': estados
             })
     else:
-        form = ClienteForm()
-        estados = fetch_us_states()
-        return render(request, 'clientes/agregar.html', {
+        form = ClienteForm(estados=estados)
+        return await arender(request, 'clientes/agregar.html', {
             'form': form,
             'estados': estados
         })
@@ -196,30 +254,38 @@ def agregar_cliente(request):
 # Ver detalles del cliente y edición
 # -----------------------------
 @login_required
-def detalle_cliente(request, pk):
-    cliente = get_object_or_404(Cliente, pk=pk)
+@lectura_en_replica
+async def detalle_cliente(request, pk):
+    # Cliente y estados a la vez: la BD no espera a la API
+    cliente, estados = await asyncio.gather(
+        aget_object_or_404(Cliente, pk=pk),
+        afetch_us_states(),
+    )
 
     # Determinar si el usuario puede editar
-    puede_editar = request.user.rol in ['admin', 'superadmin'] or request.user.is_superuser
+    usuario = await request.auser()
+    puede_editar = es_admin(usuario)
 
     if request.method == "POST" and puede_editar:
-        form = ClienteForm(request.POST, request.FILES, instance=cliente)
-        if form.is_valid():
+        form = ClienteForm(request.POST, request.FILES, instance=cliente, estados=estados)
+        if await sync_to_async(form.is_valid)():
             cliente = form.save(commit=False)
-            cliente.save(usuario=request.user)  # Historial automático
+            await sync_to_async(cliente.save)(usuario=usuario)  # Historial automático
             return redirect('detalle_cliente', pk=cliente.pk)
     else:
-        form = ClienteForm(instance=cliente)
+        form = ClienteForm(instance=cliente, estados=estados)
 
     # Preparar URL de Google Maps de forma segura (puede ser None)
     maps_url = cliente.google_maps_link
-    estados = fetch_us_states()
+    historial = [
+        cambio async for cambio in cliente.historial.select_related('editado_por').order_by('-fecha_edicion')
+    ]
 
-    return render(request, 'clientes/detalle.html', {
+    return await arender(request, 'clientes/detalle.html', {
         'cliente': cliente,
         'form': form,
         'maps_url': maps_url,
-        'historial': cliente.historial.all().order_by('-fecha_edicion'),
+        'historial': historial,
         'puede_editar': puede_editar
         , 'estados': estados
     })
@@ -235,7 +301,7 @@ def eliminar_cliente(request, pk):
     cliente.activo = False
     cliente.fecha_eliminacion = timezone.now()
     cliente.save()
-    messages.warning(request, "🗑️ Cliente marcado para eliminación (se eliminará definitivamente en 30 días).")
+    messages.warning(request, f"🗑️ Cliente marcado para eliminación (se eliminará definitivamente en {settings.PURGA_DIAS_RETENCION} días).")
     return redirect('lista_clientes')
 
 
@@ -244,11 +310,12 @@ def eliminar_cliente(request, pk):
 # -----------------------------
 @login_required
 @rol_requerido(['admin', 'superadmin'])
+@lectura_en_replica
 def clientes_eliminados(request):
-    clientes_list = Cliente.objects.filter(activo=False).order_by('-fecha_eliminacion')
+    clientes_list = Cliente.objects.filter(activo=False).order_by('-fecha_eliminacion').values_list(*CAMPOS_LISTA)
     paginator = Paginator(clientes_list, 6)
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = proyectar_pagina(paginator.get_page(page_number))
 
     return render(request, 'clientes/eliminados.html', {'clientes': page_obj})
 
@@ -262,6 +329,165 @@ def restaurar_cliente(request, pk):
     cliente = get_object_or_404(Cliente, pk=pk)
     cliente.activo = True
     cliente.fecha_eliminacion = None
-    cliente.save()
+    try:
+        with transaction.atomic():
+            cliente.save()
+    except IntegrityError:
+        messages.error(request, f"❌ No se puede restaurar '{cliente.nombre}': ya existe un cliente activo con la identificación {cliente.identificacion}.")
+        return redirect('clientes_eliminados')
     messages.success(request, f"✅ El cliente '{cliente.nombre}' fue restaurado correctamente.")
     return redirect('clientes_eliminados')
+
+
+# -----------------------------
+# Acciones masivas: ids seleccionados o todos los resultados de la búsqueda
+# -----------------------------
+def ids_seleccionados(request, base):
+    # Se trae uno más del máximo para saber si la selección lo supera
+    if request.POST.get('todos') == '1':
+        qs = filtrar_clientes(base, request.POST.get('q', '').strip(), request.POST.get('field', 'all'))
+        return list(qs.values_list('pk', flat=True)[:MAX_SELECCION + 1])
+    return list(dict.fromkeys(int(pk) for pk in request.POST.getlist('ids') if pk.isdigit()))
+
+
+def seleccion_valida(request, ids):
+    if not ids:
+        messages.error(request, "❌ No seleccionaste ningún cliente.")
+        return False
+    if len(ids) > MAX_SELECCION:
+        messages.error(request, f"❌ La selección supera el máximo de {MAX_SELECCION} clientes por acción. Acota la búsqueda e inténtalo de nuevo.")
+        return False
+    return True
+
+
+@login_required
+@rol_requerido(['admin', 'superadmin'])
+def eliminar_clientes_masivo(request):
+    if request.method != 'POST':
+        return redirect('lista_clientes')
+    ids = ids_seleccionados(request, Cliente.activos.all())
+    if not seleccion_valida(request, ids):
+        return redirect('lista_clientes')
+    eliminados = eliminar_clientes(ids, request.user)
+    messages.warning(request, f"🗑️ {eliminados} clientes marcados para eliminación (se eliminarán definitivamente en {settings.PURGA_DIAS_RETENCION} días).")
+    if eliminados < len(ids):
+        messages.info(request, f"ℹ️ {len(ids) - eliminados} de los {len(ids)} seleccionados ya no estaban activos.")
+    return redirect('lista_clientes')
+
+
+@login_required
+@rol_requerido(['admin', 'superadmin'])
+def restaurar_clientes_masivo(request):
+    if request.method != 'POST':
+        return redirect('clientes_eliminados')
+    ids = ids_seleccionados(request, Cliente.objects.filter(activo=False))
+    if not seleccion_valida(request, ids):
+        return redirect('clientes_eliminados')
+    restaurados, omitidos = restaurar_clientes(ids, request.user)
+    messages.success(request, f"✅ {restaurados} clientes restaurados correctamente.")
+    if omitidos:
+        messages.error(request, f"❌ {omitidos} clientes no se restauraron: ya existe un cliente activo con su identificación.")
+    if restaurados + omitidos < len(ids):
+        messages.info(request, f"ℹ️ {len(ids) - restaurados - omitidos} de los {len(ids)} seleccionados ya no estaban eliminados.")
+    return redirect('clientes_eliminados')
+
+
+# -----------------------------
+# Importar clientes desde Excel (el worker procesar_importaciones hace el trabajo)
+# -----------------------------
+@login_required
+@rol_requerido(['admin', 'superadmin'])
+def importar_excel(request):
+    if request.method == 'POST':
+        form = ImportacionForm(request.POST, request.FILES)
+        if form.is_valid():
+            trabajo = form.save(commit=False)
+            trabajo.creado_por = request.user
+            trabajo.save()
+            messages.success(request, "✅ Archivo recibido. La importación se procesará en segundo plano.")
+            return redirect('importar_excel')
+        else:
+            messages.error(request, "❌ Revisa el archivo seleccionado.")
+    else:
+        form = ImportacionForm()
+
+    trabajos = TrabajoImportacion.objects.select_related('creado_por')[:10]
+    return render(request, 'clientes/importar.html', {'form': form, 'trabajos': trabajos})
+
+
+# -----------------------------
+# Estado de una importación (consultado periódicamente desde la página)
+# -----------------------------
+def estado_importacion(request, pk):
+    # La página lo consulta con fetch: también los errores de acceso van en JSON
+    # (una redirección a HTML haría reintentar al script indefinidamente)
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'La sesión expiró. Recarga la página.'}, status=401)
+    if not tiene_rol(request.user, ['admin', 'superadmin']):
+        return JsonResponse({'error': 'No tienes permiso para ver esta importación.'}, status=403)
+    trabajo = get_object_or_404(TrabajoImportacion, pk=pk)
+    return JsonResponse({
+        'id': trabajo.pk,
+        'estado': trabajo.estado,
+        'estado_label': trabajo.get_estado_display(),
+        'total': trabajo.total,
+        'procesadas': trabajo.procesadas,
+        'porcentaje': trabajo.porcentaje,
+        'insertados': trabajo.insertados,
+        'actualizados': trabajo.actualizados,
+        'sin_cambios': trabajo.sin_cambios,
+        'fallidos': trabajo.fallidos,
+        'errores': trabajo.errores.splitlines()[:50],
+    })
+
+
+# -----------------------------
+# Revisión de posibles duplicados (detectar_similares)
+# -----------------------------
+@login_required
+@rol_requerido(['admin', 'superadmin'])
+def clientes_similares(request):
+    pares = ParSimilar.objects.filter(
+        estado='pendiente', cliente_a__activo=True, cliente_b__activo=True
+    ).select_related('cliente_a', 'cliente_b')
+    paginator = Paginator(pares, 15)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'clientes/similares.html', {'pares': page_obj})
+
+
+@login_required
+@rol_requerido(['admin', 'superadmin'])
+def resolver_similar(request, pk):
+    if request.method != 'POST':
+        return redirect('clientes_similares')
+    accion = request.POST.get('accion')
+    if accion not in ('conservar_a', 'conservar_b', 'descartar'):
+        return redirect('clientes_similares')
+
+    # Bloqueo del par: dos envíos (doble clic, pestaña vieja, dos admins) no deben resolverlo dos veces
+    with transaction.atomic():
+        par = get_object_or_404(
+            ParSimilar.objects.select_for_update().select_related('cliente_a', 'cliente_b'), pk=pk,
+        )
+        if par.estado != 'pendiente':
+            messages.error(request, "❌ Este par ya fue revisado.")
+            return redirect('clientes_similares')
+
+        if accion == 'descartar':
+            par.estado = 'descartado'
+            messages.info(request, "ℹ️ Par marcado como no duplicado.")
+        else:
+            if not (par.cliente_a.activo and par.cliente_b.activo):
+                messages.error(request, "❌ Uno de los dos clientes ya no está activo.")
+                return redirect('clientes_similares')
+            # El otro cliente se marca como eliminado: se puede restaurar durante PURGA_DIAS_RETENCION días
+            descartado = par.cliente_b if accion == 'conservar_a' else par.cliente_a
+            descartado.activo = False
+            descartado.fecha_eliminacion = timezone.now()
+            descartado.save(usuario=request.user)
+            par.estado = 'fusionado'
+            messages.success(request, f"✅ '{descartado.nombre}' marcado como duplicado y enviado a eliminados (se puede restaurar durante {settings.PURGA_DIAS_RETENCION} días).")
+
+        par.revisado_por = request.user
+        par.save()
+    return redirect('clientes_similares')
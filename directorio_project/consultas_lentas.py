@@ -0,0 +1,236 @@
+"""
+Registro de consultas lentas con su plan de ejecución.
+
+Toda consulta que supere CONSULTAS_LENTAS_MS se guarda como una línea JSON
+(SQL, parámetros, duración, vista o comando de origen y salida de EXPLAIN)
+en un archivo por proceso junto a CONSULTAS_LENTAS_ARCHIVO, que rota por
+tamaño. De los parámetros solo se guardan números, fechas y booleanos; los
+textos (nombres, correos, hashes) quedan enmascarados, y en las consultas a
+tablas de usuarios y sesiones no se guardan ni parámetros ni plan. Los
+literales que PostgreSQL copia en el plan (Filter: (correo = '...')) también
+se enmascaran. La página
+de admin /admin/rendimiento/consultas-lentas/ agrupa el registro por forma
+de SQL. Con el umbral a 0 no se instala nada.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+
+logger = logging.getLogger('directorio.consultas_lentas')
+
+_peticion = ContextVar('peticion_consultas_lentas', default=None)
+# Evita registrar (y explicar) las consultas del propio EXPLAIN
+_explicando = ContextVar('explicando', default=False)
+
+SENTENCIAS_EXPLICABLES = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+# Contraseñas, sesiones y tokens: ni parámetros ni EXPLAIN (PostgreSQL pone los valores en el plan)
+_TABLAS_SENSIBLES = re.compile(r'"(?:clientes_usuario\w*|django_session|auth_\w+)"')
+
+
+def activo():
+    return getattr(settings, 'CONSULTAS_LENTAS_MS', 0) > 0
+
+
+def archivo():
+    return Path(settings.CONSULTAS_LENTAS_ARCHIVO)
+
+
+def archivo_del_proceso():
+    """consultas_lentas.<pid>.jsonl: cada proceso rota solo su archivo y ninguno pisa a otro."""
+    base = archivo()
+    return base.with_name(f"{base.stem}.{os.getpid()}{base.suffix}")
+
+
+# -----------------------------
+# Instalación
+# -----------------------------
+def instalar():
+    """Engancha el envoltorio en cada conexión nueva y abre el archivo rotativo (una sola vez)."""
+    if not activo() or logger.handlers:
+        return
+    archivo().parent.mkdir(parents=True, exist_ok=True)
+    # Un archivo por proceso: varios RotatingFileHandler sobre el mismo archivo
+    # pierden líneas al rotar, y así no hace falta ningún servicio externo
+    handler = RotatingFileHandler(
+        archivo_del_proceso(), maxBytes=settings.CONSULTAS_LENTAS_MAX_BYTES,
+        backupCount=settings.CONSULTAS_LENTAS_ARCHIVOS, encoding='utf-8',
+    )
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    connection_created.connect(_enganchar, dispatch_uid='consultas_lentas')
+
+
+def _enganchar(sender, connection, **kwargs):
+    # Al principio de la lista: execute_wrapper() de otros (instrumentación)
+    # añade y quita el suyo por el final
+    if envoltorio not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, envoltorio)
+
+
+def iniciar_peticion(request):
+    return _peticion.set(request)
+
+
+def terminar_peticion(token):
+    _peticion.reset(token)
+
+
+# -----------------------------
+# Envoltorio de consultas
+# -----------------------------
+def envoltorio(execute, sql, params, many, context):
+    if _explicando.get():
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    resultado = execute(sql, params, many, context)
+    duracion = time.perf_counter() - inicio
+    if duracion * 1000 >= settings.CONSULTAS_LENTAS_MS:
+        try:
+            registrar(context['connection'], sql, params, many, duracion)
+        except Exception:
+            logging.getLogger(__name__).exception("No se pudo registrar la consulta lenta")
+    return resultado
+
+
+def registrar(connection, sql, params, many, duracion):
+    sensible = bool(_TABLAS_SENSIBLES.search(sql))
+    logger.info(json.dumps({
+        'fecha': timezone.now().isoformat(),
+        'bd': connection.alias,
+        'duracion_ms': round(duracion * 1000, 1),
+        'origen': origen(),
+        'sql': sql,
+        'parametros': [] if many or sensible else resumir_parametros(params),
+        'explain': None if many or sensible else explicar(connection, sql, params),
+    }, ensure_ascii=False))
+
+
+def origen():
+    """Vista que hizo la consulta o, fuera de una petición, el comando de manage.py."""
+    request = _peticion.get()
+    if request is not None:
+        resolver = getattr(request, 'resolver_match', None)
+        return resolver.view_name if resolver else request.path
+    if len(sys.argv) > 1 and sys.argv[0].endswith('manage.py'):
+        return f"manage.py {sys.argv[1]}"
+    return None
+
+
+def resumir_parametros(params):
+    """Números, fechas y booleanos tal cual; cualquier otro valor, solo su tipo y longitud."""
+    if params is None:
+        return []
+    valores = params.values() if isinstance(params, dict) else params
+    return [enmascarar(p) for p in valores]
+
+
+def enmascarar(valor):
+    if valor is None or isinstance(valor, (int, float, bool)):
+        return valor
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    return f"<{type(valor).__name__}:{len(str(valor))}>"
+
+
+def explicar(connection, sql, params):
+    if not sql.lstrip().upper().startswith(SENTENCIAS_EXPLICABLES):
+        return None
+    token = _explicando.set(True)
+    # Dentro de una transacción, un EXPLAIN fallido no debe romperla
+    savepoint = connection.savepoint() if connection.in_atomic_block else None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+            filas = cursor.fetchall()
+        if savepoint:
+            connection.savepoint_commit(savepoint)
+    except Exception as e:
+        if savepoint:
+            connection.savepoint_rollback(savepoint)
+        return enmascarar_literales(f"(EXPLAIN no disponible: {e})")
+    finally:
+        _explicando.reset(token)
+    # SQLite devuelve (id, padre, -, detalle); PostgreSQL una columna de texto
+    return enmascarar_literales('\n'.join(str(fila[-1]) for fila in filas))
+
+
+def enmascarar_literales(texto):
+    """El plan se obtiene con los valores reales: sus literales de texto no deben llegar al registro."""
+    return _CADENAS.sub("'?'", texto)
+
+
+# -----------------------------
+# Lectura y agregación (página de admin)
+# -----------------------------
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LISTAS = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)')
+_ESPACIOS = re.compile(r'\s+')
+
+
+def normalizar_sql(sql):
+    """Forma de la consulta: sin literales, con las listas IN (...) colapsadas."""
+    forma = _CADENAS.sub('?', sql)
+    forma = _NUMEROS.sub('?', forma)
+    forma = forma.replace('%s', '?')
+    forma = _LISTAS.sub('(...)', forma)
+    return _ESPACIOS.sub(' ', forma).strip()
+
+
+def huella(forma):
+    return hashlib.sha1(forma.encode('utf-8')).hexdigest()[:12]
+
+
+def leer_registros():
+    """Registros de los archivos de todos los procesos (y sus rotados), del más antiguo al más nuevo."""
+    base = archivo()
+    registros = []
+    for ruta in base.parent.glob(f"{base.stem}.*{base.suffix}*"):
+        with ruta.open(encoding='utf-8') as f:
+            for linea in f:
+                try:
+                    registros.append(json.loads(linea))
+                except ValueError:
+                    continue
+    registros.sort(key=lambda r: r.get('fecha', ''))
+    return registros
+
+
+def agrupar_por_forma(registros):
+    """Una fila por forma de SQL, ordenadas por tiempo total (lo que más pesa primero)."""
+    grupos = {}
+    for registro in registros:
+        forma = normalizar_sql(registro['sql'])
+        grupo = grupos.get(forma)
+        if grupo is None:
+            grupo = grupos[forma] = {
+                'forma': forma, 'huella': huella(forma), 'veces': 0, 'total_ms': 0.0,
+                'max_ms': 0.0, 'ultima': None, 'origenes': Counter(), 'peor': None,
+            }
+        grupo['veces'] += 1
+        grupo['total_ms'] += registro['duracion_ms']
+        grupo['origenes'][registro.get('origen') or '(sin vista)'] += 1
+        grupo['ultima'] = registro['fecha']
+        if registro['duracion_ms'] >= grupo['max_ms']:
+            grupo['max_ms'] = registro['duracion_ms']
+            grupo['peor'] = registro
+    for grupo in grupos.values():
+        grupo['media_ms'] = round(grupo['total_ms'] / grupo['veces'], 1)
+        grupo['total_ms'] = round(grupo['total_ms'], 1)
+        grupo['origenes'] = grupo['origenes'].most_common(5)
+    return sorted(grupos.values(), key=lambda g: g['total_ms'], reverse=True)
@@ -0,0 +1,116 @@
+"""
+Medición por petición: consultas a la BD, HTTP saliente y render de plantillas.
+
+Las mediciones se acumulan en un ContextVar que solo existe mientras
+InstrumentacionMiddleware mide una petición; fuera de ella los ganchos
+cuestan una lectura del ContextVar.
+"""
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+_medicion = ContextVar('medicion', default=None)
+
+
+class Medicion:
+    __slots__ = ('inicio', 'db_consultas', 'db_tiempo', 'http_llamadas', 'http_tiempo', 'plantillas_tiempo')
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.db_consultas = 0
+        self.db_tiempo = 0.0
+        self.http_llamadas = 0
+        self.http_tiempo = 0.0
+        self.plantillas_tiempo = 0.0
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+
+def iniciar():
+    medicion = Medicion()
+    return medicion, _medicion.set(medicion)
+
+
+def terminar(token):
+    _medicion.reset(token)
+
+
+def medicion_actual():
+    return _medicion.get()
+
+
+# -----------------------------
+# Base de datos: connection.execute_wrapper
+# -----------------------------
+def envoltorio_db(execute, sql, params, many, context):
+    medicion = _medicion.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.db_consultas += 1
+        medicion.db_tiempo += time.perf_counter() - inicio
+
+
+# -----------------------------
+# HTTP saliente (requests) y render de plantillas
+# -----------------------------
+def _cronometrar(funcion, campo, contador=None):
+    @wraps(funcion)
+    def envoltorio(*args, **kwargs):
+        medicion = _medicion.get()
+        if medicion is None:
+            return funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return funcion(*args, **kwargs)
+        finally:
+            setattr(medicion, campo, getattr(medicion, campo) + time.perf_counter() - inicio)
+            if contador:
+                setattr(medicion, contador, getattr(medicion, contador) + 1)
+    envoltorio._instrumentado = True
+    return envoltorio
+
+
+def _acronometrar(funcion, campo, contador):
+    @wraps(funcion)
+    async def envoltorio(*args, **kwargs):
+        medicion = _medicion.get()
+        if medicion is None:
+            return await funcion(*args, **kwargs)
+        inicio = time.perf_counter()
+        try:
+            return await funcion(*args, **kwargs)
+        finally:
+            setattr(medicion, campo, getattr(medicion, campo) + time.perf_counter() - inicio)
+            setattr(medicion, contador, getattr(medicion, contador) + 1)
+    envoltorio._instrumentado = True
+    return envoltorio
+
+
+def instalar_ganchos():
+    """Envuelve requests.Session.send, httpx.AsyncClient.send y el render de plantillas Django (una sola vez)."""
+    from django.template.backends.django import Template
+
+    if not getattr(Template.render, '_instrumentado', False):
+        # Solo la plantilla de nivel superior: extends/include no pasan por el backend
+        Template.render = _cronometrar(Template.render, 'plantillas_tiempo')
+
+    try:
+        import requests
+    except ImportError:
+        pass
+    else:
+        if not getattr(requests.Session.send, '_instrumentado', False):
+            requests.Session.send = _cronometrar(requests.Session.send, 'http_tiempo', 'http_llamadas')
+
+    try:
+        import httpx
+    except ImportError:
+        return
+    if not getattr(httpx.AsyncClient.send, '_instrumentado', False):
+        httpx.AsyncClient.send = _acronometrar(httpx.AsyncClient.send, 'http_tiempo', 'http_llamadas')
@@ -0,0 +1,141 @@
+"""
+Métricas en formato Prometheus, expuestas en /metrics.
+
+Con varios workers (gunicorn, uvicorn --workers) o procesos aparte
+(programador, worker de importaciones) cada proceso escribe sus valores
+en METRICAS_DIR (PROMETHEUS_MULTIPROC_DIR) y /metrics los suma al
+servirlos. Sin METRICAS_DIR cada proceso expone solo lo suyo (desarrollo).
+Si prometheus_client no está instalado, registrar métricas no hace nada.
+"""
+import hmac
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+
+try:
+    from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest
+    from prometheus_client import REGISTRY, multiprocess
+except ImportError:  # pragma: no cover - dependencia opcional
+    disponible = False
+else:
+    disponible = True
+
+BUCKETS_PETICION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def activas():
+    return disponible and getattr(settings, 'METRICAS_ACTIVAS', True)
+
+
+if disponible:
+    PETICIONES = Histogram(
+        'directorio_peticion_segundos', 'Duración de las peticiones por nombre de URL.',
+        ['vista', 'metodo', 'estado'], buckets=BUCKETS_PETICION,
+    )
+    CONSULTAS_DB = Counter(
+        'directorio_db_consultas', 'Consultas SQL ejecutadas.', ['bd'],
+    )
+    API_ESTADOS = Histogram(
+        'directorio_api_estados_segundos', 'Duración de las descargas de la API de estados.',
+        buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8),
+    )
+    API_ESTADOS_ERRORES = Counter(
+        'directorio_api_estados_errores', 'Descargas fallidas de la API de estados.', ['tipo'],
+    )
+    LOGOS_BYTES = Counter(
+        'directorio_logos_servidos_bytes', 'Bytes de logos servidos por Django (media/logos/).',
+    )
+    PURGA_CLIENTES = Counter(
+        'directorio_purga_clientes', 'Clientes borrados definitivamente por la purga.',
+    )
+    PURGA_SEGUNDOS = Counter(
+        'directorio_purga_segundos', 'Tiempo dedicado a borrar lotes en la purga.',
+    )
+    IMPORTACION_FILAS = Counter(
+        'directorio_importacion_filas', 'Filas de Excel importadas por resultado.', ['resultado'],
+    )
+    IMPORTACION_SEGUNDOS = Counter(
+        'directorio_importacion_segundos', 'Tiempo dedicado a procesar trabajos de importación.',
+    )
+    IMPORTACION_TRABAJOS = Counter(
+        'directorio_importacion_trabajos', 'Trabajos de importación terminados por estado.', ['estado'],
+    )
+
+
+# -----------------------------
+# Registro (llamado desde middleware, servicios y comandos)
+# -----------------------------
+def peticion(vista, metodo, estado, segundos):
+    if activas():
+        PETICIONES.labels(vista, metodo, str(estado)).observe(segundos)
+
+
+def logo_servido(num_bytes):
+    if activas() and num_bytes:
+        LOGOS_BYTES.inc(num_bytes)
+
+
+def api_estados(segundos, error=None):
+    if activas():
+        API_ESTADOS.observe(segundos)
+        if error:
+            API_ESTADOS_ERRORES.labels(error).inc()
+
+
+def purga_lote(clientes, segundos):
+    if activas():
+        PURGA_CLIENTES.inc(clientes)
+        PURGA_SEGUNDOS.inc(segundos)
+
+
+def importacion(resumen, segundos, estado):
+    if activas():
+        for resultado in ('insertados', 'actualizados', 'sin_cambios', 'fallidos'):
+            IMPORTACION_FILAS.labels(resultado).inc(resumen.get(resultado, 0))
+        IMPORTACION_SEGUNDOS.inc(segundos)
+        IMPORTACION_TRABAJOS.labels(estado).inc()
+
+
+# -----------------------------
+# Consultas SQL: envoltorio en cada conexión
+# -----------------------------
+def instalar():
+    if not activas():
+        return
+    from django.db.backends.signals import connection_created
+    connection_created.connect(_enganchar, dispatch_uid='metricas')
+
+
+def _enganchar(sender, connection, **kwargs):
+    # Al principio de la lista, como el registro de consultas lentas
+    if envoltorio_db not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, envoltorio_db)
+
+
+def envoltorio_db(execute, sql, params, many, context):
+    CONSULTAS_DB.labels(context['connection'].alias).inc()
+    return execute(sql, params, many, context)
+
+
+# -----------------------------
+# Exposición
+# -----------------------------
+def exponer():
+    """(contenido, content_type) con las métricas de todos los procesos."""
+    if settings.METRICAS_DIR:
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+    return generate_latest(registro), CONTENT_TYPE_LATEST
+
+
+def vista_metricas(request):
+    """GET /metrics para el scraper de Prometheus (con METRICAS_TOKEN, solo con la cabecera Bearer)."""
+    if not activas():
+        return HttpResponseNotFound()
+    token = settings.METRICAS_TOKEN
+    if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return HttpResponseForbidden()
+    contenido, content_type = exponer()
+    return HttpResponse(contenido, content_type=content_type)
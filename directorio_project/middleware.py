@@ -1,10 +1,279 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.shortcuts import redirect
 from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
 from django.middleware.csrf import CsrfViewMiddleware
 
+from clientes.permisos import tiene_rol
+
+from . import consultas_lentas, instrumentacion, metricas, perfilador, replicas
+
 class CustomCsrfMiddleware(CsrfViewMiddleware):
     def _reject(self, request, reason):
         # Redirige al login si el token CSRF es inválido
         if reason and '/accounts/login/' not in request.path:
             return redirect(settings.LOGIN_URL)
         return super()._reject(request, reason)
+
+
+# -----------------------------
+# Instrumentación por petición (Server-Timing + log estructurado)
+# -----------------------------
+logger_rendimiento = logging.getLogger('directorio.rendimiento')
+
+
+def envolver_conexiones(stack):
+    for conexion in connections.all():
+        stack.enter_context(conexion.execute_wrapper(instrumentacion.envoltorio_db))
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide una fracción de las peticiones (INSTRUMENTACION_MUESTREO, 0 a 1):
+    tiempo total, consultas y tiempo de BD, HTTP saliente y render de
+    plantillas. Las publica en la cabecera Server-Timing y en el logger
+    'directorio.rendimiento' como una línea JSON.
+    Con muestreo 0 Django descarta el middleware (coste nulo).
+    Admite WSGI y ASGI: bajo ASGI no obliga a Django a pasar las vistas
+    asíncronas a un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.muestreo = getattr(settings, 'INSTRUMENTACION_MUESTREO', 0.0)
+        if self.muestreo <= 0:
+            raise MiddlewareNotUsed
+        instrumentacion.instalar_ganchos()
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return self.get_response(request)
+
+        medicion, token = instrumentacion.iniciar()
+        try:
+            with ExitStack() as stack:
+                envolver_conexiones(stack)
+                response = self.get_response(request)
+        finally:
+            instrumentacion.terminar(token)
+        return self.publicar(request, response, medicion, getattr(request, 'user', None))
+
+    async def __acall__(self, request):
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return await self.get_response(request)
+
+        medicion, token = instrumentacion.iniciar()
+        stack = ExitStack()
+        try:
+            # Las conexiones son por hilo: el envoltorio se instala en el hilo
+            # síncrono donde el ORM asíncrono ejecuta las consultas
+            await sync_to_async(envolver_conexiones)(stack)
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            instrumentacion.terminar(token)
+        usuario = await request.auser() if hasattr(request, 'auser') else None
+        return self.publicar(request, response, medicion, usuario)
+
+    def publicar(self, request, response, medicion, usuario):
+        total = medicion.total
+        response['Server-Timing'] = ', '.join([
+            f'total;dur={total * 1000:.1f}',
+            f'db;dur={medicion.db_tiempo * 1000:.1f};desc="{medicion.db_consultas} consultas"',
+            f'http;dur={medicion.http_tiempo * 1000:.1f};desc="{medicion.http_llamadas} llamadas"',
+            f'plantillas;dur={medicion.plantillas_tiempo * 1000:.1f}',
+        ])
+        resolver = getattr(request, 'resolver_match', None)
+        logger_rendimiento.info(json.dumps({
+            'metodo': request.method,
+            'ruta': request.path,
+            'vista': resolver.view_name if resolver else None,
+            'estado': response.status_code,
+            'usuario': usuario.pk if usuario is not None and usuario.is_authenticated else None,
+            'total_ms': round(total * 1000, 1),
+            'db_consultas': medicion.db_consultas,
+            'db_ms': round(medicion.db_tiempo * 1000, 1),
+            'http_llamadas': medicion.http_llamadas,
+            'http_ms': round(medicion.http_tiempo * 1000, 1),
+            'plantillas_ms': round(medicion.plantillas_tiempo * 1000, 1),
+        }))
+        return response
+
+
+# -----------------------------
+# Métricas Prometheus (/metrics)
+# -----------------------------
+class MetricasMiddleware:
+    """
+    Observa la duración de cada petición por nombre de URL, método y estado
+    y cuenta los bytes de logos que sirve Django. Las peticiones sin ruta
+    (404) comparten la etiqueta 'sin_ruta' para no disparar la cardinalidad.
+    Con METRICAS_ACTIVAS=False o sin prometheus_client Django lo descarta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not metricas.activas():
+            raise MiddlewareNotUsed
+        self.prefijo_logos = f"{settings.MEDIA_URL.rstrip('/')}/logos/"
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        inicio = time.perf_counter()
+        response = self.get_response(request)
+        return self.observar(request, response, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        inicio = time.perf_counter()
+        response = await self.get_response(request)
+        return self.observar(request, response, time.perf_counter() - inicio)
+
+    def observar(self, request, response, segundos):
+        resolver = getattr(request, 'resolver_match', None)
+        vista = (resolver.view_name or 'sin_nombre') if resolver else 'sin_ruta'
+        metricas.peticion(vista, request.method, response.status_code, segundos)
+        if response.status_code == 200 and request.path.startswith(self.prefijo_logos):
+            metricas.logo_servido(int(response.get('Content-Length') or 0))
+        return response
+
+
+# -----------------------------
+# Réplicas de lectura: "lee lo que escribiste"
+# -----------------------------
+class ReplicaMiddleware:
+    """
+    Prepara el estado de réplica de cada petición (ver replicas.py): si la
+    cookie de una escritura reciente sigue vigente, las lecturas van a la
+    primaria; si la petición escribe, renueva la cookie.
+    Sin DATABASE_REPLICAS Django descarta el middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not replicas.replicas():
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado, token = replicas.iniciar(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            replicas.terminar(token)
+        return replicas.fijar_si_escribio(estado, response)
+
+    async def __acall__(self, request):
+        estado, token = replicas.iniciar(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replicas.terminar(token)
+        return replicas.fijar_si_escribio(estado, response)
+
+
+# -----------------------------
+# Consultas lentas: vista de origen
+# -----------------------------
+class ConsultasLentasMiddleware:
+    """
+    Deja la petición a mano del registro de consultas lentas para anotar
+    qué vista hizo cada consulta. Con CONSULTAS_LENTAS_MS=0 Django lo descarta.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not consultas_lentas.activo():
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = consultas_lentas.iniciar_peticion(request)
+        try:
+            return self.get_response(request)
+        finally:
+            consultas_lentas.terminar_peticion(token)
+
+    async def __acall__(self, request):
+        token = consultas_lentas.iniciar_peticion(request)
+        try:
+            return await self.get_response(request)
+        finally:
+            consultas_lentas.terminar_peticion(token)
+
+
+# -----------------------------
+# Perfilado a demanda (?perfilar=1 o X-Perfilar, solo superadmin)
+# -----------------------------
+class PerfiladorMiddleware:
+    """
+    Muestrea la pila de la petición y guarda el perfil en PERFILES_DIR
+    cuando un superadmin lo pide. Las demás peticiones solo pagan la
+    comprobación de la marca. PERFILADOR_ACTIVO=False lo descarta del todo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if not getattr(settings, 'PERFILADOR_ACTIVO', True):
+            raise MiddlewareNotUsed
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not perfilador.pedido(request) or not tiene_rol(request.user, perfilador.ROLES_PERFILADOR):
+            return self.get_response(request)
+
+        muestreador = perfilador.iniciar()
+        try:
+            response = self.get_response(request)
+        finally:
+            muestreador.detener()
+        perfilador.guardar(muestreador, request, response, request.user)
+        return response
+
+    async def __acall__(self, request):
+        if not perfilador.pedido(request):
+            return await self.get_response(request)
+        usuario = await request.auser()
+        if not tiene_rol(usuario, perfilador.ROLES_PERFILADOR):
+            return await self.get_response(request)
+
+        # Bajo ASGI la vista reparte el trabajo entre el bucle y el hilo de la BD
+        muestreador = await perfilador.iniciar_asincrono()
+        try:
+            response = await self.get_response(request)
+        finally:
+            muestreador.detener()
+        await sync_to_async(perfilador.guardar)(muestreador, request, response, usuario)
+        return response
@@ -0,0 +1,216 @@
+"""
+Perfilado por muestreo de una petición concreta, a demanda.
+
+Un superadmin añade ?perfilar=1 a la URL (o la cabecera X-Perfilar: 1) y
+PerfiladorMiddleware muestrea la pila de la petición cada
+PERFILADOR_INTERVALO_MS mientras se atiende. El resultado se guarda en
+PERFILES_DIR en formato "folded" (una pila por línea con su número de
+muestras), que abren directamente speedscope.app, flamegraph.pl o
+inferno. Sin la marca la petición no paga nada más que mirar si está.
+"""
+import asyncio
+import json
+import os
+import sys
+import sysconfig
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+
+PARAMETRO = 'perfilar'
+CABECERA = 'HTTP_X_PERFILAR'
+ROLES_PERFILADOR = ('superadmin',)
+PROFUNDIDAD_MAXIMA = 200
+
+
+def pedido(request):
+    """True si la petición trae la marca (todavía sin mirar quién la pide)."""
+    return PARAMETRO in request.GET or CABECERA in request.META
+
+
+def directorio():
+    return Path(settings.PERFILES_DIR)
+
+
+# -----------------------------
+# Muestreo
+# -----------------------------
+@lru_cache(maxsize=1)
+def _cortes():
+    # Rutas cortas y estables: desde el paquete (site-packages/django/... -> django/...)
+    return ('site-packages' + os.sep, str(settings.BASE_DIR) + os.sep, sysconfig.get_paths()['stdlib'] + os.sep)
+
+
+def _marco(code):
+    archivo = code.co_filename
+    for corte in _cortes():
+        if corte in archivo:
+            archivo = archivo.split(corte, 1)[1]
+            break
+    return f"{code.co_name} ({archivo}:{code.co_firstlineno})".replace(';', ',')
+
+
+def pila(frame, raiz=None):
+    marcos = []
+    while frame is not None and len(marcos) < PROFUNDIDAD_MAXIMA:
+        marcos.append(_marco(frame.f_code))
+        frame = frame.f_back
+    if raiz:
+        marcos.append(raiz)
+    return ';'.join(reversed(marcos))
+
+
+class Muestreador(threading.Thread):
+    """
+    Hilo que lee la pila de los hilos observados ({ident: nombre}) cada
+    `intervalo` segundos. Con varios hilos antepone el nombre a cada pila.
+    Con `tarea`, el hilo del bucle de eventos solo se muestrea mientras el
+    bucle ejecuta esa tarea: las peticiones concurrentes no entran en el perfil.
+    """
+
+    def __init__(self, hilos, intervalo=0.005, bucle=None, tarea=None):
+        super().__init__(name='perfilador', daemon=True)
+        self.hilos = hilos
+        self.intervalo = intervalo
+        self.bucle = bucle
+        self.tarea = tarea
+        self.pilas = Counter()
+        self.muestras = 0
+        self.duracion = None
+        self._parar = threading.Event()
+        self._inicio = time.perf_counter()
+
+    def run(self):
+        varios = len(self.hilos) > 1
+        while not self._parar.wait(self.intervalo):
+            marcos = sys._current_frames()
+            for ident, nombre in self.hilos.items():
+                frame = marcos.get(ident)
+                if frame is None:
+                    continue
+                if nombre == 'bucle' and asyncio.current_task(self.bucle) is not self.tarea:
+                    continue
+                self.pilas[pila(frame, nombre if varios else None)] += 1
+            self.muestras += 1
+
+    def detener(self):
+        if self.duracion is None:
+            self.duracion = time.perf_counter() - self._inicio
+        self._parar.set()
+        self.join()
+
+
+def iniciar():
+    """Petición síncrona: todo ocurre en el hilo actual."""
+    muestreador = Muestreador({threading.get_ident(): 'peticion'}, settings.PERFILADOR_INTERVALO_MS / 1000)
+    muestreador.start()
+    return muestreador
+
+
+async def iniciar_asincrono():
+    """
+    Petición asíncrona: el hilo del bucle (solo mientras corre esta tarea) y
+    el hilo de sync_to_async de esta petición (Django da uno propio a cada
+    petición ASGI con ThreadSensitiveContext). Lo que se mande a otros hilos
+    (thread_sensitive=False, asyncio.to_thread) no aparece en el perfil.
+    """
+    from asgiref.sync import sync_to_async
+
+    hilo_sync = await sync_to_async(threading.get_ident)()
+    muestreador = Muestreador(
+        {threading.get_ident(): 'bucle', hilo_sync: 'sync'},
+        settings.PERFILADOR_INTERVALO_MS / 1000,
+        bucle=asyncio.get_running_loop(),
+        tarea=asyncio.current_task(),
+    )
+    muestreador.start()
+    return muestreador
+
+
+# -----------------------------
+# Almacenamiento
+# -----------------------------
+def guardar(muestreador, request, response, usuario):
+    """Escribe <id>.folded y <id>.json en PERFILES_DIR y poda los más antiguos."""
+    muestreador.detener()
+    perfil_id = f"{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+    carpeta = directorio()
+    carpeta.mkdir(parents=True, exist_ok=True)
+    (carpeta / f"{perfil_id}.folded").write_text(
+        ''.join(f"{p} {n}\n" for p, n in muestreador.pilas.most_common()), encoding='utf-8',
+    )
+    resolver = getattr(request, 'resolver_match', None)
+    (carpeta / f"{perfil_id}.json").write_text(json.dumps({
+        'id': perfil_id,
+        'fecha': timezone.now().isoformat(),
+        'metodo': request.method,
+        'ruta': request.get_full_path(),
+        'vista': resolver.view_name if resolver else None,
+        'estado': response.status_code,
+        'usuario': usuario.get_username(),
+        'duracion_ms': round(muestreador.duracion * 1000, 1),
+        'muestras': muestreador.muestras,
+        'intervalo_ms': settings.PERFILADOR_INTERVALO_MS,
+        'hilos': sorted(muestreador.hilos.values()),
+    }, ensure_ascii=False), encoding='utf-8')
+    podar(carpeta)
+    response['X-Perfil'] = perfil_id
+    return perfil_id
+
+
+def podar(carpeta):
+    metadatos = sorted(carpeta.glob('*.json'))
+    for viejo in metadatos[:max(0, len(metadatos) - settings.PERFILES_MAX)]:
+        viejo.unlink(missing_ok=True)
+        viejo.with_suffix('.folded').unlink(missing_ok=True)
+
+
+# -----------------------------
+# Lectura (admin)
+# -----------------------------
+def listar():
+    carpeta = directorio()
+    if not carpeta.exists():
+        return []
+    perfiles = []
+    for ruta in sorted(carpeta.glob('*.json'), reverse=True):
+        try:
+            perfiles.append(json.loads(ruta.read_text(encoding='utf-8')))
+        except ValueError:
+            continue
+    return perfiles
+
+
+def ruta_perfil(perfil_id):
+    # Los id son nombres generados aquí: nada de rutas arbitrarias
+    if not perfil_id.replace('-', '').isalnum():
+        return None
+    ruta = directorio() / f"{perfil_id}.folded"
+    return ruta if ruta.exists() else None
+
+
+def resumen(perfil_id, limite=30):
+    """Funciones con más muestras: propias (en la cima de la pila) e inclusivas."""
+    ruta = ruta_perfil(perfil_id)
+    if ruta is None:
+        return None
+    propias, inclusivas, total = Counter(), Counter(), 0
+    for linea in ruta.read_text(encoding='utf-8').splitlines():
+        pila_texto, _, n = linea.rpartition(' ')
+        n = int(n)
+        marcos = pila_texto.split(';')
+        total += n
+        propias[marcos[-1]] += n
+        for marco in set(marcos):
+            inclusivas[marco] += n
+
+    def filas(contador):
+        return [(marco, n, round(100 * n / total, 1)) for marco, n in contador.most_common(limite)]
+
+    return {'total': total, 'propias': filas(propias), 'inclusivas': filas(inclusivas)}
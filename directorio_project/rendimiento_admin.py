@@ -0,0 +1,102 @@
+"""
+Páginas de rendimiento dentro del admin: consultas lentas para admin/superadmin
+y perfiles (pilas, parámetros de la URL) solo para quien puede perfilar. Se incluyen en urls.py bajo admin/rendimiento/, antes de admin.site.urls.
+"""
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import admin
+from django.core.exceptions import PermissionDenied
+from django.http import FileResponse, Http404
+from django.template.response import TemplateResponse
+from django.urls import path
+
+from clientes.permisos import ROLES_ADMIN, tiene_rol
+
+from . import consultas_lentas, perfilador
+
+
+def pagina_con_rol(roles):
+    """Sesión de staff del admin y, además, uno de los roles indicados."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if not tiene_rol(request.user, roles):
+                raise PermissionDenied
+            return view_func(request, *args, **kwargs)
+        return admin.site.admin_view(_wrapped_view)
+    return decorator
+
+
+pagina_admin = pagina_con_rol(ROLES_ADMIN)
+# Los mismos roles que pueden perfilar (PerfiladorMiddleware)
+pagina_perfilador = pagina_con_rol(perfilador.ROLES_PERFILADOR)
+
+
+def contexto(request, titulo, **extra):
+    return {**admin.site.each_context(request), 'title': titulo, **extra}
+
+
+# -----------------------------
+# Consultas lentas
+# -----------------------------
+@pagina_admin
+def consultas_lentas_lista(request):
+    grupos = consultas_lentas.agrupar_por_forma(consultas_lentas.leer_registros())
+    return TemplateResponse(request, 'admin/rendimiento/consultas_lentas.html', contexto(
+        request, 'Consultas lentas',
+        grupos=grupos,
+        activo=consultas_lentas.activo(),
+        umbral_ms=settings.CONSULTAS_LENTAS_MS,
+    ))
+
+
+@pagina_admin
+def consultas_lentas_detalle(request, huella):
+    grupos = consultas_lentas.agrupar_por_forma(consultas_lentas.leer_registros())
+    grupo = next((g for g in grupos if g['huella'] == huella), None)
+    if grupo is None:
+        raise Http404("No hay consultas registradas con esa forma.")
+    return TemplateResponse(request, 'admin/rendimiento/consultas_lentas_detalle.html', contexto(
+        request, 'Consulta lenta', grupo=grupo,
+    ))
+
+
+# -----------------------------
+# Perfiles de peticiones
+# -----------------------------
+@pagina_perfilador
+def perfiles_lista(request):
+    return TemplateResponse(request, 'admin/rendimiento/perfiles.html', contexto(
+        request, 'Perfiles de peticiones',
+        perfiles=perfilador.listar(),
+        activo=settings.PERFILADOR_ACTIVO,
+    ))
+
+
+@pagina_perfilador
+def perfiles_detalle(request, perfil_id):
+    resumen = perfilador.resumen(perfil_id)
+    if resumen is None:
+        raise Http404("El perfil no existe o ya se borró.")
+    perfil = next((p for p in perfilador.listar() if p['id'] == perfil_id), {'id': perfil_id})
+    return TemplateResponse(request, 'admin/rendimiento/perfiles_detalle.html', contexto(
+        request, f"Perfil {perfil_id}", perfil=perfil, resumen=resumen,
+    ))
+
+
+@pagina_perfilador
+def perfiles_descargar(request, perfil_id):
+    ruta = perfilador.ruta_perfil(perfil_id)
+    if ruta is None:
+        raise Http404("El perfil no existe o ya se borró.")
+    return FileResponse(ruta.open('rb'), as_attachment=True, filename=ruta.name, content_type='text/plain')
+
+
+urlpatterns = [
+    path('consultas-lentas/', consultas_lentas_lista, name='consultas_lentas'),
+    path('consultas-lentas/<str:huella>/', consultas_lentas_detalle, name='consultas_lentas_detalle'),
+    path('perfiles/', perfiles_lista, name='perfiles'),
+    path('perfiles/<str:perfil_id>/', perfiles_detalle, name='perfiles_detalle'),
+    path('perfiles/<str:perfil_id>/descargar/', perfiles_descargar, name='perfiles_descargar'),
+]
@@ -0,0 +1,119 @@
+"""
+Lecturas en réplicas con consistencia "lee lo que escribiste".
+
+Las vistas marcadas con @lectura_en_replica leen de una réplica
+(settings.DATABASE_REPLICAS) en peticiones GET/HEAD; todo lo demás lee y
+escribe en 'default'. Tras una escritura, ReplicaMiddleware deja una cookie
+que fija al usuario a la primaria durante REPLICA_FIJAR_SEGUNDOS, para que
+vea sus propios cambios aunque la réplica vaya con retraso.
+"""
+import random
+import time
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+
+COOKIE_FIJAR = 'primaria_hasta'
+# Apps que siempre van a la primaria y cuyas escrituras no fijan al usuario:
+# la sesión (cached_db) se guarda en casi cada petición y no es un cambio del usuario
+APPS_PRIMARIA = ('sessions',)
+
+_estado = ContextVar('estado_replica', default=None)
+
+
+class EstadoReplica:
+    __slots__ = ('fijada', 'alias', 'escribio')
+
+    def __init__(self, fijada=False):
+        self.fijada = fijada
+        self.alias = None
+        self.escribio = False
+
+
+def replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def iniciar(request):
+    try:
+        hasta = float(request.COOKIES.get(COOKIE_FIJAR, 0))
+    except ValueError:
+        hasta = 0
+    estado = EstadoReplica(fijada=hasta > time.time())
+    return estado, _estado.set(estado)
+
+
+def terminar(token):
+    _estado.reset(token)
+
+
+def fijar_si_escribio(estado, response):
+    if estado.escribio:
+        segundos = settings.REPLICA_FIJAR_SEGUNDOS
+        response.set_cookie(
+            COOKIE_FIJAR, f'{time.time() + segundos:.0f}', max_age=segundos, httponly=True, samesite='Lax',
+        )
+    return response
+
+
+def alias_lectura():
+    """BD de lectura de la petición actual (None = la que decida el router)."""
+    estado = _estado.get()
+    if estado is not None and estado.alias and not estado.escribio:
+        return estado.alias
+    return None
+
+
+# -----------------------------
+# Decorador para vistas de solo lectura
+# -----------------------------
+def lectura_en_replica(view_func):
+    """
+    Envía las lecturas de la vista a una réplica si la petición es GET/HEAD
+    y el usuario no está fijado a la primaria por una escritura reciente.
+    """
+    def activar(request):
+        estado = _estado.get()
+        if estado is not None and not estado.fijada and request.method in ('GET', 'HEAD') and replicas():
+            estado.alias = random.choice(replicas())
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_view(request, *args, **kwargs):
+            activar(request)
+            return await view_func(request, *args, **kwargs)
+        return _async_view
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        activar(request)
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+# -----------------------------
+# Router (DATABASE_ROUTERS)
+# -----------------------------
+class RouterReplicas:
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in APPS_PRIMARIA:
+            return 'default'
+        return alias_lectura()
+
+    def db_for_write(self, model, **hints):
+        # Siempre la primaria, aunque la instancia se haya leído de una réplica
+        estado = _estado.get()
+        if estado is not None and model._meta.app_label not in APPS_PRIMARIA:
+            estado.escribio = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Primaria y réplicas tienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas reciben el esquema por replicación
+        return db not in replicas()
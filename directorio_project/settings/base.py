@@ -6,8 +6,6 @@ Generated by 'django-admin startproject' using Django 3.2.13.
 import os
 from pathlib import Path
 from decouple import config
-from dotenv import load_dotenv
-import resend
 # Configuración de mensajes
 from django.contrib.messages import constants as messages_constants
 
@@ -16,9 +14,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = config('SECRET_KEY')
-load_dotenv()
-RESEND_API_KEY = os.getenv("RESEND_API_KEY")
-resend.api_key = RESEND_API_KEY
+# API key de Resend: el módulo resend se importa donde se envíe correo, no aquí
+RESEND_API_KEY = config('RESEND_API_KEY', default='')
 
 # Email definition
 EMAIL_USE_SSL = config('EMAIL_USE_SSL', cast=bool)
@@ -50,12 +47,23 @@ LOCAL_APPS = [
 INSTALLED_APPS = BASE_APPS + THIRD_APSS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # Primero, para medir la petición completa (se desactiva con muestreo 0)
+    'directorio_project.middleware.InstrumentacionMiddleware',
+    # Histogramas de latencia para /metrics (se desactiva con METRICAS_ACTIVAS=False)
+    'directorio_project.middleware.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Vista de origen de las consultas lentas (se desactiva con CONSULTAS_LENTAS_MS=0)
+    'directorio_project.middleware.ConsultasLentasMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    # Fija a la primaria tras escribir (se desactiva sin réplicas). Debajo de
+    # SessionMiddleware: el guardado de la sesión al responder no cuenta como escritura
+    'directorio_project.middleware.ReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    # Perfil de una petición a demanda (?perfilar=1, solo superadmin)
+    'directorio_project.middleware.PerfiladorMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     # "allauth.account.middleware.AccountMiddleware",
     # 'livereload.middleware.LiveReloadScript',
@@ -128,13 +136,76 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTHENTICATION_BACKENDS = [
+    # ModelBackend con el usuario de la sesión en caché (se invalida al guardar el Usuario);
+    # solo usa la caché si es compartida entre workers (Redis, Memcached, BD)
+    'clientes.backends.UsuarioCacheadoBackend',
     # Needed to login by username in Django admin, regardless of `allauth`
+    # (también mantiene válidas las sesiones iniciadas antes del backend en caché)
     'django.contrib.auth.backends.ModelBackend',
     # `allauth` specific authentication methods, such as login by email
     # 'allauth.account.auth_backends.AuthenticationBackend',
 ]
 
 
+# Caché: en producción con varios procesos usar una compartida, p. ej.
+# CACHE_BACKEND=django.core.cache.backends.redis.RedisCache y CACHE_LOCATION=redis://127.0.0.1:6379
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='directorio'),
+    }
+}
+
+# API de estados de EE. UU. (en pruebas de carga apuntar a manage.py stub_estados)
+STATES_API_URL = config('STATES_API_URL', default='https://api.entrenandolatinosinroofing.com/api/v1/states/?format=json')
+STATES_API_CACHE_TTL = config('STATES_API_CACHE_TTL', default=3600, cast=int)
+
+# Días que un cliente eliminado se puede restaurar antes de que
+# limpiar_clientes_eliminados lo borre definitivamente
+PURGA_DIAS_RETENCION = config('PURGA_DIAS_RETENCION', default=30, cast=int)
+
+# Fracción de peticiones medidas por InstrumentacionMiddleware (0 = apagado, 1 = todas)
+INSTRUMENTACION_MUESTREO = config('INSTRUMENTACION_MUESTREO', default=0.0, cast=float)
+
+# Registro de consultas lentas (0 = apagado): SQL, parámetros (enmascarados),
+# duración, vista y EXPLAIN de cada consulta que supere el umbral. Cada proceso
+# escribe su propio archivo rotativo (consultas_lentas.<pid>.jsonl)
+CONSULTAS_LENTAS_MS = config('CONSULTAS_LENTAS_MS', default=0, cast=int)
+CONSULTAS_LENTAS_ARCHIVO = config('CONSULTAS_LENTAS_ARCHIVO', default=str(BASE_DIR / 'logs' / 'consultas_lentas.jsonl'))
+CONSULTAS_LENTAS_MAX_BYTES = config('CONSULTAS_LENTAS_MAX_BYTES', default=5 * 1024 * 1024, cast=int)
+CONSULTAS_LENTAS_ARCHIVOS = config('CONSULTAS_LENTAS_ARCHIVOS', default=5, cast=int)
+
+# Perfilado a demanda: un superadmin añade ?perfilar=1 (o X-Perfilar: 1) y el
+# perfil de esa petición queda en PERFILES_DIR (se guardan los PERFILES_MAX últimos)
+PERFILADOR_ACTIVO = config('PERFILADOR_ACTIVO', default=True, cast=bool)
+PERFILADOR_INTERVALO_MS = config('PERFILADOR_INTERVALO_MS', default=5, cast=float)
+PERFILES_DIR = config('PERFILES_DIR', default=str(BASE_DIR / 'perfiles'))
+PERFILES_MAX = config('PERFILES_MAX', default=50, cast=int)
+
+# Métricas Prometheus en /metrics. Con varios workers o procesos (gunicorn,
+# programador, worker de importaciones) METRICAS_DIR debe ser una carpeta
+# compartida que se vacía al arrancar el despliegue; sin ella cada proceso
+# expone solo sus propios valores. METRICAS_TOKEN exige "Authorization: Bearer <token>"
+METRICAS_ACTIVAS = config('METRICAS_ACTIVAS', default=True, cast=bool)
+METRICAS_DIR = config('METRICAS_DIR', default='')
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+if METRICAS_DIR:
+    # prometheus_client lee la variable al importarse
+    os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', METRICAS_DIR)
+
+# Precalentar cada worker al cargar wsgi.py/asgi.py (ver manage.py precalentar)
+PRECALENTAR_AL_ARRANCAR = config('PRECALENTAR_AL_ARRANCAR', default=False, cast=bool)
+
+# Réplicas de lectura: los settings de cada entorno añaden sus alias a
+# DATABASES y DATABASE_REPLICAS. Tras escribir, el usuario lee de la
+# primaria durante REPLICA_FIJAR_SEGUNDOS (debe cubrir el retraso de la réplica)
+DATABASE_ROUTERS = ['directorio_project.replicas.RouterReplicas']
+DATABASE_REPLICAS = []
+REPLICA_FIJAR_SEGUNDOS = config('REPLICA_FIJAR_SEGUNDOS', default=10, cast=int)
+
+# Sesiones leídas desde la caché (la BD queda como respaldo)
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
 FILE_UPLOAD_PERMISSIONS = 0o644
 
 MESSAGE_TAGS = {
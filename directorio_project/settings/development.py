@@ -57,3 +57,14 @@ DATABASES = {
     #     'PORT': ''
     # }
 }
+
+# Réplica de lectura local para probar el router: copia de db.sqlite3
+# (p. ej. DB_REPLICA_SQLITE=db_replica.sqlite3); la copia simula el retraso
+DB_REPLICA_SQLITE = config('DB_REPLICA_SQLITE', default='')
+if DB_REPLICA_SQLITE:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / DB_REPLICA_SQLITE,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS = ['replica']
@@ -1,3 +1,6 @@
+from decouple import Csv
+from django.core.exceptions import ImproperlyConfigured
+
 from .base import *
 
 # SECURITY WARNING: don't run with debug turned on in production!
@@ -14,18 +17,67 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 # Database
-# https://docs.djangoproject.com/en/3.2/ref/settings/#databases
+# https://docs.djangoproject.com/en/5.2/ref/databases/#persistent-connections
+# Conexiones persistentes: cada worker reutiliza su conexión durante
+# DB_CONN_MAX_AGE segundos en lugar de abrir (y autenticar) una por petición.
+# CONN_HEALTH_CHECKS comprueba la conexión reutilizada antes de usarla,
+# así un reinicio de PostgreSQL no se traduce en errores 500.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'django.db.backends.postgresql',
         'NAME': config('DB_NAME'),
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
-        'PORT': ''
+        'PORT': config('DB_PORT', default=''),
+        # El pool de psycopg no admite conexiones persistentes: con DB_POOL vale 0
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+if DB_POOL:
+    # Pool de psycopg 3 (requiere psycopg[pool]): las conexiones se comparten
+    # entre los hilos del proceso y se devuelven al pool al terminar la petición
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX', default=10, cast=int),
+        # Segundos esperando una conexión libre antes de fallar
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+        # Recicla conexiones viejas u ociosas
+        'max_lifetime': config('DB_POOL_MAX_LIFETIME', default=1800, cast=float),
+        'max_idle': config('DB_POOL_MAX_IDLE', default=300, cast=float),
+        # Comprueba cada conexión al sacarla del pool (equivalente a CONN_HEALTH_CHECKS)
+        'check': ConnectionPool.check_connection if DATABASES['default']['CONN_HEALTH_CHECKS'] else None,
+    }
+
+# Réplicas de lectura (streaming replication), mismas credenciales que la primaria:
+# DB_REPLICA_HOSTS=replica1.interna,replica2.interna
+DATABASE_REPLICAS = []
+for numero, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    alias = f'replica{numero}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# En producción se registran por defecto las consultas de más de 200 ms
+CONSULTAS_LENTAS_MS = config('CONSULTAS_LENTAS_MS', default=200, cast=int)
+
+# /metrics deja ver rutas y volumen de tráfico: en producción solo se sirve con
+# token (sin METRICAS_TOKEN las métricas quedan apagadas salvo que se pidan)
+METRICAS_ACTIVAS = config('METRICAS_ACTIVAS', default=bool(METRICAS_TOKEN), cast=bool)
+if METRICAS_ACTIVAS and not METRICAS_TOKEN:
+    raise ImproperlyConfigured("METRICAS_ACTIVAS en producción requiere METRICAS_TOKEN.")
+
 # DJANGO-LOGS built-in framework settings
 LOGGING = {
     'version': 1,
@@ -37,6 +89,6 @@ LOGGING = {
     },
     'root': {
         'handlers': ['console'],
-        'level': 'DEBUG',
+        'level': config('LOG_LEVEL', default='INFO'),
     },
 }
@@ -20,8 +20,14 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
 
+from . import metricas
+
 urlpatterns = [
+    # Páginas de rendimiento del admin (antes de admin.site.urls, que captura admin/*)
+    path('admin/rendimiento/', include('directorio_project.rendimiento_admin')),
     path('admin/', admin.site.urls),
+    # Métricas Prometheus (ver metricas.py)
+    path('metrics', metricas.vista_metricas, name='metricas'),
     path('', include('clientes.urls')),
     # login/logout
     path('accounts/login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
@@ -14,3 +14,12 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'directorio_project.settings')
 
 application = get_wsgi_application()
+
+# Con PRECALENTAR_AL_ARRANCAR, cada worker se precalienta antes de atender peticiones.
+# Sin él ni siquiera se importa el módulo (arrastra django.test y las vistas)
+from django.conf import settings  # noqa: E402
+
+if settings.PRECALENTAR_AL_ARRANCAR:
+    from clientes.services.precalentar import al_arrancar
+
+    al_arrancar()
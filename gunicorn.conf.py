@@ -0,0 +1,24 @@
+"""
+Configuración de gunicorn: gunicorn -c gunicorn.conf.py directorio_project.wsgi
+
+Con METRICAS_DIR (métricas Prometheus multiproceso) cada worker escribe sus
+valores en esa carpeta; al morir un worker hay que marcarlo como muerto para
+que /metrics deje de contarlo como vivo.
+"""
+import os
+
+from decouple import config
+
+bind = config('GUNICORN_BIND', default='0.0.0.0:8000')
+workers = config('GUNICORN_WORKERS', default=2, cast=int)
+
+
+def child_exit(server, worker):
+    carpeta = os.environ.get('PROMETHEUS_MULTIPROC_DIR') or config('METRICAS_DIR', default='')
+    if not carpeta:
+        return
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid, carpeta)